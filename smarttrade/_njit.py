@@ -0,0 +1,23 @@
+"""
+Compilação JIT opcional via Numba.
+
+Se o numba não estiver instalado, `njit` vira um decorator no-op e
+`NUMBA_AVAILABLE` fica False, permitindo que os chamadores escolham
+uma implementação vetorizada em NumPy como fallback.
+"""
+from __future__ import annotations
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba é opcional
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Decorator no-op compatível com `@njit` e `@njit(...)`"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+__all__ = ["njit", "NUMBA_AVAILABLE"]
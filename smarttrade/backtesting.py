@@ -10,13 +10,15 @@ Sistema de backtesting para testar estratégias baseadas em SMC:
 from __future__ import annotations
 
 import logging
+import numpy as np
 from typing import List, Dict, Any, Optional, Tuple, Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
-from .smc_indicators import SMCAnalyzer, OrderBlock, FairValueGap, OrderBlockType, CISD
+from .smc_indicators import SMCAnalyzer, SMCContext, OrderBlock, FairValueGap, OrderBlockType, CISD
 from .fibonacci import FibonacciAnalyzer, FibonacciLevel
+from .kline_array import KlinesLike, OPEN, HIGH, LOW, CLOSE, TIME, as_kline_array, as_kline_list
 
 logger = logging.getLogger(__name__)
 
@@ -137,14 +139,41 @@ class BacktestEngine:
         self.smc_analyzer = smc_analyzer or SMCAnalyzer()
         self.fibo_analyzer = fibo_analyzer or FibonacciAnalyzer()
     
+    def _prepare_klines(
+        self, klines_data: KlinesLike, ctx: Optional[SMCContext] = None
+    ) -> Tuple[List[Dict[str, Any]], List[float], List[float], List[float], List[float], List[int]]:
+        """
+        Normaliza os dados de entrada (lista de dicts ou array SoA).
+        
+        Se `ctx` for fornecido, reutiliza os klines já normalizados nele.
+        
+        Returns:
+            (klines como dicts, opens, highs, lows, closes, times) - colunas já
+            convertidas uma única vez para evitar float() por candle nos loops
+        """
+        if ctx is not None:
+            klines, arr = ctx.klines, ctx.array
+        else:
+            klines = as_kline_list(klines_data)
+            arr = as_kline_array(klines_data)
+        return (
+            klines,
+            arr[:, OPEN].tolist(),
+            arr[:, HIGH].tolist(),
+            arr[:, LOW].tolist(),
+            arr[:, CLOSE].tolist(),
+            arr[:, TIME].astype(np.int64).tolist(),
+        )
+    
     def test_orderblock_strategy(
         self,
-        klines_data: List[Dict[str, Any]],
+        klines_data: KlinesLike,
         symbol: str,
         interval: str,
         risk_reward_ratio: float = 2.0,
         max_distance_percent: float = 1.0,
         entry_method: str = "edge",  # "edge", "open", "50%"
+        ctx: Optional[SMCContext] = None,
     ) -> BacktestResult:
         """
         Testa estratégia de respeito a Order Blocks.
@@ -162,14 +191,17 @@ class BacktestEngine:
             risk_reward_ratio: Razão risco/recompensa
             max_distance_percent: Distância máxima do OB para considerar "toque" (%)
             entry_method: Método de entrada ("edge"=borda, "open"=preço abertura OB, "50%"=meio do OB)
+            ctx: Contexto SMC pré-computado para os mesmos klines (opcional)
         
         Returns:
             BacktestResult com métricas completas
         """
         logger.info(f"Testing Order Block strategy on {symbol} {interval} (entry={entry_method})")
         
+        klines_data, opens, highs, lows, closes, times = self._prepare_klines(klines_data, ctx)
+        
         # Analisa SMC
-        smc_analysis = self.smc_analyzer.analyze(klines_data)
+        smc_analysis = ctx.analysis if ctx is not None else self.smc_analyzer.analyze(klines_data)
         order_blocks = [
             OrderBlock(**ob) if isinstance(ob, dict) else ob 
             for ob in smc_analysis.get("order_blocks", [])
@@ -195,12 +227,11 @@ class BacktestEngine:
         
         # Simula trading
         for i in range(len(klines_data)):
-            candle = klines_data[i]
-            close = float(candle["close"])
-            high = float(candle["high"])
-            low = float(candle["low"])
-            open_price = float(candle["open"])
-            time = candle["time"]
+            close = closes[i]
+            high = highs[i]
+            low = lows[i]
+            open_price = opens[i]
+            time = times[i]
             
             # Verifica saída de trade aberto
             if current_trade and not current_trade.is_closed:
@@ -231,7 +262,7 @@ class BacktestEngine:
                         # Assume que o candle do OB está em klines_data[ob.candle_index]
                         # Isso pode falhar se klines_data for diferente do usado na análise, mas aqui é o mesmo
                         if 0 <= ob.candle_index < len(klines_data):
-                            ob_open_price = float(klines_data[ob.candle_index]["open"])
+                            ob_open_price = opens[ob.candle_index]
                         else:
                             ob_open_price = ob.top if ob.type == OrderBlockType.BULLISH else ob.bottom # Fallback
 
@@ -332,11 +363,12 @@ class BacktestEngine:
     
     def test_fvg_strategy(
         self,
-        klines_data: List[Dict[str, Any]],
+        klines_data: KlinesLike,
         symbol: str,
         interval: str,
         risk_reward_ratio: float = 2.0,
         fill_threshold: float = 0.5,
+        ctx: Optional[SMCContext] = None,
     ) -> BacktestResult:
         """
         Testa estratégia de preenchimento de Fair Value Gaps.
@@ -352,14 +384,17 @@ class BacktestEngine:
             interval: Timeframe
             risk_reward_ratio: Razão risco/recompensa
             fill_threshold: % do FVG que precisa ser preenchido para entrada
+            ctx: Contexto SMC pré-computado para os mesmos klines (opcional)
         
         Returns:
             BacktestResult
         """
         logger.info(f"Testing FVG strategy on {symbol} {interval}")
         
+        klines_data, opens, highs, lows, closes, times = self._prepare_klines(klines_data, ctx)
+        
         # Analisa SMC
-        smc_analysis = self.smc_analyzer.analyze(klines_data)
+        smc_analysis = ctx.analysis if ctx is not None else self.smc_analyzer.analyze(klines_data)
         fvgs_data = smc_analysis.get("fair_value_gaps", [])
         
         # Converte para objetos FairValueGap
@@ -380,11 +415,10 @@ class BacktestEngine:
         current_trade = None
         
         for i in range(len(klines_data)):
-            candle = klines_data[i]
-            close = float(candle["close"])
-            high = float(candle["high"])
-            low = float(candle["low"])
-            time = candle["time"]
+            close = closes[i]
+            high = highs[i]
+            low = lows[i]
+            time = times[i]
             
             # Verifica saída
             if current_trade and not current_trade.is_closed:
@@ -481,11 +515,12 @@ class BacktestEngine:
     
     def test_fibonacci_strategy(
         self,
-        klines_data: List[Dict[str, Any]],
+        klines_data: KlinesLike,
         symbol: str,
         interval: str,
         target_levels: List[float] = None,
         risk_reward_ratio: float = 2.0,
+        ctx: Optional[SMCContext] = None,
     ) -> BacktestResult:
         """
         Testa estratégia baseada em níveis de Fibonacci.
@@ -498,6 +533,7 @@ class BacktestEngine:
             interval: Timeframe
             target_levels: Níveis de Fibonacci para entrar (default: 0.618, 0.786)
             risk_reward_ratio: RR ratio
+            ctx: Contexto SMC pré-computado para os mesmos klines (opcional)
         
         Returns:
             BacktestResult
@@ -507,6 +543,8 @@ class BacktestEngine:
         if target_levels is None:
             target_levels = [0.618, 0.786]
         
+        klines_data, opens, highs, lows, closes, times = self._prepare_klines(klines_data, ctx)
+        
         # Calcula Fibonacci automaticamente
         fibo_retracements = self.fibo_analyzer.calculate_auto_retracements(klines_data, lookback_period=100)
         
@@ -521,11 +559,10 @@ class BacktestEngine:
         current_trade = None
         
         for i in range(len(klines_data)):
-            candle = klines_data[i]
-            close = float(candle["close"])
-            high = float(candle["high"])
-            low = float(candle["low"])
-            time = candle["time"]
+            close = closes[i]
+            high = highs[i]
+            low = lows[i]
+            time = times[i]
             
             # Verifica saída
             if current_trade and not current_trade.is_closed:
@@ -608,10 +645,11 @@ class BacktestEngine:
     
     def test_cisd_strategy(
         self,
-        klines_data: List[Dict[str, Any]],
+        klines_data: KlinesLike,
         symbol: str,
         interval: str,
         risk_reward_ratio: float = 2.0,
+        ctx: Optional[SMCContext] = None,
     ) -> BacktestResult:
         """
         Testa estratégia de CISD (Change in State of Delivery).
@@ -626,14 +664,17 @@ class BacktestEngine:
             symbol: Par de negociação
             interval: Timeframe
             risk_reward_ratio: Razão risco/recompensa
+            ctx: Contexto SMC pré-computado para os mesmos klines (opcional)
             
         Returns:
             BacktestResult com métricas completas
         """
         logger.info(f"Testing CISD strategy on {symbol} {interval}")
         
+        klines_data, opens, highs, lows, closes, times = self._prepare_klines(klines_data, ctx)
+        
         # Analisa SMC para encontrar zonas de CISD
-        smc_analysis = self.smc_analyzer.analyze(klines_data)
+        smc_analysis = ctx.analysis if ctx is not None else self.smc_analyzer.analyze(klines_data)
         cisd_zones = [
             CISD(**c) if isinstance(c, dict) else c
             for c in smc_analysis.get("cisd_zones", [])
@@ -644,11 +685,10 @@ class BacktestEngine:
         
         # Simula trading
         for i in range(len(klines_data)):
-            candle = klines_data[i]
-            high = float(candle["high"])
-            low = float(candle["low"])
-            open_price = float(candle["open"])
-            time = candle["time"]
+            high = highs[i]
+            low = lows[i]
+            open_price = opens[i]
+            time = times[i]
             
             # Verifica saída de trade aberto
             if current_trade and not current_trade.is_closed:
@@ -5,81 +5,210 @@ para contornar limitações de API e expandir a lista de ativos.
 """
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import ccxt.async_support as ccxt
+import requests
+from requests.adapters import HTTPAdapter
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+from .kline_array import klines_to_array, KLINE_ARRAY_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+# Colunas de um kline e seus índices no OHLCV do CCXT
+KLINE_COLUMNS = ("time", "open", "high", "low", "close", "volume")
+_CCXT_COLUMN_INDEX = {name: idx for idx, name in enumerate(KLINE_COLUMNS)}
+# Colunas equivalentes no DataFrame do yfinance (time vem do índice)
+_YF_COLUMN_NAMES = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
 class DataProvider:
     def __init__(self, bingx_client=None):
         self.bingx_client = bingx_client
         self.ccxt_binance = ccxt.binance()
+        # Pool dedicado para chamadas bloqueantes (yfinance / BingX síncrono),
+        # evitando disputar o executor padrão usado por asyncio.to_thread
+        self._yf_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="yf")
+        # Sessão HTTP compartilhada (keep-alive) e cache de Tickers por símbolo
+        self._yf_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50)
+        self._yf_session.mount("https://", adapter)
+        self._yf_tickers: Dict[str, yf.Ticker] = {}
         
     async def close(self):
         await self.ccxt_binance.close()
+        self.close_sync()
+
+    def close_sync(self) -> None:
+        """
+        Libera o pool de threads e a sessão HTTP do Yahoo sem precisar de event loop.
+        
+        O cliente CCXT não é fechado aqui: sua sessão aiohttp pertence ao loop
+        em que foi criada (use `close()` nesse loop).
+        """
+        self._yf_pool.shutdown(wait=False)
+        self._yf_session.close()
 
-    async def fetch_klines(self, symbol: str, timeframe: str, limit: int = 100) -> List[Dict[str, Any]]:
+    async def fetch_klines(
+        self,
+        symbol: str,
+        timeframe: str,
+        limit: int = 100,
+        columns: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Busca klines tentando múltiplas fontes em ordem:
         1. BingX (se disponível e for cripto)
         2. Binance (via CCXT - fallback para cripto)
         3. Yahoo Finance (para commodities/forex/indices)
+
+        Se `columns` for informado (ex: ("high", "low", "close")), apenas essas
+        chaves são decodificadas em cada kline.
         """
-        # Normaliza símbolo
+        if columns is not None:
+            unknown = set(columns) - set(KLINE_COLUMNS)
+            if unknown:
+                raise ValueError(f"Invalid kline columns: {sorted(unknown)}")
+            columns = tuple(columns)
+
+        # Normaliza símbolo (formatos por fonte pré-computados e cacheados)
         symbol = symbol.upper()
+        bingx_symbol, ccxt_symbol, yf_symbol = _sym_triple(symbol)
         
         # Tenta BingX primeiro se o client foi fornecido e parece ser um par cripto padrão
-        if self.bingx_client and ("-USDT" in symbol or "USDT" in symbol):
+        if self.bingx_client and "USDT" in symbol:
             try:
-                # BingX usa formato BTC-USDT
-                bingx_symbol = symbol.replace("/", "-")
-                if "-" not in bingx_symbol:
-                    bingx_symbol = bingx_symbol.replace("USDT", "-USDT")
-                
-                return await self._fetch_bingx(bingx_symbol, timeframe, limit)
+                return await self._fetch_bingx(bingx_symbol, timeframe, limit, columns)
             except Exception as e:
                 logger.warning(f"BingX fetch failed for {symbol}, trying fallback: {e}")
         
         # Tenta Binance via CCXT
         if "USDT" in symbol or "BTC" in symbol or "ETH" in symbol:
             try:
-                # CCXT usa formato BTC/USDT
-                ccxt_symbol = symbol.replace("-", "/")
-                if "/" not in ccxt_symbol:
-                    ccxt_symbol = ccxt_symbol.replace("USDT", "/USDT")
-                    
-                return await self._fetch_ccxt(self.ccxt_binance, ccxt_symbol, timeframe, limit)
+                return await self._fetch_ccxt(self.ccxt_binance, ccxt_symbol, timeframe, limit, columns)
             except Exception as e:
                 logger.warning(f"CCXT/Binance fetch failed for {symbol}: {e}")
 
         # Tenta Yahoo Finance (Commodities, Forex, Indices)
-        # Mapeamento de símbolos comuns
-        yf_symbol = self._map_to_yahoo(symbol)
         if yf_symbol:
             try:
-                return await self._fetch_yfinance(yf_symbol, timeframe, limit)
+                return await self._fetch_yfinance(yf_symbol, timeframe, limit, columns)
             except Exception as e:
                 logger.error(f"YFinance fetch failed for {symbol} ({yf_symbol}): {e}")
 
         raise ValueError(f"Could not fetch data for {symbol} from any source")
 
-    async def _fetch_bingx(self, symbol: str, timeframe: str, limit: int) -> List[Dict[str, Any]]:
+    async def fetch_klines_np(self, symbol: str, timeframe: str, limit: int = 100) -> np.ndarray:
+        """
+        Igual a `fetch_klines`, mas retorna array SoA float64 de shape (N, 6)
+        com colunas em `kline_array.KLINE_ARRAY_COLUMNS` (open, high, low, close, volume, time).
+        """
+        klines = await self.fetch_klines(symbol, timeframe, limit)
+        return klines_to_array(klines)
+
+    async def fetch_klines_many(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        limit: int = 100,
+        max_concurrency: int = 8
+    ) -> List[Union[np.ndarray, Exception]]:
+        """
+        Busca vários pares (símbolo, timeframe) de uma vez, no formato de `fetch_klines_np`.
+
+        Ativos servidos apenas pelo Yahoo Finance são baixados em lote com um único
+        `yf.download` por timeframe; os demais seguem a cadeia normal de fontes,
+        com no máximo `max_concurrency` requisições simultâneas.
+        Retorna uma lista alinhada com `pairs`; falhas vêm como a exceção.
+        """
+        results: List[Union[np.ndarray, Exception, None]] = [None] * len(pairs)
+        yf_buckets, others = self._bucket_by_source(pairs)
+        
+        for timeframe, items in yf_buckets.items():
+            try:
+                batch = await self._fetch_yfinance_batch(
+                    sorted({yf_symbol for _, yf_symbol in items}), timeframe, limit
+                )
+            except Exception as e:
+                logger.warning(f"YFinance batch download failed on {timeframe}: {e}")
+                batch = {}
+            for idx, yf_symbol in items:
+                arr = batch.get(yf_symbol)
+                if arr is not None and len(arr):
+                    results[idx] = arr
+                else:
+                    # Ticker ausente no lote: tenta individualmente
+                    others.append(idx)
+        
+        sem = asyncio.Semaphore(max_concurrency)
+        
+        async def _one(idx: int) -> None:
+            symbol, timeframe = pairs[idx]
+            async with sem:
+                try:
+                    results[idx] = await self.fetch_klines_np(symbol, timeframe, limit)
+                except Exception as e:
+                    results[idx] = e
+        
+        await asyncio.gather(*[_one(idx) for idx in others])
+        return results
+
+    def _bucket_by_source(
+        self, pairs: Sequence[Tuple[str, str]]
+    ) -> Tuple[Dict[str, List[Tuple[int, str]]], List[int]]:
+        """
+        Separa as requisições em lotes do Yahoo Finance (por timeframe) e no resto.
+        Só vai para o lote quem não teria BingX/CCXT como fonte em `fetch_klines`.
+        """
+        yf_buckets: Dict[str, List[Tuple[int, str]]] = {}
+        others: List[int] = []
+        for idx, (symbol, timeframe) in enumerate(pairs):
+            symbol = symbol.upper()
+            yf_symbol = _sym_triple(symbol)[2]
+            if yf_symbol and not ("USDT" in symbol or "BTC" in symbol or "ETH" in symbol):
+                yf_buckets.setdefault(timeframe, []).append((idx, yf_symbol))
+            else:
+                others.append(idx)
+        return yf_buckets, others
+
+    async def _fetch_bingx(
+        self, symbol: str, timeframe: str, limit: int, columns: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict[str, Any]]:
         # Wrapper para o client existente
         # Assumindo que bingx_client.swap_klines é síncrono ou async dependendo da implementação
         # No código atual ele parece ser síncrono rodando em thread no app.py, 
         # mas aqui vamos assumir que podemos chamar ou envolver.
         if asyncio.iscoroutinefunction(self.bingx_client.swap_klines):
-            return await self.bingx_client.swap_klines(symbol, timeframe, limit)
+            klines = await self.bingx_client.swap_klines(symbol, timeframe, limit)
         else:
-            return await asyncio.to_thread(self.bingx_client.swap_klines, symbol, timeframe, limit)
+            loop = asyncio.get_running_loop()
+            klines = await loop.run_in_executor(
+                self._yf_pool, self.bingx_client.swap_klines, symbol, timeframe, limit
+            )
+        # BingX retorna preços como strings: converte uma única vez aqui, no
+        # mesmo formato numérico das outras fontes (time int, demais float)
+        return [
+            {c: (int(k[c]) if c == "time" else float(k[c])) for c in (columns or KLINE_COLUMNS) if c in k}
+            for k in klines
+        ]
 
-    async def _fetch_ccxt(self, exchange, symbol: str, timeframe: str, limit: int) -> List[Dict[str, Any]]:
+    async def _fetch_ccxt(
+        self, exchange, symbol: str, timeframe: str, limit: int, columns: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict[str, Any]]:
         # CCXT retorna: [timestamp, open, high, low, close, volume]
         ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
         
+        if columns is not None:
+            # Decodifica apenas as colunas pedidas
+            picks = [(c, _CCXT_COLUMN_INDEX[c]) for c in columns]
+            return [
+                {c: (candle[i] if i == 0 else float(candle[i])) for c, i in picks}
+                for candle in ohlcv
+            ]
+        
         klines = []
         for candle in ohlcv:
             klines.append({
@@ -92,69 +221,134 @@ class DataProvider:
             })
         return klines
 
-    async def _fetch_yfinance(self, symbol: str, timeframe: str, limit: int) -> List[Dict[str, Any]]:
+    async def _fetch_yfinance(
+        self, symbol: str, timeframe: str, limit: int, columns: Optional[Tuple[str, ...]] = None
+    ) -> List[Dict[str, Any]]:
         # YFinance intervals: 1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 1d, 5d, 1wk, 1mo, 3mo
-        # Mapear timeframe do nosso padrão para YF
-        yf_tf = timeframe
-        if timeframe == "4h":
-            yf_tf = "1h" # YF não tem 4h nativo fácil, pegamos 1h e teríamos que resamplear, ou pedimos 1h e usamos
-            limit = limit * 4 # Pega mais dados
+        yf_tf, limit, period = _yf_params(timeframe, limit)
             
         # Executa em thread pois yfinance é bloqueante
         def run_yf():
-            # Period precisa ser compatível. Para intraday (1m-1h) max é 60d ou 7d
-            period = "1mo"
-            if timeframe in ["1m", "5m", "15m"]:
-                period = "5d"
-            
-            ticker = yf.Ticker(symbol)
+            ticker = self._yf_tickers.get(symbol)
+            if ticker is None:
+                ticker = yf.Ticker(symbol, session=self._yf_session)
+                self._yf_tickers[symbol] = ticker
             df = ticker.history(period=period, interval=yf_tf)
             return df
 
-        df = await asyncio.to_thread(run_yf)
+        df = await asyncio.get_running_loop().run_in_executor(self._yf_pool, run_yf)
         
         if df.empty:
             raise ValueError(f"No data found for {symbol} on Yahoo Finance")
             
-        # Converter para formato kline
-        klines = []
         # Pegar apenas os últimos 'limit'
         df = df.tail(limit)
         
-        for index, row in df.iterrows():
-            # YF index é datetime
-            ts = int(index.timestamp() * 1000)
-            klines.append({
-                "time": ts,
-                "open": float(row["Open"]),
-                "high": float(row["High"]),
-                "low": float(row["Low"]),
-                "close": float(row["Close"]),
-                "volume": float(row["Volume"])
-            })
-            
-        return klines
+        # Converte por coluna (como em `_yf_frame_to_array`), sem iterar linhas
+        # do DataFrame; com `columns`, só essas colunas são decodificadas
+        names = columns or KLINE_COLUMNS
+        values = [
+            df.index.as_unit("ms").asi8.tolist() if c == "time"
+            else df[_YF_COLUMN_NAMES[c]].to_numpy(dtype=np.float64).tolist()
+            for c in names
+        ]
+        return [dict(zip(names, row)) for row in zip(*values)]
+
+    async def _fetch_yfinance_batch(
+        self, symbols: Sequence[str], timeframe: str, limit: int
+    ) -> Dict[str, np.ndarray]:
+        """Baixa vários tickers do Yahoo em uma única chamada e fatia por ticker."""
+        yf_tf, limit, period = _yf_params(timeframe, limit)
+        
+        def run_yf():
+            return yf.download(
+                tickers=" ".join(symbols), period=period, interval=yf_tf,
+                group_by="ticker", threads=True, progress=False,
+                auto_adjust=True, session=self._yf_session
+            )
+
+        df = await asyncio.get_running_loop().run_in_executor(self._yf_pool, run_yf)
+        if df is None or df.empty:
+            return {}
+        
+        out: Dict[str, np.ndarray] = {}
+        for symbol in symbols:
+            if symbol not in df.columns.get_level_values(0):
+                continue
+            # O índice é a união dos pregões de todos os tickers
+            sub = df[symbol].dropna(subset=["Close"]).tail(limit)
+            out[symbol] = _yf_frame_to_array(sub)
+        return out
 
     def _map_to_yahoo(self, symbol: str) -> Optional[str]:
-        mapping = {
-            "GOLD": "GC=F",
-            "SILVER": "SI=F",
-            "OIL": "CL=F", # WTI Crude
-            "BRENT": "BZ=F",
-            "EURUSD": "EURUSD=X",
-            "GBPUSD": "GBPUSD=X",
-            "SP500": "^GSPC",
-            "NASDAQ": "^IXIC",
-            "BTC": "BTC-USD",
-            "ETH": "ETH-USD",
-            "XAUT": "GC=F", # Fallback ouro se não achar token
-        }
+        return _map_to_yahoo(symbol.upper())
+
+
+def _yf_params(timeframe: str, limit: int) -> Tuple[str, int, str]:
+    """Mapeia timeframe/limit do nosso padrão para (interval, limit, period) do Yahoo."""
+    yf_tf = timeframe
+    if timeframe == "4h":
+        yf_tf = "1h" # YF não tem 4h nativo fácil, pegamos 1h e teríamos que resamplear, ou pedimos 1h e usamos
+        limit = limit * 4 # Pega mais dados
+    # Period precisa ser compatível. Para intraday (1m-1h) max é 60d ou 7d
+    period = "1mo"
+    if timeframe in ["1m", "5m", "15m"]:
+        period = "5d"
+    return yf_tf, limit, period
+
+
+def _yf_frame_to_array(df: pd.DataFrame) -> np.ndarray:
+    """Converte OHLCV do yfinance direto para o array SoA de `kline_array`."""
+    arr = np.empty((len(df), len(KLINE_ARRAY_COLUMNS)), dtype=np.float64, order="F")
+    for i, name in enumerate(KLINE_ARRAY_COLUMNS):
+        if name == "time":
+            arr[:, i] = df.index.as_unit("ms").asi8
+        else:
+            arr[:, i] = df[_YF_COLUMN_NAMES[name]].to_numpy(dtype=np.float64)
+    return arr
+
+
+_YAHOO_MAPPING = {
+    "GOLD": "GC=F",
+    "SILVER": "SI=F",
+    "OIL": "CL=F", # WTI Crude
+    "BRENT": "BZ=F",
+    "EURUSD": "EURUSD=X",
+    "GBPUSD": "GBPUSD=X",
+    "SP500": "^GSPC",
+    "NASDAQ": "^IXIC",
+    "BTC": "BTC-USD",
+    "ETH": "ETH-USD",
+    "XAUT": "GC=F", # Fallback ouro se não achar token
+}
+
+
+def _map_to_yahoo(symbol: str) -> Optional[str]:
+    # Se já for um ticker conhecido do YF
+    if "=" in symbol or "^" in symbol:
+        return symbol
         
-        # Se já for um ticker conhecido do YF
-        if "=" in symbol or "^" in symbol:
-            return symbol
-            
-        # Tenta mapear
-        clean_sym = symbol.replace("-USDT", "").replace("USDT", "").upper()
-        return mapping.get(clean_sym)
+    # Tenta mapear
+    clean_sym = symbol.replace("-USDT", "").replace("USDT", "")
+    return _YAHOO_MAPPING.get(clean_sym)
+
 
+@lru_cache(maxsize=4096)
+def _sym_triple(symbol: str) -> Tuple[str, str, Optional[str]]:
+    """
+    Normaliza um símbolo para os formatos de cada fonte (BingX, CCXT, Yahoo).
+    Resultado cacheado: o mesmo símbolo é reescrito apenas uma vez.
+    """
+    upper = symbol.upper()
+    
+    # BingX usa formato BTC-USDT
+    bingx_symbol = upper.replace("/", "-")
+    if "-" not in bingx_symbol:
+        bingx_symbol = bingx_symbol.replace("USDT", "-USDT")
+    
+    # CCXT usa formato BTC/USDT
+    ccxt_symbol = upper.replace("-", "/")
+    if "/" not in ccxt_symbol:
+        ccxt_symbol = ccxt_symbol.replace("USDT", "/USDT")
+    
+    return bingx_symbol, ccxt_symbol, _map_to_yahoo(upper)
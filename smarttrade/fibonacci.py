@@ -7,6 +7,7 @@ Usado em conjunto com Smart Money Concepts para identificar alvos e zonas de int
 from __future__ import annotations
 
 import logging
+from collections import deque
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 
@@ -20,7 +21,7 @@ FIBO_RETRACEMENT_LEVELS = [0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0]
 FIBO_EXTENSION_LEVELS = [0.0, 0.618, 1.0, 1.272, 1.414, 1.618, 2.0, 2.618, 3.618, 4.236]
 
 
-@dataclass
+@dataclass(slots=True)
 class FibonacciLevel:
     """Representa um nível de Fibonacci"""
     ratio: float
@@ -35,7 +36,7 @@ class FibonacciLevel:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class FibonacciRetracement:
     """Retração de Fibonacci entre dois pontos"""
     swing_high: float
@@ -53,7 +54,7 @@ class FibonacciRetracement:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class FibonacciExtension:
     """Extensão de Fibonacci para projeção de alvos"""
     point_a: float  # Início do movimento
@@ -360,3 +361,83 @@ class FibonacciAnalyzer:
         logger.info(f"Found {len(confluences)} Fibonacci confluence zones")
         
         return confluences
+
+
+class FibonacciStreamer:
+    """
+    Mantém swing high/low de forma incremental para klines em streaming.
+    
+    Equivalente a `FibonacciAnalyzer.calculate_auto_retracements`, mas em vez de
+    recalcular max/min sobre toda a janela a cada candle, usa deques monotônicos
+    (custo O(1) amortizado por `push`).
+    """
+    
+    def __init__(
+        self,
+        lookback_period: int = 50,
+        analyzer: Optional[FibonacciAnalyzer] = None,
+        trend_window: int = 10
+    ):
+        """
+        Args:
+            lookback_period: Número de candles da janela de swing
+            analyzer: FibonacciAnalyzer usado para calcular os níveis
+            trend_window: Número de closes usados para definir a direção
+        """
+        self.lookback_period = lookback_period
+        self.analyzer = analyzer or FibonacciAnalyzer()
+        self._count = 0
+        # Deques monotônicos de (índice, preço): decrescente para highs, crescente para lows
+        self._highs: deque = deque()
+        self._lows: deque = deque()
+        self._closes: deque = deque(maxlen=min(trend_window, lookback_period))
+    
+    def push(self, bar: Dict[str, Any]) -> None:
+        """Adiciona um novo candle à janela"""
+        idx = self._count
+        self._count += 1
+        high = float(bar["high"])
+        low = float(bar["low"])
+        
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((idx, high))
+        
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((idx, low))
+        
+        # Descarta candles que saíram da janela
+        expired = idx - self.lookback_period
+        while self._highs[0][0] <= expired:
+            self._highs.popleft()
+        while self._lows[0][0] <= expired:
+            self._lows.popleft()
+        
+        self._closes.append(float(bar["close"]))
+    
+    @property
+    def ready(self) -> bool:
+        """True quando a janela já tem `lookback_period` candles"""
+        return self._count >= self.lookback_period
+    
+    @property
+    def swing_high(self) -> Optional[float]:
+        return self._highs[0][1] if self._highs else None
+    
+    @property
+    def swing_low(self) -> Optional[float]:
+        return self._lows[0][1] if self._lows else None
+    
+    def snapshot(self) -> Optional[FibonacciRetracement]:
+        """
+        Retorna a retração de Fibonacci para a janela atual.
+        
+        Returns:
+            FibonacciRetracement ou None se ainda não houver dados suficientes
+        """
+        if not self.ready:
+            return None
+        
+        direction = "uptrend" if self._closes[-1] > self._closes[0] else "downtrend"
+        return self.analyzer.calculate_retracement(self.swing_high, self.swing_low, direction)
@@ -0,0 +1,68 @@
+"""
+Layout colunar (SoA) para klines.
+
+Representa uma série de candles como um único `np.ndarray` float64 de
+shape (N, 6), com as colunas na ordem de `KLINE_ARRAY_COLUMNS`. Evita
+acessos a dict e conversões `float()` por candle nos caminhos quentes.
+
+O array é alocado em ordem de coluna (Fortran), de modo que `arr[:, CLOSE]`
+é uma view contígua e pode ser passada a kernels NumPy/Numba sem cópia.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+
+# Ordem das colunas no array
+KLINE_ARRAY_COLUMNS = ("open", "high", "low", "close", "volume", "time")
+OPEN, HIGH, LOW, CLOSE, VOLUME, TIME = range(len(KLINE_ARRAY_COLUMNS))
+
+KlinesLike = Union[Sequence[Dict[str, Any]], np.ndarray]
+
+
+def klines_to_array(klines: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    Converte lista de klines (dicts) para array (N, 6) float64.
+    
+    Aceita valores numéricos ou strings numéricas (formato da BingX).
+    Volume ausente é tratado como 0.
+    """
+    n = len(klines)
+    arr = np.empty((n, len(KLINE_ARRAY_COLUMNS)), dtype=np.float64, order="F")
+    for col, name in enumerate(KLINE_ARRAY_COLUMNS):
+        if name == "volume":
+            values = (k.get("volume", 0) for k in klines)
+        else:
+            values = (k[name] for k in klines)
+        arr[:, col] = np.fromiter(values, dtype=np.float64, count=n)
+    return arr
+
+
+def array_to_klines(arr: np.ndarray) -> List[Dict[str, Any]]:
+    """Converte array (N, 6) de volta para lista de klines (dicts)"""
+    return [
+        {
+            "time": int(t),
+            "open": o,
+            "high": h,
+            "low": l,
+            "close": c,
+            "volume": v,
+        }
+        for o, h, l, c, v, t in arr.tolist()
+    ]
+
+
+def as_kline_array(klines: KlinesLike) -> np.ndarray:
+    """Retorna `klines` como array (N, 6), convertendo apenas se necessário"""
+    if isinstance(klines, np.ndarray):
+        return klines
+    return klines_to_array(klines)
+
+
+def as_kline_list(klines: KlinesLike) -> List[Dict[str, Any]]:
+    """Retorna `klines` como lista de dicts, convertendo apenas se necessário"""
+    if isinstance(klines, np.ndarray):
+        return array_to_klines(klines)
+    return klines if isinstance(klines, list) else list(klines)
@@ -4,8 +4,15 @@ from typing import Any
 
 from .bingx_client import BingXClient
 
+try:
+    import orjson
+except ImportError:  # orjson é opcional; usa json da stdlib como fallback
+    orjson = None
+
 
 def pretty(obj: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode()
     return json.dumps(obj, ensure_ascii=False, indent=2)
 
 
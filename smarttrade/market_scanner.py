@@ -10,15 +10,101 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
 
+import numpy as np
+
+from ._njit import njit, NUMBA_AVAILABLE
 from .data_provider import DataProvider
+from .kline_array import CLOSE
 from .multi_timeframe_analysis import MultiTimeframeAnalyzer, TimeframeAnalysis
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+
+def _smooth_last(seed: float, values: np.ndarray, alpha: float) -> float:
+    """
+    Último valor da recorrência s[i] = alpha * x[i] + (1 - alpha) * s[i-1].
+    
+    Forma fechada vetorizada: s[n] = (1-alpha)^n * seed + alpha * sum((1-alpha)^(n-1-j) * x[j])
+    """
+    n = values.shape[0]
+    if n == 0:
+        return float(seed)
+    decay = 1.0 - alpha
+    weights = decay ** np.arange(n - 1, -1, -1, dtype=np.float64)
+    return float(seed * decay ** n + alpha * np.dot(weights, values))
+
+
+@njit(cache=True)
+def _trend_features_loop(prices: np.ndarray) -> Tuple[float, float, float]:
+    """
+    EMA50, EMA200 e RSI14 do último valor em uma única passada sobre `prices`.
+    Os períodos são constantes no kernel (especializado para o scanner).
+    
+    Mesmas convenções de `_calculate_ema` (0.0 sem dados suficientes) e
+    `_calculate_rsi` (50.0 sem dados suficientes).
+    """
+    n = prices.shape[0]
+    k50 = 2.0 / 51.0
+    k200 = 2.0 / 201.0
+    ema50 = 0.0
+    ema200 = 0.0
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(n):
+        price = prices[i]
+        
+        if i < 50:
+            ema50 += price
+            if i == 49:
+                ema50 /= 50
+        else:
+            ema50 = price * k50 + ema50 * (1.0 - k50)
+        
+        if i < 200:
+            ema200 += price
+            if i == 199:
+                ema200 /= 200
+        else:
+            ema200 = price * k200 + ema200 * (1.0 - k200)
+        
+        if i > 0:
+            d = price - prices[i - 1]
+            gain = d if d > 0 else 0.0
+            loss = -d if d < 0 else 0.0
+            if i <= 14:
+                avg_gain += gain
+                avg_loss += loss
+                if i == 14:
+                    avg_gain /= 14
+                    avg_loss /= 14
+            else:
+                avg_gain = (avg_gain * 13 + gain) / 14
+                avg_loss = (avg_loss * 13 + loss) / 14
+    
+    if n < 50:
+        ema50 = 0.0
+    if n < 200:
+        ema200 = 0.0
+    if n < 15:
+        rsi = 50.0
+    elif avg_loss == 0:
+        rsi = 100.0
+    else:
+        rsi = 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+    return ema50, ema200, rsi
+
+
+if NUMBA_AVAILABLE:
+    # Aquece o JIT no import para não pagar a compilação no primeiro scan
+    _warmup = np.linspace(1.0, 2.0, 200)
+    _trend_features_loop(_warmup)
+    del _warmup
+
+
+@dataclass(slots=True)
 class AssetScore:
     symbol: str
     price: float
@@ -55,37 +141,33 @@ class AssetScore:
             return "Evitar"
 
     @staticmethod
-    def _calculate_ema(prices: List[float], period: int) -> float:
+    def _calculate_ema(prices: Union[Sequence[float], np.ndarray], period: int) -> float:
         """Calcula EMA simples do último valor"""
-        if not prices or len(prices) < period:
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if prices.size == 0 or prices.size < period:
             return 0.0
         
         k = 2 / (period + 1)
-        ema = sum(prices[:period]) / period # SMA inicial
+        ema = prices[:period].mean() # SMA inicial
         
-        for price in prices[period:]:
-            ema = (price * k) + (ema * (1 - k))
-            
-        return ema
+        return _smooth_last(ema, prices[period:], k)
 
     @staticmethod
-    def _calculate_rsi(prices: List[float], period: int = 14) -> float:
+    def _calculate_rsi(prices: Union[Sequence[float], np.ndarray], period: int = 14) -> float:
         """Calcula RSI do último valor"""
-        if not prices or len(prices) < period + 1:
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if prices.size == 0 or prices.size < period + 1:
             return 50.0
-            
-        deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
         
-        gains = [d if d > 0 else 0 for d in deltas]
-        losses = [-d if d < 0 else 0 for d in deltas]
+        deltas = np.diff(prices)
         
-        avg_gain = sum(gains[:period]) / period
-        avg_loss = sum(losses[:period]) / period
+        gains = np.maximum(deltas, 0.0)
+        losses = np.maximum(-deltas, 0.0)
         
-        # Wilder's Smoothing
-        for i in range(period, len(deltas)):
-            avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-            avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+        # Wilder's Smoothing (RMA = EMA com alpha = 1/period)
+        alpha = 1.0 / period
+        avg_gain = _smooth_last(gains[:period].mean(), gains[period:], alpha)
+        avg_loss = _smooth_last(losses[:period].mean(), losses[period:], alpha)
             
         if avg_loss == 0:
             return 100.0
@@ -93,6 +175,58 @@ class AssetScore:
         rs = avg_gain / avg_loss
         return 100 - (100 / (1 + rs))
 
+    @staticmethod
+    def _calculate_trend_features(prices: Union[Sequence[float], np.ndarray]) -> Tuple[float, float, float]:
+        """Calcula (EMA50, EMA200, RSI14) do último valor"""
+        prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if NUMBA_AVAILABLE:
+            return _trend_features_loop(prices)
+        return (
+            AssetScore._calculate_ema(prices, 50),
+            AssetScore._calculate_ema(prices, 200),
+            AssetScore._calculate_rsi(prices, 14),
+        )
+
+# DataProvider compartilhado entre scans: reaproveita pool HTTP, sessão do
+# Yahoo e cliente CCXT em vez de recriá-los a cada chamada.
+_DEFAULT_PROVIDER: Optional[DataProvider] = None
+_DEFAULT_PROVIDER_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _release_provider(provider: DataProvider, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """
+    Fecha o DataProvider compartilhado de um loop anterior.
+    
+    Pool de threads e sessão do Yahoo são liberados na hora; o cliente CCXT
+    só pode ser fechado no próprio loop, então é agendado lá se ele ainda roda.
+    """
+    provider.close_sync()
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(provider.ccxt_binance.close(), loop)
+        logger.info("Replaced shared DataProvider from another event loop; closing it there")
+    else:
+        logger.warning(
+            "Replaced shared DataProvider whose event loop is gone; "
+            "its CCXT session could not be closed"
+        )
+
+
+async def _get_default_provider(bingx_client=None) -> DataProvider:
+    """Retorna (criando sob demanda) o DataProvider compartilhado."""
+    global _DEFAULT_PROVIDER, _DEFAULT_PROVIDER_LOOP
+    loop = asyncio.get_running_loop()
+    # A sessão aiohttp do CCXT fica presa ao loop em que foi criada;
+    # a criação não tem await, então não há corrida dentro do mesmo loop
+    if _DEFAULT_PROVIDER is None or _DEFAULT_PROVIDER_LOOP is not loop:
+        if _DEFAULT_PROVIDER is not None:
+            _release_provider(_DEFAULT_PROVIDER, _DEFAULT_PROVIDER_LOOP)
+        _DEFAULT_PROVIDER = DataProvider(bingx_client=bingx_client)
+        _DEFAULT_PROVIDER_LOOP = loop
+    elif bingx_client is not None and _DEFAULT_PROVIDER.bingx_client is None:
+        _DEFAULT_PROVIDER.bingx_client = bingx_client
+    return _DEFAULT_PROVIDER
+
+
 class MarketScanner:
     """Scanner de mercado para análise multi-ativo"""
     
@@ -116,10 +250,30 @@ class MarketScanner:
         "SP500", "NASDAQ", "EURUSD", "GBPUSD" # Indices/Forex
     ]
     
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 8):
         self.analyzer = MultiTimeframeAnalyzer()
-        # DataProvider será injetado ou instanciado sob demanda
+        # Máximo de ativos analisados simultaneamente
+        self.max_concurrency = max_concurrency
+        # DataProvider será injetado ou obtido do provider compartilhado
+
+    @staticmethod
+    async def get_provider(bingx_client=None) -> DataProvider:
+        """
+        DataProvider compartilhado pelos scans do loop atual.
         
+        Args:
+            bingx_client: Client BingX a associar, se o provider ainda não tiver um
+        """
+        return await _get_default_provider(bingx_client=bingx_client)
+
+    @staticmethod
+    async def shutdown() -> None:
+        """Fecha o DataProvider compartilhado (chamar no teardown da aplicação)."""
+        global _DEFAULT_PROVIDER, _DEFAULT_PROVIDER_LOOP
+        provider, _DEFAULT_PROVIDER, _DEFAULT_PROVIDER_LOOP = _DEFAULT_PROVIDER, None, None
+        if provider is not None:
+            await provider.close()
+
     async def scan_market(
         self,
         symbols: Optional[List[str]] = None,
@@ -134,47 +288,43 @@ class MarketScanner:
         target_symbols = symbols or self.TOP_ASSETS
         target_timeframes = timeframes or ["15m"]
         
-        # Se não foi passado provider, cria um temporário (mas ideal é receber do app)
-        local_provider = False
+        # Se não foi passado provider, usa o compartilhado (sem bingx: só yfinance/ccxt)
         if not data_provider:
-            # Tenta usar o client_fetch_func como fallback ou cria novo provider
-            # Mas o provider precisa do bingx_client para ser completo.
-            # Vamos assumir que quem chama (app.py) vai passar o provider.
-            # Se não, criamos um básico sem bingx (só yfinance/ccxt)
-            data_provider = DataProvider()
-            local_provider = True
+            data_provider = await _get_default_provider()
             
         logger.info(f"Starting market scan for {len(target_symbols)} assets on {target_timeframes}")
         
         results = []
         
-        # Processa em chunks para não sobrecarregar
-        # Reduzido chunk size para evitar timeouts e rate limits
-        chunk_size = 3
-        for i in range(0, len(target_symbols), chunk_size):
-            chunk = target_symbols[i:i+chunk_size]
-            tasks = []
-            
-            for symbol in chunk:
-                tasks.append(self._analyze_asset_multi_tf(
-                    symbol, target_timeframes, limit_candles, data_provider
-                ))
-            
-            # Executa chunk em paralelo
-            chunk_results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for res in chunk_results:
-                if isinstance(res, AssetScore):
-                    results.append(res)
-                elif isinstance(res, Exception):
-                    # Loga mas não para o scan
-                    logger.warning(f"Error scanning asset in chunk: {res}")
-            
-            # Pequena pausa entre chunks
-            await asyncio.sleep(0.2)
-            
-        if local_provider:
-            await data_provider.close()
+        # Busca todos os pares (ativo, timeframe) de uma vez: o provider agrupa
+        # por fonte (lote único no Yahoo) e limita a concorrência do resto
+        pairs = [(symbol, tf) for symbol in target_symbols for tf in target_timeframes]
+        fetched = await data_provider.fetch_klines_many(
+            pairs, limit_candles, max_concurrency=self.max_concurrency
+        )
+        prefetched = dict(zip(pairs, fetched))
+        
+        # Limita concorrência via semáforo
+        # sem pausas fixas: ativos rápidos não esperam pelos lentos
+        sem = asyncio.Semaphore(self.max_concurrency)
+        
+        async def _bounded(symbol: str) -> AssetScore:
+            async with sem:
+                return await self._analyze_asset_multi_tf(
+                    symbol, target_timeframes, limit_candles, data_provider, prefetched
+                )
+        
+        scan_results = await asyncio.gather(
+            *[_bounded(symbol) for symbol in target_symbols],
+            return_exceptions=True
+        )
+        
+        for res in scan_results:
+            if isinstance(res, AssetScore):
+                results.append(res)
+            elif isinstance(res, Exception):
+                # Loga mas não para o scan
+                logger.warning(f"Error scanning asset: {res}")
             
         # Ordena por score SMC decrescente
         results.sort(key=lambda x: x.smc_score, reverse=True)
@@ -186,20 +336,29 @@ class MarketScanner:
         symbol: str,
         timeframes: List[str],
         limit: int,
-        provider: DataProvider
+        provider: DataProvider,
+        prefetched: Optional[Dict[Tuple[str, str], Any]] = None
     ) -> AssetScore:
         """Analisa ativo em múltiplos timeframes e retorna o melhor"""
         best_score = None
+        prefetched = prefetched or {}
+        
+        # Timeframes são independentes: busca + análise rodam concorrentemente
+        scores = await asyncio.gather(
+            *[
+                self._analyze_asset(symbol, tf, limit, provider, prefetched.get((symbol, tf)))
+                for tf in timeframes
+            ],
+            return_exceptions=True
+        )
         
-        for tf in timeframes:
-            try:
-                score = await self._analyze_asset(symbol, tf, limit, provider)
-                if best_score is None or score.smc_score > best_score.smc_score:
-                    best_score = score
-            except Exception as e:
-                # Se falhar um timeframe, tenta os outros
-                logger.debug(f"Failed {symbol} on {tf}: {e}")
+        for tf, score in zip(timeframes, scores):
+            if isinstance(score, Exception):
+                # Se falhar um timeframe, usa os outros
+                logger.debug(f"Failed {symbol} on {tf}: {score}")
                 continue
+            if best_score is None or score.smc_score > best_score.smc_score:
+                best_score = score
                 
         if best_score:
             return best_score
@@ -211,33 +370,41 @@ class MarketScanner:
         symbol: str,
         timeframe: str,
         limit: int,
-        provider: DataProvider
+        provider: DataProvider,
+        klines: Optional[Union[np.ndarray, Exception]] = None
     ) -> AssetScore:
-        """Analisa um único ativo em um timeframe"""
+        """Analisa um único ativo em um timeframe (usa `klines` se já buscados)"""
         try:
-            # 1. Busca dados via DataProvider (abstrai a fonte)
-            klines = await provider.fetch_klines(symbol, timeframe, limit)
+            # 1. Busca dados via DataProvider (abstrai a fonte) em layout SoA (N, 6)
+            if isinstance(klines, Exception):
+                raise klines
+            if klines is None:
+                klines = await provider.fetch_klines_np(symbol, timeframe, limit)
             
-            if not klines or len(klines) < 50:
+            if len(klines) < 50:
                 raise ValueError(f"Insufficient data for {symbol}")
             
-            # Dados atuais estimados do último candle
-            last_candle = klines[-1]
-            current_price = float(last_candle["close"])
+            # Preços de fechamento para indicadores (view da coluna, sem cópia)
+            closes = klines[:, CLOSE]
             
-            # Extrai preços de fechamento para indicadores
-            closes = [float(k["close"]) for k in klines]
+            # Dados atuais estimados do último candle
+            current_price = float(closes[-1])
             
             # 2. Executa análise técnica rápida
-            analysis: TimeframeAnalysis = await asyncio.to_thread(
-                self.analyzer.analyze_timeframe,
+            # Cache hit (mesmo candle) é O(1): evita o despacho para thread.
+            # Em cache miss a análise leva dezenas de ms (CPU-bound), então
+            # continua fora do event loop.
+            analysis: Optional[TimeframeAnalysis] = self.analyzer.get_cached_analysis(
                 symbol, timeframe, klines
             )
+            if analysis is None:
+                analysis = await asyncio.to_thread(
+                    self.analyzer.analyze_timeframe,
+                    symbol, timeframe, klines
+                )
             
             # 3. Calcula Indicadores de Tendência e Momentum
-            ema_50 = AssetScore._calculate_ema(closes, 50)
-            ema_200 = AssetScore._calculate_ema(closes, 200)
-            rsi = AssetScore._calculate_rsi(closes, 14)
+            ema_50, ema_200, rsi = AssetScore._calculate_trend_features(closes)
             
             # Determina Tendência
             trend = "neutral"
@@ -8,17 +8,26 @@ Analisa múltiplos timeframes para descobrir:
 """
 from __future__ import annotations
 
+import heapq
 import math
 import logging
+import threading
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from .backtesting import BacktestEngine, BacktestResult
-from .smc_indicators import SMCAnalyzer
+from .kline_array import KlinesLike, TIME
+from .smc_indicators import SMCAnalyzer, SMCContext
 
 logger = logging.getLogger(__name__)
 
+# Pool compartilhado para rodar os backtests das estratégias em paralelo
+_STRATEGY_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="strategy")
+
 
 def safe_float(value: float, default: float = 0.0) -> float:
     """Converte float para valor JSON-safe (trata inf e nan)"""
@@ -169,9 +178,31 @@ class MultiTimeframeAnalyzer:
         "CISD": "cisd",
     }
     
-    def __init__(self):
-        """Inicializa o analisador multi-timeframe"""
+    def __init__(self, cache_size: int = 512):
+        """
+        Inicializa o analisador multi-timeframe.
+        
+        Args:
+            cache_size: Máximo de análises memoizadas (LRU)
+        """
         self.backtest_engine = BacktestEngine()
+        # Cache LRU de analyze_timeframe por (symbol, timeframe, n_candles, último candle, RR)
+        self.cache_size = cache_size
+        self._analysis_cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    @staticmethod
+    def _cache_key(
+        symbol: str, timeframe: str, klines_data: KlinesLike, risk_reward: float
+    ) -> Optional[Tuple[Any, ...]]:
+        """Chave de memoização baseada no timestamp do último candle"""
+        if len(klines_data) == 0:
+            return None
+        if isinstance(klines_data, np.ndarray):
+            last_time = int(klines_data[-1, TIME])
+        else:
+            last_time = int(klines_data[-1]["time"])
+        return (symbol, timeframe, len(klines_data), last_time, risk_reward)
     
     def calculate_indicator_score(self, result: BacktestResult) -> float:
         """
@@ -209,50 +240,115 @@ class MultiTimeframeAnalyzer:
         
         return min(total_score, 100.0)
     
+    def _get_cached(self, cache_key: Optional[Tuple[Any, ...]]) -> Optional[TimeframeAnalysis]:
+        """Busca análise no cache LRU (None se ausente)"""
+        if cache_key is None:
+            return None
+        with self._cache_lock:
+            cached = self._analysis_cache.get(cache_key)
+            if cached is not None:
+                self._analysis_cache.move_to_end(cache_key)
+            return cached
+    
+    def get_cached_analysis(
+        self,
+        symbol: str,
+        timeframe: str,
+        klines_data: KlinesLike,
+        risk_reward: float = 2.0,
+    ) -> Optional[TimeframeAnalysis]:
+        """
+        Retorna a análise memoizada de `analyze_timeframe` sem recalcular.
+        
+        Permite que chamadores assíncronos evitem o despacho para thread
+        quando o resultado já está em cache.
+        """
+        return self._get_cached(self._cache_key(symbol, timeframe, klines_data, risk_reward))
+    
+    def _run_strategy(
+        self,
+        strategy_method: str,
+        klines_data: KlinesLike,
+        symbol: str,
+        timeframe: str,
+        risk_reward: float,
+        ctx: Optional[SMCContext] = None,
+    ) -> Optional[BacktestResult]:
+        """Executa o backtest de uma estratégia (None se desconhecida)"""
+        if strategy_method == "orderblock":
+            return self.backtest_engine.test_orderblock_strategy(
+                klines_data, symbol, timeframe, risk_reward, ctx=ctx
+            )
+        elif strategy_method == "fvg":
+            return self.backtest_engine.test_fvg_strategy(
+                klines_data, symbol, timeframe, risk_reward, ctx=ctx
+            )
+        elif strategy_method == "fibonacci":
+            return self.backtest_engine.test_fibonacci_strategy(
+                klines_data, symbol, timeframe, risk_reward, ctx=ctx
+            )
+        elif strategy_method == "cisd":
+            return self.backtest_engine.test_cisd_strategy(
+                klines_data, symbol, timeframe, risk_reward, ctx=ctx
+            )
+        return None
+    
     def analyze_timeframe(
         self,
         symbol: str,
         timeframe: str,
-        klines_data: List[Dict[str, Any]],
+        klines_data: KlinesLike,
         risk_reward: float = 2.0,
     ) -> TimeframeAnalysis:
         """
         Analisa um timeframe específico testando todos os indicadores.
         
+        O resultado é memoizado pelo timestamp do último candle: novos scans
+        dentro do mesmo candle retornam a análise em cache.
+        
         Args:
             symbol: Par de negociação
             timeframe: Timeframe a analisar
-            klines_data: Dados históricos
+            klines_data: Dados históricos (lista de dicts ou array SoA (N, 6))
             risk_reward: Razão risco/recompensa
         
         Returns:
             TimeframeAnalysis com ranking de indicadores
         """
+        cache_key = self._cache_key(symbol, timeframe, klines_data, risk_reward)
+        cached = self._get_cached(cache_key)
+        if cached is not None:
+            return cached
+        
         logger.info(f"Analyzing timeframe {timeframe} for {symbol}")
         
         indicator_rankings = []
         
-        # Testa cada estratégia/indicador
-        for indicator_name, strategy_method in self.STRATEGIES.items():
+        # Parse + análise SMC uma única vez, compartilhados pelas estratégias
+        try:
+            ctx = self.backtest_engine.smc_analyzer.build_context(klines_data)
+        except Exception as e:
+            # Cada estratégia refaz o parse e reporta o próprio erro
+            logger.warning(f"Could not build SMC context for {symbol} {timeframe}: {e}")
+            ctx = None
+        
+        # Executa os backtests de cada estratégia/indicador em paralelo
+        futures = {
+            indicator_name: _STRATEGY_EXECUTOR.submit(
+                self._run_strategy, strategy_method, klines_data, symbol, timeframe, risk_reward, ctx
+            )
+            for indicator_name, strategy_method in self.STRATEGIES.items()
+        }
+        
+        # Acumuladores para score total e taxa de respeito (uma única passada)
+        score_sum = 0.0
+        weighted_wr_sum = 0.0
+        
+        # Coleta na ordem de STRATEGIES para manter o ranking determinístico
+        for indicator_name, future in futures.items():
             try:
-                # Executa backtest
-                if strategy_method == "orderblock":
-                    result = self.backtest_engine.test_orderblock_strategy(
-                        klines_data, symbol, timeframe, risk_reward
-                    )
-                elif strategy_method == "fvg":
-                    result = self.backtest_engine.test_fvg_strategy(
-                        klines_data, symbol, timeframe, risk_reward
-                    )
-                elif strategy_method == "fibonacci":
-                    result = self.backtest_engine.test_fibonacci_strategy(
-                        klines_data, symbol, timeframe, risk_reward
-                    )
-                elif strategy_method == "cisd":
-                    result = self.backtest_engine.test_cisd_strategy(
-                        klines_data, symbol, timeframe, risk_reward
-                    )
-                else:
+                result = future.result()
+                if result is None:
                     continue
                 
                 # Calcula score
@@ -271,6 +367,8 @@ class MultiTimeframeAnalyzer:
                 )
                 
                 indicator_rankings.append(ranking)
+                score_sum += score
+                weighted_wr_sum += result.win_rate * score
                 
                 logger.info(
                     f"{indicator_name} on {timeframe}: "
@@ -285,24 +383,29 @@ class MultiTimeframeAnalyzer:
         indicator_rankings.sort(key=lambda x: x.score, reverse=True)
         
         # Calcula score total do timeframe (média dos indicadores)
-        total_score = sum(ind.score for ind in indicator_rankings) / len(indicator_rankings) if indicator_rankings else 0
+        total_score = score_sum / len(indicator_rankings) if indicator_rankings else 0
         
         # Taxa de respeito = média dos win rates ponderada pelos scores
-        if indicator_rankings:
-            weighted_wr = sum(ind.win_rate * ind.score for ind in indicator_rankings) / sum(ind.score for ind in indicator_rankings)
-            respect_rate = weighted_wr
-        else:
-            respect_rate = 0
+        respect_rate = weighted_wr_sum / score_sum if score_sum > 0 else 0
         
         best_indicator = indicator_rankings[0] if indicator_rankings else None
         
-        return TimeframeAnalysis(
+        analysis = TimeframeAnalysis(
             timeframe=timeframe,
             total_score=total_score,
             indicators=indicator_rankings,
             best_indicator=best_indicator,
             respect_rate=respect_rate,
         )
+        
+        if cache_key is not None:
+            with self._cache_lock:
+                self._analysis_cache[cache_key] = analysis
+                self._analysis_cache.move_to_end(cache_key)
+                while len(self._analysis_cache) > self.cache_size:
+                    self._analysis_cache.popitem(last=False)
+        
+        return analysis
     
     def analyze_all_timeframes(
         self,
@@ -342,8 +445,27 @@ class MultiTimeframeAnalyzer:
         best_timeframe = timeframe_analyses[0] if timeframe_analyses else None
         
         # Encontra melhor indicador geral (considerando todos os timeframes)
-        all_indicators.sort(key=lambda x: x.score, reverse=True)
-        best_overall_indicator = all_indicators[0] if all_indicators else None
+        # Só o topo é usado: heapq evita ordenar a lista inteira
+        top_overall = heapq.nlargest(1, all_indicators, key=lambda x: x.score)
+        best_overall_indicator = top_overall[0] if top_overall else None
+        
+        # Agrupa indicadores por nome em uma única passada
+        indicators_by_name: Dict[str, List[IndicatorRanking]] = defaultdict(list)
+        for ind in all_indicators:
+            indicators_by_name[ind.indicator_name].append(ind)
+        
+        # Melhor indicador geral + os próximos 2 de nomes diferentes
+        top_indicator_names: List[str] = []
+        if best_overall_indicator:
+            first_name = best_overall_indicator.indicator_name
+            top_indicator_names = [first_name] + [
+                i.indicator_name
+                for i in heapq.nlargest(
+                    2,
+                    (i for i in all_indicators if i.indicator_name != first_name),
+                    key=lambda x: x.score
+                )
+            ]
         
         # Gera summary
         summary = {
@@ -359,18 +481,14 @@ class MultiTimeframeAnalyzer:
                 "poor": [tf.timeframe for tf in timeframe_analyses if tf.respect_rate < 30],
             },
             "most_reliable_indicators": {
-                ind.indicator_name: {
+                name: {
                     "avg_score": round(
-                        sum(i.score for i in all_indicators if i.indicator_name == ind.indicator_name) / 
-                        len([i for i in all_indicators if i.indicator_name == ind.indicator_name]), 2
+                        sum(i.score for i in indicators_by_name[name]) / len(indicators_by_name[name]), 2
                     ),
-                    "best_timeframe": max(
-                        [i for i in all_indicators if i.indicator_name == ind.indicator_name],
-                        key=lambda x: x.score
-                    ).timeframe
+                    "best_timeframe": max(indicators_by_name[name], key=lambda x: x.score).timeframe,
                 }
-                for ind in [all_indicators[0]] + [i for i in all_indicators[1:] if i.indicator_name != all_indicators[0].indicator_name][:2]
-            } if all_indicators else {}
+                for name in top_indicator_names
+            }
         }
         
         logger.info(
@@ -9,16 +9,270 @@ Implementa múltiplos modelos de ML para predição de preços:
 """
 from __future__ import annotations
 
+import importlib.util
 import logging
+import threading
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Optional, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator, NamedTuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
+from functools import lru_cache, partial
+
+from ._njit import njit, NUMBA_AVAILABLE
+from .kline_array import KLINE_ARRAY_COLUMNS, TIME, KlinesLike
+
+try:
+    import bottleneck as bn  # janelas móveis O(n) em C (opcional)
+except ImportError:
+    bn = None
 
 logger = logging.getLogger(__name__)
 
+# Candles anteriores necessários para recalcular as features de um candle
+# novo (maior janela: ma99)
+_FEATURE_CONTEXT = 100
+# Linhas iniciais sem ma99 quando as features são calculadas do zero
+_FEATURE_WARMUP = 98
+
+# Razão std(diff)/std(nível) acima da qual a série é tratada como estacionária (d=0)
+_STATIONARY_VARIANCE_RATIO = 0.99
+
+# Pool compartilhado para rodar os modelos do ensemble em paralelo
+_ENSEMBLE_EXECUTOR = ThreadPoolExecutor(max_workers=3, thread_name_prefix="ensemble")
+
+
+@njit(cache=True, error_model="numpy")
+def _error_metrics_njit(actual: np.ndarray, predicted: np.ndarray) -> Tuple[float, float, float]:
+    """MAE, RMSE e MAPE (%) em uma única passada"""
+    n = actual.shape[0]
+    s_abs = 0.0
+    s_sq = 0.0
+    s_ape = 0.0
+    for i in range(n):
+        d = actual[i] - predicted[i]
+        s_abs += abs(d)
+        s_sq += d * d
+        s_ape += abs(d / actual[i])
+    return s_abs / n, np.sqrt(s_sq / n), s_ape / n * 100
+
+
+def _error_metrics(actual: np.ndarray, predicted: np.ndarray) -> Tuple[float, float, float]:
+    """MAE, RMSE e MAPE (%) entre valores reais e previstos"""
+    actual = np.ascontiguousarray(actual, dtype=np.float64)
+    predicted = np.ascontiguousarray(predicted, dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        return _error_metrics_njit(actual, predicted)
+    diff = actual - predicted
+    mae = np.mean(np.abs(diff))
+    rmse = np.sqrt(np.mean(diff ** 2))
+    mape = np.mean(np.abs(diff / actual)) * 100
+    return mae, rmse, mape
+
+
+@njit(cache=True)
+def _simple_ma_njit(
+    last_close: float, trend_factor: float, volatility: float,
+    last_timestamp: int, time_diff: int, periods_ahead: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Projeção do `simple_ma` em um único laço, sem os arrays temporários
+    de cada operação vetorizada.
+    
+    Returns:
+        (timestamps, preços, confiança, limite inferior, limite superior)
+    """
+    timestamps = np.empty(periods_ahead, dtype=np.int64)
+    prices = np.empty(periods_ahead)
+    confidence = np.empty(periods_ahead)
+    lower = np.empty(periods_ahead)
+    upper = np.empty(periods_ahead)
+    step_ms = time_diff * 1000
+    for i in range(periods_ahead):
+        k = i + 1
+        price = last_close * trend_factor ** float(k)
+        std_dev = price * volatility * np.sqrt(float(k))
+        timestamps[i] = last_timestamp + k * step_ms
+        prices[i] = price
+        confidence[i] = max(30, 70 - k * 3)
+        lower[i] = price - 2 * std_dev
+        upper[i] = price + 2 * std_dev
+    return timestamps, prices, confidence, lower, upper
+
+
+def _rsi_numpy(prices: np.ndarray, period: int) -> np.ndarray:
+    """
+    RSI com média simples de ganhos/perdas, para `_rolling_features_numpy`
+    (fallback sem numba do RSI de `_rolling_features_njit`): médias via
+    `_move_mean` (bottleneck ou janelas NumPy) no lugar de `where().rolling().mean()`.
+    """
+    delta = np.diff(prices, prepend=np.nan)
+    gain = _move_mean(np.where(delta > 0, delta, 0.0), period)
+    loss = _move_mean(np.where(delta < 0, -delta, 0.0), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + gain / loss))
+
+
+def _rolling_features_numpy(
+    close: np.ndarray, returns: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fallback sem numba de `_rolling_features_njit`: bottleneck se instalado,
+    senão janelas via `sliding_window_view`. A média de 20 serve ao Bollinger.
+    """
+    momentum = np.full_like(close, np.nan)
+    momentum[4:] = close[4:] - close[:-4]
+    return (
+        _move_std(returns, 20),
+        _move_mean(close, 7),
+        _move_mean(close, 25),
+        _move_mean(close, 99),
+        _move_mean(close, 20),
+        _move_std(close, 20),
+        _rsi_numpy(close, 14),
+        momentum,
+    )
+
+
+@njit(cache=True)
+def _rolling_features_njit(
+    close: np.ndarray, returns: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Features de janela móvel de `prepare_features` em uma única passada.
+    
+    Médias por soma móvel (entra/sai da janela) e desvios padrão (ddof=1)
+    por Welford com remoção, como o `rolling()` do pandas. `returns[0]` é NaN.
+    RSI(14) com média simples de ganhos/perdas (como `rolling(14).mean()`: a
+    primeira variação conta como 0, ganho e perda nulos geram NaN e perda nula
+    gera 100) e momentum(4) no mesmo laço.
+    
+    Returns:
+        (volatility, ma7, ma25, ma99, bb_middle, bb_std, rsi, momentum)
+    """
+    n = close.shape[0]
+    volatility = np.full(n, np.nan)
+    ma7 = np.full(n, np.nan)
+    ma25 = np.full(n, np.nan)
+    ma99 = np.full(n, np.nan)
+    bb_middle = np.full(n, np.nan)
+    bb_std = np.full(n, np.nan)
+    rsi = np.full(n, np.nan)
+    momentum = np.full(n, np.nan)
+    
+    s7 = 0.0
+    s20 = 0.0
+    s25 = 0.0
+    s99 = 0.0
+    # Welford (média e soma dos quadrados dos desvios) para close e retornos, janela 20
+    c_nobs = 0
+    c_mean = 0.0
+    c_ssq = 0.0
+    c_run = 0  # valores iguais consecutivos: janela constante tem std exatamente 0
+    r_nobs = 0
+    r_mean = 0.0
+    r_ssq = 0.0
+    r_run = 0
+    # RSI: somas de ganhos/perdas na janela de 14 e contadores de termos não nulos
+    rsi_period = 14
+    gain_sum = 0.0
+    loss_sum = 0.0
+    gain_ct = 0
+    loss_ct = 0
+    
+    for i in range(n):
+        x = close[i]
+        if i >= 4:
+            momentum[i] = x - close[i - 4]
+        
+        d = x - close[i - 1] if i > 0 else 0.0
+        if d > 0:
+            gain_sum += d
+            gain_ct += 1
+        elif d < 0:
+            loss_sum -= d
+            loss_ct += 1
+        j = i - rsi_period
+        if j >= 0:
+            d = close[j] - close[j - 1] if j > 0 else 0.0
+            if d > 0:
+                gain_sum -= d
+                gain_ct -= 1
+            elif d < 0:
+                loss_sum += d
+                loss_ct -= 1
+        if i >= rsi_period - 1:
+            avg_gain = gain_sum / rsi_period if gain_ct > 0 else 0.0
+            avg_loss = loss_sum / rsi_period if loss_ct > 0 else 0.0
+            if avg_loss == 0.0:
+                if avg_gain > 0.0:
+                    rsi[i] = 100.0
+            else:
+                rsi[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        
+        s7 += x
+        s20 += x
+        s25 += x
+        s99 += x
+        if i >= 7:
+            s7 -= close[i - 7]
+        if i >= 20:
+            s20 -= close[i - 20]
+        if i >= 25:
+            s25 -= close[i - 25]
+        if i >= 99:
+            s99 -= close[i - 99]
+        if i >= 6:
+            ma7[i] = s7 / 7
+        if i >= 19:
+            bb_middle[i] = s20 / 20
+        if i >= 24:
+            ma25[i] = s25 / 25
+        if i >= 98:
+            ma99[i] = s99 / 99
+        
+        c_nobs += 1
+        delta = x - c_mean
+        c_mean += delta / c_nobs
+        c_ssq += delta * (x - c_mean)
+        if i >= 20:
+            old = close[i - 20]
+            c_nobs -= 1
+            delta = old - c_mean
+            c_mean -= delta / c_nobs
+            c_ssq -= delta * (old - c_mean)
+        c_run = c_run + 1 if i > 0 and x == close[i - 1] else 1
+        if i >= 19:
+            if c_run >= 20 or c_ssq <= 0.0:
+                bb_std[i] = 0.0
+            else:
+                bb_std[i] = np.sqrt(c_ssq / 19)
+        
+        if i >= 1:
+            r = returns[i]
+            r_nobs += 1
+            delta = r - r_mean
+            r_mean += delta / r_nobs
+            r_ssq += delta * (r - r_mean)
+            if i >= 21:
+                old = returns[i - 20]
+                r_nobs -= 1
+                delta = old - r_mean
+                r_mean -= delta / r_nobs
+                r_ssq -= delta * (old - r_mean)
+            r_run = r_run + 1 if i > 1 and r == returns[i - 1] else 1
+            if i >= 20:
+                if r_run >= 20 or r_ssq <= 0.0:
+                    volatility[i] = 0.0
+                else:
+                    volatility[i] = np.sqrt(r_ssq / 19)
+    
+    return volatility, ma7, ma25, ma99, bb_middle, bb_std, rsi, momentum
+
 
 class PredictionModel(Enum):
     """Tipos de modelos disponíveis"""
@@ -36,7 +290,7 @@ class Trend(Enum):
     NEUTRAL = "neutral"
 
 
-@dataclass
+@dataclass(slots=True)
 class Prediction:
     """Resultado de uma predição"""
     timestamp: int  # Timestamp futuro
@@ -55,14 +309,125 @@ class Prediction:
         }
 
 
-@dataclass
+@dataclass(slots=True)
+class PredictionArray:
+    """
+    Predições em colunas (SoA): um ndarray por campo em vez de um
+    `Prediction` por período. Indexar materializa o `Prediction` sob demanda.
+    """
+    timestamps: np.ndarray  # int64 (ms)
+    prices: np.ndarray
+    confidence: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.prices)
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Prediction, "PredictionArray"]:
+        if isinstance(index, slice):
+            return PredictionArray(
+                timestamps=self.timestamps[index],
+                prices=self.prices[index],
+                confidence=self.confidence[index],
+                lower=self.lower[index],
+                upper=self.upper[index],
+            )
+        return Prediction(
+            timestamp=int(self.timestamps[index]),
+            predicted_price=float(self.prices[index]),
+            confidence=float(self.confidence[index]),
+            lower_bound=float(self.lower[index]),
+            upper_bound=float(self.upper[index]),
+        )
+    
+    def __iter__(self) -> Iterator[Prediction]:
+        for i in range(len(self)):
+            yield self[i]
+    
+    def to_dict(self) -> List[Dict[str, Any]]:
+        # Arredondamento vetorizado: uma chamada por coluna
+        return [
+            {
+                "timestamp": ts,
+                "predicted_price": price,
+                "confidence": confidence,
+                "lower_bound": lower,
+                "upper_bound": upper,
+            }
+            for ts, price, confidence, lower, upper in zip(
+                self.timestamps.tolist(),
+                np.round(self.prices, 2).tolist(),
+                np.round(self.confidence, 2).tolist(),
+                np.round(self.lower, 2).tolist(),
+                np.round(self.upper, 2).tolist(),
+            )
+        ]
+
+
+def _is_stationary(prices: np.ndarray) -> bool:
+    """
+    Teste de estacionariedade por razão de variâncias.
+    
+    Numa série estacionária as diferenças variam tanto quanto (ruído branco:
+    ~1.41x) o próprio nível; num passeio aleatório o nível varia muito mais.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.std(np.diff(prices)) / np.std(prices)
+    return bool(ratio > _STATIONARY_VARIANCE_RATIO)
+
+
+def _future_timestamps(last_timestamp: int, time_diff: int, periods_ahead: int) -> np.ndarray:
+    """Timestamps (ms) dos próximos `periods_ahead` candles"""
+    steps = np.arange(1, periods_ahead + 1, dtype=np.int64)
+    return last_timestamp + steps * (time_diff * 1000)
+
+
+class _TailContext(NamedTuple):
+    """Escalares do último candle usados pelos modelos"""
+    last_close: float
+    last_ma7: Optional[float]
+    last_ma25: Optional[float]
+    last_volatility: Optional[float]
+    last_timestamp: int  # ms
+    time_diff: int  # segundos entre candles (menor passo recente)
+
+
+def _tail_context(df: Union[pd.DataFrame, Dict[str, np.ndarray]]) -> _TailContext:
+    """
+    Extrai de uma vez os escalares do fim das features (sem `.iloc` por valor).
+    
+    Aceita o DataFrame de `prepare_features` ou as colunas de `prepare_features_np`.
+    """
+    times = np.asarray(df['time'], dtype='datetime64[ms]')[-5:].view(np.int64)
+    
+    def last(column: str) -> Optional[float]:
+        return np.asarray(df[column])[-1] if column in df else None
+    
+    # Intervalo em segundos inteiros: menor passo positivo entre os últimos
+    # candles (um buraco ou candle repetido no fim não distorce o horizonte)
+    steps = np.diff(times // 1000)
+    steps = steps[steps > 0]
+    time_diff = int(steps.min()) if steps.size else 3600
+    
+    return _TailContext(
+        last_close=last('close'),
+        last_ma7=last('ma7'),
+        last_ma25=last('ma25'),
+        last_volatility=last('volatility'),
+        last_timestamp=int(times[-1]),
+        time_diff=time_diff,
+    )
+
+
+@dataclass(slots=True)
 class PredictionResult:
     """Resultado completo de predição"""
     symbol: str
     timeframe: str
     model_used: str
     current_price: float
-    predictions: List[Prediction]
+    predictions: PredictionArray
     trend: Trend
     trend_strength: float  # 0-100%
     metrics: Dict[str, float]  # MAE, RMSE, R2, etc
@@ -82,7 +447,7 @@ class PredictionResult:
             "timeframe": self.timeframe,
             "model_used": self.model_used,
             "current_price": round(float(self.current_price), 2),
-            "predictions": [p.to_dict() for p in self.predictions],
+            "predictions": self.predictions.to_dict(),
             "trend": self.trend.value,
             "trend_strength": round(float(self.trend_strength), 2),
             "metrics": safe_metrics,
@@ -92,9 +457,9 @@ class PredictionResult:
     
     def _generate_summary(self) -> str:
         """Gera resumo textual da predição"""
-        last_pred = self.predictions[-1] if self.predictions else None
-        if not last_pred:
+        if not len(self.predictions):
             return "Sem previsões disponíveis"
+        last_pred = self.predictions[-1]
         
         change_pct = ((last_pred.predicted_price - self.current_price) / self.current_price) * 100
         direction = "alta" if change_pct > 0 else "baixa"
@@ -106,6 +471,191 @@ class PredictionResult:
         )
 
 
+@dataclass
+class _CachedModel:
+    """Modelo treinado em cache para uma série (símbolo, timeframe)"""
+    fitted: Any  # modelo treinado (Prophet, resultado ARIMA ou modelo Keras)
+    closes: np.ndarray  # fechamentos usados no treino (para detectar candles novos)
+    appended: int = 0  # candles acrescentados desde o último treino completo
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class _ProphetForecast(NamedTuple):
+    """Previsão de um fit do Prophet, reaproveitada enquanto o modelo é usado defasado"""
+    uncertainty_samples: int
+    timestamps: np.ndarray  # int64 (ms)
+    yhat: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+
+def _count_new_observations(cached: np.ndarray, closes: np.ndarray, max_new: int) -> Optional[int]:
+    """
+    Quantos candles novos `closes` tem em relação à série `cached`.
+    
+    Aceita tanto extensão (cached + novos) quanto janela deslizante (mesmo
+    tamanho, deslocada). Retorna None se as séries não forem continuação.
+    """
+    for k in range(0, max_new + 1):
+        m = len(closes) - k
+        if m <= 0 or not len(cached) <= len(closes) <= len(cached) + k:
+            continue
+        if np.array_equal(closes[:m], cached[len(cached) - m:]):
+            return k
+    return None
+
+
+def _prophet_init(model: Any) -> Dict[str, Any]:
+    """Parâmetros de um Prophet treinado para warm start (`fit(..., init=...)`)"""
+    res = {}
+    for pname in ['k', 'm', 'sigma_obs']:
+        res[pname] = model.params[pname][0][0]
+    for pname in ['delta', 'beta']:
+        res[pname] = model.params[pname][0]
+    return res
+
+
+def _within_scaler_range(scaler: Any, data: np.ndarray) -> bool:
+    """True se `data` cabe no intervalo visto pelo MinMaxScaler (saída em [0, 1])"""
+    return bool(np.all(data >= scaler.data_min_) and np.all(data <= scaler.data_max_))
+
+
+def _lstm_lookback(n_rows: int) -> int:
+    """Tamanho da janela de entrada da LSTM (até 60 períodos)"""
+    return min(60, n_rows // 2)
+
+
+class _ModelBackends(NamedTuple):
+    """Modelos disponíveis no ambiente e as classes já importadas"""
+    available: Tuple[str, ...]
+    prophet: Any
+    arima: Any
+
+
+@lru_cache(maxsize=1)
+def _detect_models() -> _ModelBackends:
+    """Detecta quais modelos estão disponíveis no ambiente (uma vez por processo)"""
+    available = ['simple_ma']  # Sempre disponível
+    prophet_cls = None
+    arima_cls = None
+    
+    try:
+        from prophet import Prophet
+        prophet_cls = Prophet
+        available.append('prophet')
+        logger.info("Prophet model available")
+    except ImportError:
+        logger.warning("Prophet not available. Install with: pip install prophet")
+    
+    # TensorFlow só é importado na primeira predição LSTM (_load_tensorflow)
+    if importlib.util.find_spec("tensorflow") is not None:
+        # Verificar também sklearn (necessário para LSTM)
+        try:
+            from sklearn.preprocessing import MinMaxScaler
+            available.append('lstm')
+            logger.info("TensorFlow + sklearn available for LSTM")
+        except ImportError:
+            logger.warning("sklearn not available (needed for LSTM). Install with: pip install scikit-learn")
+    else:
+        logger.warning("TensorFlow not available. Install with: pip install tensorflow")
+    
+    try:
+        from statsmodels.tsa.arima.model import ARIMA
+        arima_cls = ARIMA
+        available.append('arima')
+        logger.info("Statsmodels available for ARIMA")
+    except ImportError:
+        logger.warning("Statsmodels not available. Install with: pip install statsmodels")
+    
+    # Ensemble disponível se tivermos pelo menos 2 modelos além do simple_ma
+    if len(available) > 2:
+        available.append('ensemble')
+        logger.info("Ensemble model available (combining multiple models)")
+    
+    return _ModelBackends(available=tuple(available), prophet=prophet_cls, arima=arima_cls)
+
+
+@lru_cache(maxsize=1)
+def _load_tensorflow() -> Tuple[Any, Any, Any]:
+    """Importa TensorFlow/Keras na primeira predição LSTM (o import leva segundos)"""
+    import tensorflow as tf
+    from tensorflow import keras
+    from tensorflow.keras import layers
+    return tf, keras, layers
+
+
+def _make_lstm_rollout(tf: Any, model: Any, n_features: int, steps: int) -> Any:
+    """
+    Compila a predição autoregressiva de `steps` passos em um único grafo XLA.
+    
+    Cada passo prevê o close normalizado, descarta a linha mais antiga da
+    sequência e acrescenta [pred, 0, ..., 0] (mesma regra do loop em Python).
+    """
+    @tf.function(jit_compile=True)
+    def rollout(seq):
+        preds = tf.TensorArray(seq.dtype, size=steps)
+        first_col = tf.reshape(tf.one_hot(0, n_features, dtype=seq.dtype), (1, 1, n_features))
+        
+        def body(i, seq, preds):
+            pred = model(seq, training=False)[0, 0]
+            preds = preds.write(i, pred)
+            seq = tf.concat([seq[:, 1:, :], first_col * pred], axis=1)
+            return i + 1, seq, preds
+        
+        _, _, preds = tf.while_loop(lambda i, seq, preds: i < steps, body, (0, seq, preds))
+        return preds.stack()
+    
+    return rollout
+
+
+def _quantize_lstm(tf: Any, model: Any, data_scaled: np.ndarray, lookback: int) -> Optional[Any]:
+    """
+    Converte a rede treinada para TFLite com pesos int8 (quantização
+    calibrada com as primeiras janelas da série) e devolve o Interpreter.
+    
+    Returns:
+        Interpreter pronto para batch 1, ou None se a conversão falhar
+    """
+    n_windows = min(50, len(data_scaled) - lookback + 1)
+    
+    def representative_dataset():
+        for i in range(n_windows):
+            yield [data_scaled[i:i + lookback][np.newaxis].astype(np.float32)]
+    
+    try:
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        interpreter = tf.lite.Interpreter(model_content=converter.convert())
+        input_index = interpreter.get_input_details()[0]["index"]
+        interpreter.resize_tensor_input(input_index, [1, lookback, data_scaled.shape[1]])
+        interpreter.allocate_tensors()
+    except Exception as e:
+        logger.warning(f"TFLite int8 conversion failed, using compiled rollout: {e}")
+        return None
+    return interpreter
+
+
+def _tflite_rollout(interpreter: Any, seq: np.ndarray, steps: int) -> np.ndarray:
+    """
+    Predição autoregressiva de `steps` passos no Interpreter TFLite
+    (mesma regra de `_make_lstm_rollout`). Não é thread-safe: o chamador
+    deve segurar o lock do interpreter.
+    """
+    input_index = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+    seq = np.array(seq, dtype=np.float32)  # cópia (1, lookback, features)
+    preds = np.empty(steps, dtype=np.float32)
+    for i in range(steps):
+        interpreter.set_tensor(input_index, seq)
+        interpreter.invoke()
+        preds[i] = interpreter.get_tensor(output_index)[0, 0]
+        seq[0, :-1] = seq[0, 1:]
+        seq[0, -1] = 0.0
+        seq[0, -1, 0] = preds[i]
+    return preds
+
+
 class TimeSeriesPredictor:
     """
     Preditor de séries temporais com múltiplos modelos.
@@ -117,49 +667,92 @@ class TimeSeriesPredictor:
     - Ensemble: Combina múltiplos modelos
     """
     
-    def __init__(self):
-        """Inicializa o preditor"""
-        self.models_available = self._check_available_models()
-        logger.info(f"TimeSeriesPredictor initialized. Available models: {self.models_available}")
+    # Candles novos absorvidos sem retreino completo (ARIMA/LSTM)
+    MAX_INCREMENTAL_CANDLES = 10
+    # LSTM: além disso, a rede em cache é só ajustada (poucas épocas nas
+    # janelas mais recentes) enquanto a série continuar a do cache com menos
+    # que isto de candles novos
+    LSTM_FINETUNE_MAX_GROWTH = 20
+    # LSTM: ajustes seguidos antes de um treino completo (scaler reajustado)
+    LSTM_MAX_FINETUNES = 5
     
-    def _check_available_models(self) -> List[str]:
-        """Detecta quais modelos estão disponíveis no ambiente"""
-        available = ['simple_ma']  # Sempre disponível
-        
-        try:
-            import prophet
-            available.append('prophet')
-            logger.info("Prophet model available")
-        except ImportError:
-            logger.warning("Prophet not available. Install with: pip install prophet")
-        
-        try:
-            import tensorflow
-            # Verificar também sklearn (necessário para LSTM)
-            try:
-                from sklearn.preprocessing import MinMaxScaler
-                available.append('lstm')
-                logger.info("TensorFlow + sklearn available for LSTM")
-            except ImportError:
-                logger.warning("sklearn not available (needed for LSTM). Install with: pip install scikit-learn")
-        except ImportError:
-            logger.warning("TensorFlow not available. Install with: pip install tensorflow")
-        
-        try:
-            from statsmodels.tsa.arima.model import ARIMA
-            available.append('arima')
-            logger.info("Statsmodels available for ARIMA")
-        except ImportError:
-            logger.warning("Statsmodels not available. Install with: pip install statsmodels")
+    def __init__(
+        self,
+        cache_size: int = 64,
+        quantize_lstm: bool = True,
+        feature_dtype: type = np.float64
+    ):
+        """
+        Inicializa o preditor.
         
-        # Ensemble disponível se tivermos pelo menos 2 modelos além do simple_ma
-        if len(available) > 2:
-            available.append('ensemble')
-            logger.info("Ensemble model available (combining multiple models)")
+        Args:
+            cache_size: Máximo de modelos treinados mantidos em cache (LRU)
+            quantize_lstm: Inferência LSTM em TFLite int8 (cai no grafo XLA se a conversão falhar)
+            feature_dtype: dtype das colunas de features; `np.float32` reduz à
+                metade a memória do cache de features e das cópias por passo
+                do backtest (as janelas móveis continuam acumulando em float64)
+        """
+        self.quantize_lstm = quantize_lstm
+        self.feature_dtype = np.dtype(feature_dtype)
+        backends = _detect_models()
+        self.models_available = list(backends.available)
+        # Classes resolvidas na detecção; os predict_* não reimportam a cada chamada
+        self._Prophet = backends.prophet
+        self._ARIMA = backends.arima
+        # Modelos treinados por (modelo, símbolo, timeframe)
+        self._model_cache: "OrderedDict[Tuple[str, ...], _CachedModel]" = OrderedDict()
+        # Tempos, klines e features (antes do dropna) da última chamada por (símbolo, timeframe)
+        self._feature_cache: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, List[Dict[str, Any]], pd.DataFrame]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_lock = threading.Lock()
+        logger.info(f"TimeSeriesPredictor initialized. Available models: {self.models_available}")
+    
+    def _get_cached_model(
+        self,
+        model_name: str,
+        cache_key: Optional[Tuple[str, str]],
+        closes: np.ndarray,
+        max_new: Optional[int] = None,
+    ) -> Tuple[Optional[_CachedModel], Optional[int]]:
+        """
+        Busca o modelo em cache da série e quantos candles novos ele não viu.
         
-        return available
+        Returns:
+            (entrada, candles novos); (None, None) se não houver modelo reaproveitável
+        """
+        if cache_key is None:
+            return None, None
+        key = (model_name, *cache_key)
+        with self._cache_lock:
+            entry = self._model_cache.get(key)
+            if entry is None:
+                return None, None
+            self._model_cache.move_to_end(key)
+        if max_new is None:
+            max_new = self.MAX_INCREMENTAL_CANDLES - entry.appended
+        return entry, _count_new_observations(entry.closes, closes, max(0, max_new))
+    
+    def _store_model(
+        self,
+        model_name: str,
+        cache_key: Optional[Tuple[str, str]],
+        entry: _CachedModel,
+    ) -> None:
+        """Guarda o modelo treinado da série (LRU)"""
+        if cache_key is None:
+            return
+        key = (model_name, *cache_key)
+        with self._cache_lock:
+            self._model_cache[key] = entry
+            self._model_cache.move_to_end(key)
+            while len(self._model_cache) > self._cache_size:
+                self._model_cache.popitem(last=False)
     
-    def prepare_features(self, klines: List[Dict[str, Any]]) -> pd.DataFrame:
+    def prepare_features(
+        self,
+        klines: KlinesLike,
+        cache_key: Optional[Tuple[str, str]] = None
+    ) -> pd.DataFrame:
         """
         Prepara features para o modelo.
         
@@ -172,182 +765,394 @@ class TimeSeriesPredictor:
         - RSI
         - Momentum
         - Bollinger Bands
+        
+        Aceita lista de dicts ou array colunar (N, 6) de `kline_array`; o
+        array vira DataFrame coluna a coluna, sem iterar dicts por candle.
+        
+        Com `cache_key` (símbolo, timeframe), só os candles novos em relação à
+        chamada anterior da mesma série são calculados.
         """
-        df = pd.DataFrame(klines)
-        df['time'] = pd.to_datetime(df['time'], unit='ms')
-        df = df.sort_values('time')
+        if cache_key is not None:
+            df = self._update_features(klines, cache_key)
+        else:
+            df = self._build_features(klines).iloc[_FEATURE_WARMUP:]
         
-        # Preços
-        df['close'] = df['close'].astype(float)
-        df['high'] = df['high'].astype(float)
-        df['low'] = df['low'].astype(float)
-        df['open'] = df['open'].astype(float)
-        df['volume'] = df['volume'].astype(float)
+        # Aquecimento das janelas já descartado por fatia; dropna (cópia do
+        # frame inteiro) só se sobrar NaN, ex.: RSI em janela sem variação
+        if df.isna().to_numpy().any():
+            df = df.dropna()
+        
+        return df
+    
+    def _update_features(self, klines: KlinesLike, cache_key: Tuple[str, str]) -> pd.DataFrame:
+        """
+        Features (sem dropna) reaproveitando as linhas já calculadas da série.
         
-        # Retornos logarítmicos
-        df['returns'] = np.log(df['close'] / df['close'].shift(1))
+        Candles iguais aos da chamada anterior (alinhados por tempo) são
+        copiados; do primeiro candle diferente em diante (novos ou o candle
+        em formação atualizado) recalcula com `_FEATURE_CONTEXT` de contexto.
+        
+        As primeiras `_FEATURE_WARMUP` linhas são descartadas, como no cálculo
+        do zero (onde ainda não há ma99), mesmo que o cache tenha valores para elas.
+        """
+        is_array = isinstance(klines, np.ndarray)
+        if not (is_array or isinstance(klines, list)) or len(klines) < 2:
+            return self._build_features(klines)
+        if is_array:
+            times = klines[:, TIME].astype(np.int64)
+        else:
+            times = np.fromiter((int(k["time"]) for k in klines), dtype=np.int64, count=len(klines))
+        if not np.all(times[1:] > times[:-1]):
+            # Fora de ordem: caminho completo (ordena por tempo)
+            return self._build_features(klines)
+        
+        df = None
+        with self._cache_lock:
+            cached = self._feature_cache.get(cache_key)
+        if cached is not None:
+            cached_times, cached_klines, cached_df = cached
+            start = int(np.searchsorted(cached_times, times[0]))
+            if start < len(cached_times) and cached_times[start] == times[0]:
+                m = min(len(cached_times) - start, len(klines))
+                first_diff = m
+                if is_array != isinstance(cached_klines, np.ndarray):
+                    # Formato mudou entre chamadas: recalcula tudo
+                    first_diff = 0
+                elif is_array:
+                    same = np.all(klines[:m] == cached_klines[start:start + m], axis=1)
+                    if not same.all():
+                        first_diff = int(np.argmin(same))
+                else:
+                    # Comparação dos dicts: bem mais barata que converter tudo para array
+                    for i in range(m):
+                        if klines[i] != cached_klines[start + i]:
+                            first_diff = i
+                            break
+                if first_diff == len(klines) and start == 0 and first_diff == len(cached_times):
+                    # Mesma série da chamada anterior (ex.: vários modelos sobre
+                    # os mesmos klines): sem fatiar nem copiar a série de novo
+                    with self._cache_lock:
+                        if cache_key in self._feature_cache:
+                            self._feature_cache.move_to_end(cache_key)
+                    return cached_df.iloc[_FEATURE_WARMUP:]
+                if first_diff == len(klines):
+                    df = cached_df.iloc[start:start + first_diff].reset_index(drop=True)
+                elif first_diff >= _FEATURE_CONTEXT:
+                    tail = self._build_features(klines[first_diff - _FEATURE_CONTEXT:])
+                    df = pd.concat(
+                        [cached_df.iloc[start:start + first_diff], tail.iloc[_FEATURE_CONTEXT:]],
+                        ignore_index=True
+                    )
+        
+        if df is None:
+            df = self._build_features(klines)
+        
+        with self._cache_lock:
+            # Cópias: o chamador pode atualizar o candle em formação in-place
+            snapshot = klines.copy() if is_array else [dict(k) for k in klines]
+            self._feature_cache[cache_key] = (times, snapshot, df)
+            self._feature_cache.move_to_end(cache_key)
+            while len(self._feature_cache) > self._cache_size:
+                self._feature_cache.popitem(last=False)
+        return df.iloc[_FEATURE_WARMUP:]
+    
+    def prepare_features_np(self, klines: KlinesLike) -> Dict[str, np.ndarray]:
+        """
+        Mesmas features de `prepare_features`, como arrays por coluna, sem
+        criar DataFrame nem usar o cache incremental.
+        
+        Para caminhos que só leem o fim da série (ex.: `simple_ma` no
+        backtest), onde montar e fatiar o DataFrame custava mais que as janelas.
+        """
+        data, _ = self._feature_arrays(klines)
+        data = {name: values[_FEATURE_WARMUP:] for name, values in data.items()}
+        
+        # Equivalente ao dropna: remove linhas com NaN em qualquer coluna
+        missing = None
+        for values in data.values():
+            mask = pd.isna(values)
+            if mask.any():
+                missing = mask if missing is None else missing | mask
+        if missing is not None:
+            keep = ~missing
+            data = {name: values[keep] for name, values in data.items()}
+        return data
+    
+    def _build_features(self, klines: KlinesLike) -> pd.DataFrame:
+        """
+        Calcula todas as features a partir dos klines (linhas iniciais com NaN).
+        
+        As colunas são calculadas como arrays e o DataFrame é montado uma única
+        vez: no caminho incremental o custo por passo era dominado pelas
+        inserções de coluna do pandas, não pelas janelas em si.
+        """
+        data, index = self._feature_arrays(klines)
+        return pd.DataFrame(data, index=index)
+    
+    def _feature_arrays(self, klines: KlinesLike) -> Tuple[Dict[str, np.ndarray], Optional[pd.Index]]:
+        """Colunas de `_build_features` e o índice (só se a entrada foi reordenada)"""
+        index = None
+        if isinstance(klines, np.ndarray):
+            # Array colunar: colunas tiradas direto do array
+            times = klines[:, TIME].astype(np.int64)
+            data = {'time': times.view('datetime64[ms]')}
+            data.update(
+                (name, klines[:, col]) for col, name in enumerate(KLINE_ARRAY_COLUMNS) if col != TIME
+            )
+            if not np.all(times[1:] >= times[:-1]):
+                frame = pd.DataFrame(data).sort_values('time')
+                data = {name: frame[name].to_numpy() for name in frame.columns}
+                index = frame.index
+        else:
+            frame = pd.DataFrame(klines)
+            # Epoch em ms: reinterpreta como datetime64[ms] sem passar pelo parser
+            frame['time'] = frame['time'].to_numpy(dtype=np.int64).view('datetime64[ms]')
+            # Klines da exchange já vêm em ordem; só ordena se necessário
+            if not frame['time'].is_monotonic_increasing:
+                frame = frame.sort_values('time')
+            data = {name: frame[name].to_numpy() for name in frame.columns}
+            index = frame.index
+        
+        # Preços
+        for name in ('open', 'high', 'low', 'close', 'volume'):
+            data[name] = np.asarray(data[name], dtype=np.float64)
+        close = np.ascontiguousarray(data['close'])
+        
+        # Retornos logarítmicos: log(a/b) = log(a) - log(b), sem divisão nem shift
+        log_close = np.log(close)
+        returns = np.empty_like(log_close)
+        returns[:1] = np.nan
+        returns[1:] = np.diff(log_close)
+        data['returns'] = returns
+        
+        # Janelas móveis: volatilidade (std dos retornos), médias, Bollinger (20),
+        # RSI e momentum
+        bb_std = 2
+        if NUMBA_AVAILABLE:
+            # Todas as janelas em uma única passada sobre os preços
+            rolling = _rolling_features_njit(close, returns)
+        else:
+            rolling = _rolling_features_numpy(close, returns)
+        volatility, ma7, ma25, ma99, bb_middle, bb_stdev, rsi, momentum = rolling
         
         # Volatilidade (rolling std dos retornos)
-        df['volatility'] = df['returns'].rolling(window=20).std()
+        data['volatility'] = volatility
         
         # Médias móveis
-        df['ma7'] = df['close'].rolling(window=7).mean()
-        df['ma25'] = df['close'].rolling(window=25).mean()
-        df['ma99'] = df['close'].rolling(window=99).mean()
+        data['ma7'] = ma7
+        data['ma25'] = ma25
+        data['ma99'] = ma99
         
         # RSI
-        df['rsi'] = self._calculate_rsi(df['close'], period=14)
+        data['rsi'] = rsi
         
         # Momentum
-        df['momentum'] = df['close'] - df['close'].shift(4)
+        data['momentum'] = momentum
         
         # Bollinger Bands
-        bb_period = 20
-        bb_std = 2
-        df['bb_middle'] = df['close'].rolling(window=bb_period).mean()
-        df['bb_std'] = df['close'].rolling(window=bb_period).std()
-        df['bb_upper'] = df['bb_middle'] + (bb_std * df['bb_std'])
-        df['bb_lower'] = df['bb_middle'] - (bb_std * df['bb_std'])
-        df['bb_width'] = df['bb_upper'] - df['bb_lower']
+        bb_upper = bb_middle + (bb_std * bb_stdev)
+        bb_lower = bb_middle - (bb_std * bb_stdev)
+        data['bb_middle'] = bb_middle
+        data['bb_std'] = bb_stdev
+        data['bb_upper'] = bb_upper
+        data['bb_lower'] = bb_lower
+        data['bb_width'] = bb_upper - bb_lower
         
         # High-Low range
-        df['hl_range'] = df['high'] - df['low']
-        df['hl_pct'] = (df['hl_range'] / df['close']) * 100
-        
-        # Remove NaN
-        df = df.dropna()
-        
-        return df
-    
-    def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
-        """Calcula RSI (Relative Strength Index)"""
-        delta = prices.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
+        hl_range = data['high'] - data['low']
+        data['hl_range'] = hl_range
+        data['hl_pct'] = (hl_range / close) * 100
+        
+        if self.feature_dtype != np.float64:
+            # Somas móveis acumuladas em float64; só o armazenamento é reduzido
+            data = {
+                name: values.astype(self.feature_dtype) if values.dtype == np.float64 else values
+                for name, values in data.items()
+            }
+        
+        return data, index
     
     def predict_simple_ma(
         self,
-        df: pd.DataFrame,
-        periods_ahead: int = 10
-    ) -> List[Prediction]:
+        df: Union[pd.DataFrame, Dict[str, np.ndarray]],
+        periods_ahead: int = 10,
+        tail: Optional[_TailContext] = None
+    ) -> PredictionArray:
         """
         Predição simples usando média móvel exponencial.
         Fallback quando outros modelos não estão disponíveis.
+        
+        `df` pode ser o DataFrame de `prepare_features` ou as colunas de
+        `prepare_features_np`; `tail` (escalares do último candle) pode vir
+        pronto de `predict`.
         """
-        last_close = df['close'].iloc[-1]
-        ma7 = df['ma7'].iloc[-1]
-        ma25 = df['ma25'].iloc[-1]
+        if tail is None:
+            tail = _tail_context(df)
+        last_close = tail.last_close
         
         # Trend baseado em MAs
-        if ma7 > ma25:
+        if tail.last_ma7 > tail.last_ma25:
             trend_factor = 1.001  # Leve alta
         else:
             trend_factor = 0.999  # Leve baixa
         
         # Volatilidade para intervalo de confiança
-        volatility = df['volatility'].iloc[-1] if 'volatility' in df else 0.01
+        volatility = tail.last_volatility if tail.last_volatility is not None else 0.01
+        
+        if NUMBA_AVAILABLE:
+            timestamps, predicted, confidence, lower, upper = _simple_ma_njit(
+                float(last_close), trend_factor, float(volatility),
+                tail.last_timestamp, tail.time_diff, periods_ahead
+            )
+            return PredictionArray(
+                timestamps=timestamps,
+                prices=predicted,
+                confidence=confidence,
+                lower=lower,
+                upper=upper,
+            )
         
-        predictions = []
-        current_price = last_close
-        last_timestamp = int(df['time'].iloc[-1].timestamp() * 1000)
+        steps = np.arange(1, periods_ahead + 1)
         
-        # Inferir intervalo de tempo
-        if len(df) >= 2:
-            time_diff = int(df['time'].iloc[-1].timestamp()) - int(df['time'].iloc[-2].timestamp())
-        else:
-            time_diff = 3600  # 1 hora default
+        # Predição simples com pequeno drift composto (forma fechada)
+        predicted = last_close * np.power(trend_factor, steps)
         
-        for i in range(1, periods_ahead + 1):
-            # Predição simples com pequeno drift
-            predicted = current_price * trend_factor
-            
-            # Intervalo de confiança baseado em volatilidade
-            std_dev = predicted * volatility * np.sqrt(i)
-            lower = predicted - (2 * std_dev)
-            upper = predicted + (2 * std_dev)
-            
-            # Confiança diminui com o tempo
-            confidence = max(30, 70 - (i * 3))
-            
-            predictions.append(Prediction(
-                timestamp=last_timestamp + (i * time_diff * 1000),
-                predicted_price=predicted,
-                confidence=confidence,
-                lower_bound=lower,
-                upper_bound=upper,
-            ))
-            
-            current_price = predicted
+        # Intervalo de confiança baseado em volatilidade
+        std_dev = predicted * volatility * np.sqrt(steps)
         
-        return predictions
+        return PredictionArray(
+            timestamps=_future_timestamps(tail.last_timestamp, tail.time_diff, periods_ahead),
+            prices=predicted,
+            # Confiança diminui com o tempo
+            confidence=np.maximum(30, 70 - steps * 3).astype(np.float64),
+            lower=predicted - (2 * std_dev),
+            upper=predicted + (2 * std_dev),
+        )
     
     def predict_prophet(
         self,
         df: pd.DataFrame,
-        periods_ahead: int = 10
-    ) -> Tuple[List[Prediction], Dict[str, float]]:
+        periods_ahead: int = 10,
+        cache_key: Optional[Tuple[str, str]] = None,
+        max_stale: int = 0,
+        uncertainty_samples: int = 100
+    ) -> Tuple[PredictionArray, Dict[str, float]]:
         """
         Predição usando Facebook Prophet.
         Excelente para séries temporais com sazonalidade.
+        
+        Com `cache_key` (símbolo, timeframe), reaproveita o modelo se os dados
+        não mudaram e, se mudaram, faz warm start a partir dos parâmetros anteriores.
+        
+        `max_stale` > 0 permite prever com o modelo em cache mesmo que a série
+        tenha até esse número de candles novos (sem refit), estendendo o
+        horizonte a partir do fim dos dados de treino (usado no backtest).
+        
+        `uncertainty_samples` é o número de amostras Monte Carlo do intervalo
+        (o padrão do Prophet, 1000, domina o custo do `predict`); com 0 o
+        intervalo não é calculado e os limites ficam iguais à previsão.
+        
+        O ajuste é MAP (`mcmc_samples=0`) no backend cmdstanpy, e o `predict`
+        roda só sobre os períodos futuros, não sobre todo o histórico. A
+        previsão é feita uma vez por fit para `max_stale + periods_ahead`
+        períodos e guardada; as chamadas seguintes com o modelo defasado só
+        fatiam o trecho do seu horizonte.
         """
-        try:
-            from prophet import Prophet
-        except ImportError:
+        if self._Prophet is None:
             raise ValueError("Prophet not installed. Use simple_ma model instead.")
+        Prophet = self._Prophet
         
         # Preparar dados para Prophet
         prophet_df = pd.DataFrame({
             'ds': df['time'],
-            'y': df['close']
+            # Stan trabalha em double: converte se as features estiverem em float32
+            'y': df['close'].astype(np.float64)
         })
         
-        # Criar e treinar modelo
-        model = Prophet(
-            daily_seasonality=False,
-            weekly_seasonality=False,
-            yearly_seasonality=False,
-            changepoint_prior_scale=0.05,
-            interval_width=0.95
-        )
-        
-        model.fit(prophet_df)
-        
-        # Fazer predições
-        future = model.make_future_dataframe(periods=periods_ahead, freq='H')
-        forecast = model.predict(future)
-        
-        # Extrair predições futuras
-        future_forecast = forecast.tail(periods_ahead)
+        closes = df['close'].to_numpy()
+        cached, new_obs = self._get_cached_model("prophet", cache_key, closes, max_new=max_stale)
         
-        predictions = []
-        for _, row in future_forecast.iterrows():
-            timestamp = int(row['ds'].timestamp() * 1000)
-            predicted = float(row['yhat'])
-            lower = float(row['yhat_lower'])
-            upper = float(row['yhat_upper'])
+        if new_obs is not None:
+            # Mesmos dados (ou até `max_stale` candles novos): reaproveita o modelo treinado
+            entry = cached
+            model = cached.fitted
+        else:
+            new_obs = 0
+            # Criar e treinar modelo
+            model = Prophet(
+                daily_seasonality=False,
+                weekly_seasonality=False,
+                yearly_seasonality=False,
+                changepoint_prior_scale=0.05,
+                interval_width=0.95,
+                uncertainty_samples=uncertainty_samples,
+                mcmc_samples=0,
+                stan_backend='CMDSTANPY'
+            )
             
-            # Confiança baseada no intervalo
-            range_pct = ((upper - lower) / predicted) * 100
-            confidence = max(30, min(90, 100 - range_pct))
+            if cached is not None:
+                model.fit(prophet_df, init=_prophet_init(cached.fitted))
+            else:
+                model.fit(prophet_df)
+            entry = _CachedModel(fitted=model, closes=closes)
+            self._store_model("prophet", cache_key, entry)
+        
+        # Previsão do fit atual (em cache) cobrindo o horizonte desta chamada
+        # (modelo defasado: pula os `new_obs` candles que ele não viu)
+        horizon = periods_ahead + new_obs
+        tile = entry.extra.get("forecast")
+        if (tile is None or tile.uncertainty_samples != uncertainty_samples
+                or len(tile.yhat) < horizon):
+            # Só afeta o predict: o modelo em cache usa o valor desta chamada
+            model.uncertainty_samples = uncertainty_samples
             
-            predictions.append(Prediction(
-                timestamp=timestamp,
-                predicted_price=predicted,
-                confidence=confidence,
-                lower_bound=lower,
-                upper_bound=upper,
-            ))
+            # Sem o histórico: tendência, sazonalidades e intervalo só do futuro
+            future = model.make_future_dataframe(
+                periods=max(horizon, max_stale + periods_ahead), freq='H', include_history=False
+            )
+            forecast = model.predict(future)
+            
+            # Colunas como arrays (sem iterrows nem DataFrame intermediário)
+            yhat = forecast['yhat'].to_numpy(dtype=np.float64)
+            if 'yhat_lower' in forecast:
+                bounds = (
+                    forecast['yhat_lower'].to_numpy(dtype=np.float64),
+                    forecast['yhat_upper'].to_numpy(dtype=np.float64),
+                )
+            else:
+                # uncertainty_samples=0: sem intervalo
+                bounds = (yhat, yhat)
+            tile = _ProphetForecast(
+                uncertainty_samples,
+                forecast['ds'].to_numpy(dtype='datetime64[ms]').view(np.int64),
+                yhat,
+                *bounds,
+            )
+            entry.extra["forecast"] = tile
+        
+        # Extrair predições futuras: fatia do horizonte desta chamada
+        window = slice(new_obs, horizon)
+        timestamps = tile.timestamps[window]
+        yhat = tile.yhat[window]
+        yhat_lower = tile.lower[window]
+        yhat_upper = tile.upper[window]
+        
+        # Confiança baseada no intervalo
+        range_pct = ((yhat_upper - yhat_lower) / yhat) * 100
+        confidences = np.clip(100 - range_pct, 30, 90)
+        
+        predictions = PredictionArray(
+            timestamps=timestamps,
+            prices=yhat,
+            confidence=confidences,
+            lower=yhat_lower,
+            upper=yhat_upper,
+        )
         
         # Calcular métricas (in-sample)
-        actual = prophet_df['y'].values[-periods_ahead:]
-        predicted_values = forecast['yhat'].values[-periods_ahead:]
+        actual = closes[-periods_ahead:]
         
-        mae = np.mean(np.abs(actual - predicted_values))
-        rmse = np.sqrt(np.mean((actual - predicted_values) ** 2))
-        mape = np.mean(np.abs((actual - predicted_values) / actual)) * 100
+        mae, rmse, mape = _error_metrics(actual, yhat)
         
         metrics = {
             'mae': mae,
@@ -360,16 +1165,22 @@ class TimeSeriesPredictor:
     def predict_lstm(
         self,
         df: pd.DataFrame,
-        periods_ahead: int = 10
-    ) -> Tuple[List[Prediction], Dict[str, float]]:
+        periods_ahead: int = 10,
+        cache_key: Optional[Tuple[str, str]] = None,
+        tail: Optional[_TailContext] = None
+    ) -> Tuple[PredictionArray, Dict[str, float]]:
         """
         Predição usando LSTM (Long Short-Term Memory).
         Rede neural recorrente para padrões complexos.
+        
+        Com `cache_key` (símbolo, timeframe), a rede treinada (e o scaler) é
+        reaproveitada enquanto a série receber até MAX_INCREMENTAL_CANDLES novos;
+        depois disso, é ajustada (fine-tuning) em vez de treinada do zero, no
+        máximo LSTM_MAX_FINETUNES vezes seguidas. Dados fora do intervalo do
+        scaler sempre levam a um treino completo.
         """
         try:
-            import tensorflow as tf
-            from tensorflow import keras
-            from tensorflow.keras import layers
+            tf, keras, layers = _load_tensorflow()
         except ImportError:
             raise ValueError("TensorFlow not installed. Use: pip install tensorflow")
         
@@ -379,26 +1190,171 @@ class TimeSeriesPredictor:
         
         data = df[available_features].values
         
+        closes = df['close'].to_numpy()
+        cached, new_obs = self._get_cached_model("lstm", cache_key, closes)
+        if cached is not None and (
+            cached.extra["features"] != available_features
+            or not _within_scaler_range(cached.extra["scaler"], data)
+        ):
+            # Outras features ou preços fora do min/max do treino: a rede em
+            # cache não serve nem para ajuste
+            cached, new_obs = None, None
+        
+        if new_obs is not None:
+            # Rede já treinada para a série: só normaliza os dados atuais
+            model = cached.fitted
+            extra = cached.extra
+            scaler = extra["scaler"]
+            lookback = extra["lookback"]
+            data_scaled = scaler.transform(data).astype(np.float32)
+            if new_obs:
+                self._store_model("lstm", cache_key, _CachedModel(
+                    fitted=model, closes=closes,
+                    appended=cached.appended + new_obs, extra=extra
+                ))
+        else:
+            # Continuação da série em cache, mesmo lookback e poucos ajustes
+            # seguidos: ajusta a rede em cache em vez de treinar do zero
+            warm_start = None
+            if (
+                cached is not None
+                and cached.extra["lookback"] == _lstm_lookback(len(data))
+                and cached.extra["finetunes"] < self.LSTM_MAX_FINETUNES
+                and _count_new_observations(
+                    cached.closes, closes, self.LSTM_FINETUNE_MAX_GROWTH
+                ) is not None
+            ):
+                warm_start = cached
+            
+            # O ajuste altera a rede em cache: não pode rodar junto com um
+            # rollout ou outro ajuste dela (mesmo lock da entrada anterior)
+            model_lock = warm_start.extra["model_lock"] if warm_start is not None else threading.Lock()
+            with model_lock:
+                model, scaler, lookback, data_scaled, test_metrics = self._train_lstm(
+                    data, available_features, keras, layers, warm_start=warm_start
+                )
+                interpreter = (
+                    _quantize_lstm(tf, model, data_scaled, lookback) if self.quantize_lstm else None
+                )
+            extra = {
+                "scaler": scaler,
+                "lookback": lookback,
+                "features": available_features,
+                "metrics": test_metrics,
+                # ajustes seguidos desde o último treino completo
+                "finetunes": warm_start.extra["finetunes"] + 1 if warm_start is not None else 0,
+                # grafos compilados por periods_ahead (leem os pesos atuais do modelo)
+                "rollouts": warm_start.extra["rollouts"] if warm_start is not None else {},
+                "model_lock": model_lock,
+                "interpreter": interpreter,
+                "interpreter_lock": threading.Lock(),
+            }
+            self._store_model("lstm", cache_key, _CachedModel(
+                fitted=model, closes=closes, extra=extra
+            ))
+        
+        # Fazer predições futuras
+        last_sequence = data_scaled[-lookback:]
+        if tail is None:
+            tail = _tail_context(df)
+        
+        if extra["interpreter"] is not None:
+            # Rede quantizada (int8) no TFLite
+            with extra["interpreter_lock"]:
+                preds_scaled = _tflite_rollout(
+                    extra["interpreter"], last_sequence.reshape(1, lookback, -1), periods_ahead
+                )
+        else:
+            # Rollout autoregressivo inteiro em um grafo compilado (cacheado com o modelo)
+            with extra["model_lock"]:
+                rollout = extra["rollouts"].get(periods_ahead)
+                if rollout is None:
+                    rollout = _make_lstm_rollout(tf, model, len(available_features), periods_ahead)
+                    extra["rollouts"][periods_ahead] = rollout
+                preds_scaled = rollout(
+                    tf.constant(last_sequence.reshape(1, lookback, -1), dtype=tf.float32)
+                ).numpy()
+        
+        # Desnormalizar só a coluna close, com a mesma conta do
+        # MinMaxScaler.inverse_transform: x = (x_scaled - min_) / scale_
+        pred_prices = (preds_scaled.astype(np.float64) - scaler.min_[0]) / scaler.scale_[0]
+        
+        steps = np.arange(1, periods_ahead + 1)
+        
+        # Estimar intervalo de confiança baseado em volatilidade histórica
+        volatility = tail.last_volatility if tail.last_volatility is not None else 0.02
+        std_dev = pred_prices * volatility * np.sqrt(steps)
+        
+        predictions = PredictionArray(
+            timestamps=_future_timestamps(tail.last_timestamp, tail.time_diff, periods_ahead),
+            prices=pred_prices,
+            confidence=np.maximum(40, 75 - steps * 2).astype(np.float64),
+            lower=pred_prices - (2 * std_dev),
+            upper=pred_prices + (2 * std_dev),
+        )
+        
+        # Métricas do conjunto de teste do último treino
+        metrics = {
+            **extra["metrics"],
+            'model': 'lstm'
+        }
+        
+        return predictions, metrics
+    
+    def _train_lstm(
+        self,
+        data: np.ndarray,
+        available_features: List[str],
+        keras: Any,
+        layers: Any,
+        warm_start: Optional[_CachedModel] = None,
+    ) -> Tuple[Any, Any, int, np.ndarray, Dict[str, float]]:
+        """
+        Normaliza os dados e treina a rede LSTM.
+        
+        Args:
+            warm_start: Rede em cache da série (mesmas features e lookback, dados
+                dentro do intervalo do scaler); reaproveita rede e scaler e só
+                ajusta 2 épocas nas últimas janelas. O chamador segura o
+                `model_lock` da entrada durante o ajuste
+        
+        Returns:
+            (modelo, scaler, lookback, dados normalizados, métricas de teste)
+        """
         # Normalizar dados
-        from sklearn.preprocessing import MinMaxScaler
-        scaler = MinMaxScaler()
-        data_scaled = scaler.fit_transform(data)
+        # Scaler ajustado em float64 (desnormalização exata); a rede treina em
+        # float32, o dtype nativo do Keras, sem conversão a cada batch
+        if warm_start is not None:
+            scaler = warm_start.extra["scaler"]
+            data_scaled = scaler.transform(data).astype(np.float32)
+        else:
+            from sklearn.preprocessing import MinMaxScaler
+            scaler = MinMaxScaler()
+            data_scaled = scaler.fit_transform(data).astype(np.float32)
         
         # Criar sequências (lookback de 60 períodos)
-        lookback = min(60, len(data) // 2)
+        lookback = _lstm_lookback(len(data))
         X, y = [], []
         for i in range(lookback, len(data_scaled)):
             X.append(data_scaled[i-lookback:i])
             y.append(data_scaled[i, 0])  # Prever apenas close
         
-        X = np.array(X)
-        y = np.array(y)
+        X = np.array(X, dtype=np.float32)
+        y = np.array(y, dtype=np.float32)
         
         # Split train/test
         split = int(0.8 * len(X))
         X_train, X_test = X[:split], X[split:]
         y_train, y_test = y[:split], y[split:]
         
+        if warm_start is not None:
+            # Fine-tuning: poucas épocas só nas janelas mais recentes
+            model = warm_start.fitted
+            model.fit(X_train[-50:], y_train[-50:], batch_size=32, epochs=2, verbose=0)
+            y_pred_test = model.predict(X_test, verbose=0).flatten()
+            mae, rmse, _ = _error_metrics(y_test, y_pred_test)
+            return model, scaler, lookback, data_scaled, {'mae': float(mae), 'rmse': float(rmse)}
+        
         # Criar modelo LSTM
         model = keras.Sequential([
             layers.LSTM(50, return_sequences=True, input_shape=(lookback, len(available_features))),
@@ -420,141 +1376,105 @@ class TimeSeriesPredictor:
             verbose=0
         )
         
-        # Fazer predições futuras
-        predictions = []
-        last_sequence = data_scaled[-lookback:]
-        last_timestamp = int(df['time'].iloc[-1].timestamp() * 1000)
-        
-        # Inferir time_diff
-        if len(df) >= 2:
-            time_diff = int(df['time'].iloc[-1].timestamp()) - int(df['time'].iloc[-2].timestamp())
-        else:
-            time_diff = 3600
-        
-        current_sequence = last_sequence.copy()
-        
-        for i in range(1, periods_ahead + 1):
-            # Prever próximo valor
-            pred_scaled = model.predict(current_sequence.reshape(1, lookback, -1), verbose=0)
-            pred_value = pred_scaled[0, 0]
-            
-            # Desnormalizar
-            dummy = np.zeros((1, len(available_features)))
-            dummy[0, 0] = pred_value
-            pred_price = scaler.inverse_transform(dummy)[0, 0]
-            
-            # Estimar intervalo de confiança baseado em volatilidade histórica
-            volatility = df['volatility'].iloc[-1] if 'volatility' in df else 0.02
-            std_dev = pred_price * volatility * np.sqrt(i)
-            lower = pred_price - (2 * std_dev)
-            upper = pred_price + (2 * std_dev)
-            
-            confidence = max(40, 75 - (i * 2))
-            
-            predictions.append(Prediction(
-                timestamp=last_timestamp + (i * time_diff * 1000),
-                predicted_price=pred_price,
-                confidence=confidence,
-                lower_bound=lower,
-                upper_bound=upper,
-            ))
-            
-            # Atualizar sequência para próxima predição
-            new_row = np.zeros(len(available_features))
-            new_row[0] = pred_value
-            current_sequence = np.vstack([current_sequence[1:], new_row])
-        
         # Calcular métricas
         y_pred_test = model.predict(X_test, verbose=0).flatten()
-        mae = np.mean(np.abs(y_test - y_pred_test))
-        rmse = np.sqrt(np.mean((y_test - y_pred_test) ** 2))
+        mae, rmse, _ = _error_metrics(y_test, y_pred_test)
         
-        metrics = {
-            'mae': float(mae),
-            'rmse': float(rmse),
-            'model': 'lstm'
-        }
-        
-        return predictions, metrics
+        return model, scaler, lookback, data_scaled, {'mae': float(mae), 'rmse': float(rmse)}
     
     def predict_arima(
         self,
         df: pd.DataFrame,
-        periods_ahead: int = 10
-    ) -> Tuple[List[Prediction], Dict[str, float]]:
+        periods_ahead: int = 10,
+        cache_key: Optional[Tuple[str, str]] = None,
+        tail: Optional[_TailContext] = None
+    ) -> Tuple[PredictionArray, Dict[str, float]]:
         """
         Predição usando ARIMA (AutoRegressive Integrated Moving Average).
         Modelo estatístico clássico para séries temporais.
+        
+        Com `cache_key` (símbolo, timeframe), candles novos (até
+        MAX_INCREMENTAL_CANDLES) são incorporados via `append` sem reestimar.
         """
-        try:
-            from statsmodels.tsa.arima.model import ARIMA
-            from statsmodels.tsa.stattools import adfuller
-        except ImportError:
+        if self._ARIMA is None:
             raise ValueError("Statsmodels not installed. Use: pip install statsmodels")
+        ARIMA = self._ARIMA
         
         # Usar apenas preço de fechamento
         prices = df['close'].values
         
-        # Teste de estacionariedade (ADF test)
-        adf_result = adfuller(prices)
-        is_stationary = adf_result[1] < 0.05
-        
-        # Determinar ordem de diferenciação
-        d = 0 if is_stationary else 1
-        
-        # Usar ARIMA(5,d,2) como padrão razoável
-        p, q = 5, 2
-        
-        try:
-            # Treinar modelo ARIMA
-            model = ARIMA(prices, order=(p, d, q))
-            fitted = model.fit()
-            
-            # Fazer predições
-            forecast = fitted.forecast(steps=periods_ahead)
+        cached, new_obs = self._get_cached_model("arima", cache_key, prices)
+        if new_obs is not None:
+            # Série já treinada: só incorpora os candles novos (mesmos parâmetros)
+            fitted = cached.fitted
+            if new_obs:
+                fitted = fitted.append(prices[-new_obs:], refit=False)
+                self._store_model("arima", cache_key, _CachedModel(
+                    fitted=fitted, closes=prices,
+                    appended=cached.appended + new_obs, extra=cached.extra
+                ))
+            p, d, q = cached.extra["order"]
+            is_stationary = cached.extra["stationary"]
             forecast_df = fitted.get_forecast(steps=periods_ahead)
+            forecast = forecast_df.predicted_mean
             conf_int = forecast_df.conf_int()
-            
-        except Exception as e:
-            logger.warning(f"ARIMA fitting failed: {e}, trying simpler model")
-            # Fallback para modelo mais simples
-            model = ARIMA(prices, order=(1, 1, 1))
-            fitted = model.fit()
-            forecast = fitted.forecast(steps=periods_ahead)
-            forecast_df = fitted.get_forecast(steps=periods_ahead)
-            conf_int = forecast_df.conf_int()
-        
-        # Criar predições
-        predictions = []
-        last_timestamp = int(df['time'].iloc[-1].timestamp() * 1000)
-        
-        if len(df) >= 2:
-            time_diff = int(df['time'].iloc[-1].timestamp()) - int(df['time'].iloc[-2].timestamp())
         else:
-            time_diff = 3600
-        
-        for i in range(periods_ahead):
-            pred_price = forecast[i]
-            # Se treinado com numpy array, conf_int é array, não DataFrame
-            if hasattr(conf_int, 'iloc'):
-                lower = conf_int.iloc[i, 0]
-                upper = conf_int.iloc[i, 1]
-            else:
-                lower = conf_int[i, 0]
-                upper = conf_int[i, 1]
+            # Teste de estacionariedade (razão de variâncias, sem as regressões do ADF)
+            is_stationary = _is_stationary(prices)
             
-            # Confiança baseada na largura do intervalo
-            range_pct = ((upper - lower) / pred_price) * 100
-            confidence = max(40, min(85, 100 - range_pct * 2))
+            # Determinar ordem de diferenciação
+            d = 0 if is_stationary else 1
             
-            predictions.append(Prediction(
-                timestamp=last_timestamp + ((i + 1) * time_diff * 1000),
-                predicted_price=pred_price,
-                confidence=confidence,
-                lower_bound=lower,
-                upper_bound=upper,
+            # Usar ARIMA(5,d,2) como padrão razoável
+            p, q = 5, 2
+            
+            try:
+                # Treinar modelo ARIMA
+                model = ARIMA(prices, order=(p, d, q))
+                fitted = model.fit()
+                
+                # Fazer predições
+                forecast = fitted.forecast(steps=periods_ahead)
+                forecast_df = fitted.get_forecast(steps=periods_ahead)
+                conf_int = forecast_df.conf_int()
+                
+            except Exception as e:
+                logger.warning(f"ARIMA fitting failed: {e}, trying simpler model")
+                # Fallback para modelo mais simples
+                model = ARIMA(prices, order=(1, 1, 1))
+                fitted = model.fit()
+                forecast = fitted.forecast(steps=periods_ahead)
+                forecast_df = fitted.get_forecast(steps=periods_ahead)
+                conf_int = forecast_df.conf_int()
+            
+            self._store_model("arima", cache_key, _CachedModel(
+                fitted=fitted, closes=prices,
+                extra={"order": (p, d, q), "stationary": is_stationary}
             ))
         
+        # Criar predições
+        if tail is None:
+            tail = _tail_context(df)
+        
+        # Se treinado com numpy array, conf_int é array, não DataFrame
+        pred_prices = np.asarray(forecast, dtype=np.float64)[:periods_ahead]
+        conf_int = np.asarray(conf_int, dtype=np.float64)
+        lower = conf_int[:periods_ahead, 0]
+        upper = conf_int[:periods_ahead, 1]
+        
+        # Confiança baseada na largura do intervalo
+        # (fmin/fmax ignoram NaN como o min/max do Python fazia aqui)
+        range_pct = ((upper - lower) / pred_prices) * 100
+        confidence = np.fmax(40, np.fmin(85, 100 - range_pct * 2))
+        
+        predictions = PredictionArray(
+            timestamps=_future_timestamps(tail.last_timestamp, tail.time_diff, periods_ahead),
+            prices=pred_prices,
+            confidence=confidence,
+            lower=lower,
+            upper=upper,
+        )
+        
         # Métricas
         metrics = {
             'aic': float(fitted.aic),
@@ -568,14 +1488,22 @@ class TimeSeriesPredictor:
     def predict_ensemble(
         self,
         df: pd.DataFrame,
-        periods_ahead: int = 10
-    ) -> Tuple[List[Prediction], Dict[str, float]]:
+        periods_ahead: int = 10,
+        cache_key: Optional[Tuple[str, str]] = None,
+        tail: Optional[_TailContext] = None,
+        prophet_max_stale: int = 0,
+        prophet_uncertainty_samples: int = 100
+    ) -> Tuple[PredictionArray, Dict[str, float]]:
         """
         Ensemble: combina predições de múltiplos modelos.
         Usa weighted average baseado na performance histórica.
         """
         logger.info("Running ensemble prediction with all available models")
         
+        # Escalares do último candle calculados uma vez para todos os modelos
+        if tail is None:
+            tail = _tail_context(df)
+        
         all_predictions = []
         all_metrics = {}
         weights = {}
@@ -583,21 +1511,35 @@ class TimeSeriesPredictor:
         # Tentar cada modelo disponível
         models_to_try = []
         if "prophet" in self.models_available:
-            models_to_try.append(("prophet", self.predict_prophet, 0.4))
+            models_to_try.append((
+                "prophet",
+                partial(
+                    self.predict_prophet,
+                    max_stale=prophet_max_stale,
+                    uncertainty_samples=prophet_uncertainty_samples,
+                ),
+                0.4,
+            ))
         if "lstm" in self.models_available:
-            models_to_try.append(("lstm", self.predict_lstm, 0.3))
+            models_to_try.append(("lstm", partial(self.predict_lstm, tail=tail), 0.3))
         if "arima" in self.models_available:
-            models_to_try.append(("arima", self.predict_arima, 0.3))
+            models_to_try.append(("arima", partial(self.predict_arima, tail=tail), 0.3))
         
         # Fallback se nenhum modelo avançado disponível
         if not models_to_try:
             logger.warning("No advanced models available, using simple_ma")
-            return self.predict_simple_ma(df, periods_ahead), {"model": "simple_ma_only"}
+            return self.predict_simple_ma(df, periods_ahead, tail), {"model": "simple_ma_only"}
         
-        # Executar cada modelo
-        for model_name, model_func, default_weight in models_to_try:
+        # Executa os modelos em paralelo (fit/forecast liberam o GIL em C/BLAS)
+        futures = [
+            (model_name, _ENSEMBLE_EXECUTOR.submit(model_func, df, periods_ahead, cache_key=cache_key), default_weight)
+            for model_name, model_func, default_weight in models_to_try
+        ]
+        
+        # Coleta na ordem de models_to_try para manter a combinação determinística
+        for model_name, future, default_weight in futures:
             try:
-                preds, metrics = model_func(df, periods_ahead)
+                preds, metrics = future.result()
                 all_predictions.append(preds)
                 all_metrics[model_name] = metrics
                 weights[model_name] = default_weight
@@ -609,38 +1551,26 @@ class TimeSeriesPredictor:
         if not all_predictions:
             # Se todos falharam, usar simple_ma
             logger.warning("All models failed, falling back to simple_ma")
-            return self.predict_simple_ma(df, periods_ahead), {"model": "simple_ma_fallback"}
+            return self.predict_simple_ma(df, periods_ahead, tail), {"model": "simple_ma_fallback"}
         
         # Normalizar pesos
         total_weight = sum(weights.values())
         weights = {k: v / total_weight for k, v in weights.items()}
         
-        # Combinar predições usando weighted average
-        ensemble_predictions = []
-        
-        for i in range(periods_ahead):
-            weighted_price = 0
-            weighted_lower = 0
-            weighted_upper = 0
-            weighted_confidence = 0
-            timestamp = all_predictions[0][i].timestamp
-            
-            for model_idx, model_name in enumerate(weights.keys()):
-                w = weights[model_name]
-                pred = all_predictions[model_idx][i]
-                
-                weighted_price += pred.predicted_price * w
-                weighted_lower += pred.lower_bound * w
-                weighted_upper += pred.upper_bound * w
-                weighted_confidence += pred.confidence * w
-            
-            ensemble_predictions.append(Prediction(
-                timestamp=timestamp,
-                predicted_price=weighted_price,
-                confidence=weighted_confidence,
-                lower_bound=weighted_lower,
-                upper_bound=weighted_upper,
-            ))
+        # Combinar predições usando weighted average: matrizes (modelos x períodos)
+        w = np.array(list(weights.values()))
+        prices = np.vstack([preds.prices[:periods_ahead] for preds in all_predictions])
+        lowers = np.vstack([preds.lower[:periods_ahead] for preds in all_predictions])
+        uppers = np.vstack([preds.upper[:periods_ahead] for preds in all_predictions])
+        confidences = np.vstack([preds.confidence[:periods_ahead] for preds in all_predictions])
+        
+        ensemble_predictions = PredictionArray(
+            timestamps=all_predictions[0].timestamps[:periods_ahead],
+            prices=w @ prices,
+            confidence=w @ confidences,
+            lower=w @ lowers,
+            upper=w @ uppers,
+        )
         
         # Métricas combinadas
         metrics = {
@@ -656,9 +1586,11 @@ class TimeSeriesPredictor:
         self,
         symbol: str,
         timeframe: str,
-        klines: List[Dict[str, Any]],
+        klines: KlinesLike,
         periods_ahead: int = 10,
-        model: str = "auto"
+        model: str = "auto",
+        prophet_max_stale: int = 0,
+        prophet_uncertainty_samples: int = 100
     ) -> PredictionResult:
         """
         Faz predição de preços futuros.
@@ -666,9 +1598,11 @@ class TimeSeriesPredictor:
         Args:
             symbol: Símbolo do ativo
             timeframe: Timeframe dos dados
-            klines: Dados históricos
+            klines: Dados históricos (lista de dicts ou array de `kline_array`)
             periods_ahead: Quantos períodos prever
             model: Modelo a usar (auto, prophet, lstm, arima, simple_ma)
+            prophet_max_stale: Candles novos tolerados antes de refazer o fit do Prophet
+            prophet_uncertainty_samples: Amostras do intervalo do Prophet (0 = sem intervalo)
         
         Returns:
             PredictionResult com predições e métricas
@@ -678,9 +1612,6 @@ class TimeSeriesPredictor:
         if len(klines) < 100:
             raise ValueError(f"Insufficient data: need at least 100 candles, got {len(klines)}")
         
-        # Preparar features
-        df = self.prepare_features(klines)
-        
         # Escolher modelo
         if model == "auto":
             # Prioridade: ensemble > prophet > lstm > arima > simple_ma
@@ -696,28 +1627,46 @@ class TimeSeriesPredictor:
                 model = "simple_ma"
                 logger.warning("No advanced models available, using simple_ma")
         
-        # Fazer predição
+        # Preparar features (incremental por símbolo/timeframe). O simple_ma só
+        # lê o último candle: colunas em arrays, sem montar DataFrame
+        cache_key = (symbol, timeframe)
+        if model == "ensemble" or (
+            model in ("prophet", "lstm", "arima") and model in self.models_available
+        ):
+            df = self.prepare_features(klines, cache_key=cache_key)
+        else:
+            df = self.prepare_features_np(klines)
+        
+        # Fazer predição (modelos treinados ficam em cache por símbolo/timeframe)
+        # Último timestamp, intervalo e preços finais extraídos uma vez
+        tail = _tail_context(df)
         try:
             if model == "ensemble":
-                predictions, metrics = self.predict_ensemble(df, periods_ahead)
+                predictions, metrics = self.predict_ensemble(
+                    df, periods_ahead, cache_key, tail,
+                    prophet_max_stale, prophet_uncertainty_samples
+                )
             elif model == "prophet" and "prophet" in self.models_available:
-                predictions, metrics = self.predict_prophet(df, periods_ahead)
+                predictions, metrics = self.predict_prophet(
+                    df, periods_ahead, cache_key,
+                    prophet_max_stale, prophet_uncertainty_samples
+                )
             elif model == "lstm" and "lstm" in self.models_available:
-                predictions, metrics = self.predict_lstm(df, periods_ahead)
+                predictions, metrics = self.predict_lstm(df, periods_ahead, cache_key, tail)
             elif model == "arima" and "arima" in self.models_available:
-                predictions, metrics = self.predict_arima(df, periods_ahead)
+                predictions, metrics = self.predict_arima(df, periods_ahead, cache_key, tail)
             else:
-                predictions = self.predict_simple_ma(df, periods_ahead)
+                predictions = self.predict_simple_ma(df, periods_ahead, tail)
                 metrics = {"model": "simple_ma"}
         except Exception as e:
             logger.error(f"Error in {model} prediction: {e}", exc_info=True)
             logger.warning("Falling back to simple_ma")
-            predictions = self.predict_simple_ma(df, periods_ahead)
+            predictions = self.predict_simple_ma(df, periods_ahead, tail)
             metrics = {"model": "simple_ma", "error": str(e)}
         
         # Determinar tendência
-        current_price = float(df['close'].iloc[-1])
-        last_prediction = predictions[-1].predicted_price
+        current_price = float(tail.last_close)
+        last_prediction = float(predictions.prices[-1])
         price_change_pct = ((last_prediction - current_price) / current_price) * 100
         
         if price_change_pct > 1:
@@ -7,18 +7,23 @@ Calcula métricas como MAE, RMSE, win rate, profit factor, etc.
 from __future__ import annotations
 
 import logging
+import multiprocessing
+import os
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
 from datetime import datetime
 
+from .kline_array import CLOSE, TIME, KlinesLike, as_kline_array
 from .prediction import TimeSeriesPredictor, PredictionModel
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class BacktestTrade:
     """Representa uma operação baseada em predição"""
     entry_time: int
@@ -82,6 +87,21 @@ class PredictionBacktestResult:
         )
 
 
+def _backtest_model_worker(
+    symbol: str,
+    timeframe: str,
+    klines: List[Dict[str, Any]],
+    model: str,
+) -> PredictionBacktestResult:
+    """Backtest de um modelo em processo separado (predictor próprio)"""
+    return PredictionBacktester().backtest_model(
+        symbol=symbol,
+        timeframe=timeframe,
+        klines=klines,
+        model=model,
+    )
+
+
 class PredictionBacktester:
     """
     Backtesting de predições em dados históricos.
@@ -96,12 +116,15 @@ class PredictionBacktester:
         self,
         symbol: str,
         timeframe: str,
-        klines: List[Dict[str, Any]],
+        klines: KlinesLike,
         model: str = "auto",
         prediction_horizon: int = 5,
         min_change_threshold: float = 0.5,  # % mínimo de mudança para operar
         stop_loss_pct: float = 2.0,
         take_profit_pct: float = 4.0,
+        refit_every: int = 20,
+        max_history: int = 2000,
+        uncertainty_samples: int = 0,
     ) -> PredictionBacktestResult:
         """
         Executa backtest de um modelo de predição.
@@ -109,12 +132,18 @@ class PredictionBacktester:
         Args:
             symbol: Símbolo do ativo
             timeframe: Timeframe dos dados
-            klines: Dados históricos (precisa de muitos dados)
+            klines: Dados históricos (precisa de muitos dados); lista de dicts
+                ou array de `kline_array`
             model: Modelo a testar
             prediction_horizon: Quantos períodos prever
             min_change_threshold: % mínimo de mudança para gerar sinal
             stop_loss_pct: Stop loss em %
             take_profit_pct: Take profit em %
+            refit_every: Prophet só refaz o fit a cada N passos do walk-forward
+                (nos demais prevê com o modelo em cache); 1 = refit em todo passo
+            max_history: Máximo de candles usados em cada predição (custo do fit limitado)
+            uncertainty_samples: Amostras do intervalo do Prophet; 0 por padrão, já
+                que o backtest só usa o preço previsto
         
         Returns:
             PredictionBacktestResult com métricas completas
@@ -128,13 +157,24 @@ class PredictionBacktester:
         train_size = int(len(klines) * 0.2)
         test_start = train_size
         
-        predictions_vs_actual = []
         trades = []
         
+        # Converte para colunas uma vez; cada passo usa uma view (sem copiar o prefixo)
+        klines = as_kline_array(klines)
+        
+        # Predito/real pré-alocados em arrays (no máximo um passo por horizonte)
+        max_steps = max(0, (len(klines) - test_start) // prediction_horizon + 1)
+        predicted_values = np.empty(max_steps, dtype=np.float64)
+        actual_values = np.empty(max_steps, dtype=np.float64)
+        n_predictions = 0
+        
+        # Candles novos que o Prophet em cache pode ignorar antes de um novo fit
+        prophet_max_stale = max(0, refit_every - 1) * prediction_horizon
+        
         # Walk-forward: fazer predição, aguardar resultado, repetir
         for i in range(test_start, len(klines) - prediction_horizon, prediction_horizon):
-            # Usar dados até i para fazer predição
-            historical_data = klines[:i]
+            # Usar dados até i (no máximo `max_history` candles) para fazer predição
+            historical_data = klines[max(0, i - max_history):i]
             
             try:
                 # Fazer predição
@@ -143,7 +183,9 @@ class PredictionBacktester:
                     timeframe=timeframe,
                     klines=historical_data,
                     periods_ahead=prediction_horizon,
-                    model=model
+                    model=model,
+                    prophet_max_stale=prophet_max_stale,
+                    prophet_uncertainty_samples=uncertainty_samples
                 )
                 
                 # Pegar predição do último período
@@ -156,19 +198,12 @@ class PredictionBacktester:
                 if future_idx >= len(klines):
                     break
                 
-                actual_price = float(klines[future_idx]["close"])
-                actual_time = klines[future_idx]["time"]
-                
-                # Calcular erro de predição
-                error = abs(predicted_price - actual_price)
-                error_pct = (error / actual_price) * 100
+                actual_price = float(klines[future_idx, CLOSE])
+                actual_time = int(klines[future_idx, TIME])
                 
-                predictions_vs_actual.append({
-                    "predicted": predicted_price,
-                    "actual": actual_price,
-                    "error": error,
-                    "error_pct": error_pct,
-                })
+                predicted_values[n_predictions] = predicted_price
+                actual_values[n_predictions] = actual_price
+                n_predictions += 1
                 
                 # Determinar se predição foi correta (mesma direção)
                 predicted_change_pct = ((predicted_price - current_price) / current_price) * 100
@@ -182,7 +217,7 @@ class PredictionBacktester:
                     
                     # Simular execução do trade
                     entry_price = current_price
-                    entry_time = klines[i]["time"]
+                    entry_time = int(klines[i, TIME])
                     
                     # Simular saída (verificar stop loss e take profit)
                     exit_price = actual_price
@@ -220,47 +255,48 @@ class PredictionBacktester:
                 continue
         
         # Calcular métricas gerais de predição
-        if not predictions_vs_actual:
+        if n_predictions == 0:
             raise ValueError("No predictions were made during backtest")
         
-        actual_values = np.array([p["actual"] for p in predictions_vs_actual])
-        predicted_values = np.array([p["predicted"] for p in predictions_vs_actual])
+        actual_values = actual_values[:n_predictions]
+        predicted_values = predicted_values[:n_predictions]
         
-        mae = np.mean(np.abs(actual_values - predicted_values))
-        rmse = np.sqrt(np.mean((actual_values - predicted_values) ** 2))
-        mape = np.mean(np.abs((actual_values - predicted_values) / actual_values)) * 100
+        errors = actual_values - predicted_values
+        abs_errors = np.abs(errors)
+        mae = np.mean(abs_errors)
+        rmse = np.sqrt(np.mean(errors ** 2))
+        mape = np.mean(abs_errors / np.abs(actual_values)) * 100
         
         # Calcular acurácia de direção
-        correct_direction = sum(
-            1 for p in predictions_vs_actual
-            if ((p["predicted"] - klines[0]["close"]) * (p["actual"] - klines[0]["close"])) > 0
-        )
-        accuracy = (correct_direction / len(predictions_vs_actual)) * 100
+        first_close = klines[0, CLOSE]
+        correct_direction = int(np.count_nonzero(
+            (predicted_values - first_close) * (actual_values - first_close) > 0
+        ))
+        accuracy = (correct_direction / n_predictions) * 100
         
-        # Métricas de trading
+        # Métricas de trading: PnL extraído uma vez, reduções em NumPy
         if trades:
-            winning_trades = [t for t in trades if t.pnl_pct > 0]
-            losing_trades = [t for t in trades if t.pnl_pct <= 0]
+            pnl = np.fromiter((t.pnl_pct for t in trades), dtype=np.float64, count=len(trades))
+            wins = pnl > 0
+            winning_pnl = pnl[wins]
+            losing_pnl = np.abs(pnl[~wins])
             
-            win_rate = (len(winning_trades) / len(trades)) * 100
-            avg_profit = np.mean([t.pnl_pct for t in winning_trades]) if winning_trades else 0
-            avg_loss = np.mean([abs(t.pnl_pct) for t in losing_trades]) if losing_trades else 0
+            win_rate = wins.mean() * 100
+            avg_profit = winning_pnl.mean() if winning_pnl.size else 0
+            avg_loss = losing_pnl.mean() if losing_pnl.size else 0
             
-            total_profit = sum(t.pnl_pct for t in winning_trades)
-            total_loss = sum(abs(t.pnl_pct) for t in losing_trades)
-            profit_factor = total_profit / total_loss if total_loss > 0 else 0
+            total_loss = losing_pnl.sum()
+            profit_factor = winning_pnl.sum() / total_loss if total_loss > 0 else 0
             
-            total_pnl = sum(t.pnl_pct for t in trades)
+            total_pnl = pnl.sum()
             
             # Max drawdown
-            cumulative = np.cumsum([t.pnl_pct for t in trades])
-            running_max = np.maximum.accumulate(cumulative)
-            drawdown = running_max - cumulative
-            max_drawdown = np.max(drawdown) if len(drawdown) > 0 else 0
+            cumulative = np.cumsum(pnl)
+            max_drawdown = (np.maximum.accumulate(cumulative) - cumulative).max()
             
             # Sharpe ratio (assumindo rf=0)
-            returns = np.array([t.pnl_pct for t in trades])
-            sharpe_ratio = np.mean(returns) / np.std(returns) if np.std(returns) > 0 else 0
+            pnl_std = pnl.std()
+            sharpe_ratio = pnl.mean() / pnl_std if pnl_std > 0 else 0
         else:
             win_rate = 0
             avg_profit = 0
@@ -274,7 +310,7 @@ class PredictionBacktester:
             symbol=symbol,
             timeframe=timeframe,
             model=model,
-            total_predictions=len(predictions_vs_actual),
+            total_predictions=n_predictions,
             correct_predictions=correct_direction,
             accuracy=accuracy,
             mae=mae,
@@ -291,7 +327,7 @@ class PredictionBacktester:
         )
         
         logger.info(
-            f"Backtest completed: {len(predictions_vs_actual)} predictions, "
+            f"Backtest completed: {n_predictions} predictions, "
             f"{accuracy:.1f}% accuracy, {win_rate:.1f}% win rate"
         )
         
@@ -303,15 +339,20 @@ class PredictionBacktester:
         timeframe: str,
         klines: List[Dict[str, Any]],
         models: Optional[List[str]] = None,
+        parallel: bool = True,
     ) -> Dict[str, PredictionBacktestResult]:
         """
         Compara performance de múltiplos modelos em backtest.
         
+        Os modelos são independentes, então cada backtest roda em um processo
+        próprio (Prophet/Stan não é thread-safe e os fits disputariam o GIL).
+        
         Args:
             symbol: Símbolo do ativo
             timeframe: Timeframe
             klines: Dados históricos
             models: Lista de modelos para comparar (None = todos disponíveis)
+            parallel: Um processo por modelo; False roda em sequência
         
         Returns:
             Dict com resultados de cada modelo
@@ -319,6 +360,12 @@ class PredictionBacktester:
         if models is None:
             models = self.predictor.models_available
         
+        if parallel and len(models) > 1:
+            try:
+                return self._compare_models_parallel(symbol, timeframe, klines, models)
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"Parallel comparison failed ({e}), running sequentially")
+        
         results = {}
         
         for model in models:
@@ -336,3 +383,34 @@ class PredictionBacktester:
                 continue
         
         return results
+    
+    def _compare_models_parallel(
+        self,
+        symbol: str,
+        timeframe: str,
+        klines: List[Dict[str, Any]],
+        models: List[str],
+    ) -> Dict[str, PredictionBacktestResult]:
+        """Backtest de cada modelo em um processo (spawn: seguro com threads/TF no pai)"""
+        max_workers = min(len(models), os.cpu_count() or 1)
+        results = {}
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = {
+                model: pool.submit(_backtest_model_worker, symbol, timeframe, klines, model)
+                for model in models
+            }
+            # Coleta na ordem de `models` (mesmo dict da versão sequencial)
+            for model, future in futures.items():
+                try:
+                    logger.info(f"Testing model: {model}")
+                    results[model] = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error testing {model}: {e}")
+                    continue
+        
+        return results
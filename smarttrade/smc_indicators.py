@@ -11,11 +11,24 @@ Implementa conceitos de análise Smart Money para trading:
 """
 from __future__ import annotations
 
+import heapq
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+from typing import List, Dict, Any, Optional, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ._njit import njit, NUMBA_AVAILABLE
+from .kline_array import (
+    KLINE_ARRAY_COLUMNS, OPEN, HIGH, LOW, CLOSE, TIME,
+    KlinesLike, as_kline_array, as_kline_list,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,7 +45,7 @@ class OrderBlockType(Enum):
     BEARISH = "bearish"  # Zona de oferta
 
 
-@dataclass
+@dataclass(slots=True)
 class Candle:
     """Representa um candle individual"""
     time: int
@@ -67,7 +80,7 @@ class Candle:
         return min(self.open, self.close) - self.low
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderBlock:
     """Representa um Order Block (zona de suporte/resistência institucional)"""
     type: OrderBlockType
@@ -92,7 +105,7 @@ class OrderBlock:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class FairValueGap:
     """Fair Value Gap (imbalance/desequilíbrio de preço)"""
     type: OrderBlockType  # bullish ou bearish
@@ -122,9 +135,30 @@ class FairValueGap:
             "fill_percentage": round(self.fill_percentage, 2),
             "size": round(self.size, 6),
         }
+    
+    @staticmethod
+    def to_dicts(fvgs: List["FairValueGap"]) -> List[Dict[str, Any]]:
+        """Serializa vários FVGs de uma vez (mesmo formato de `to_dict`)"""
+        return [
+            {
+                "type": _OB_TYPE_VALUES[fvg_type],
+                "time_start": time_start,
+                "time_end": time_end,
+                "top": top,
+                "bottom": bottom,
+                "index_start": index_start,
+                "index_end": index_end,
+                "filled": filled,
+                # round() é caro; 0.0 (o caso comum) já está arredondado
+                "fill_percentage": round(fill, 2) if fill else fill,
+                "size": round(top - bottom, 6),
+            }
+            for fvg_type, time_start, time_end, top, bottom, index_start, index_end, filled, fill
+            in map(_fvg_fields, fvgs)
+        ]
 
 
-@dataclass
+@dataclass(slots=True)
 class SwingPoint:
     """Representa um swing high ou swing low"""
     time: int
@@ -141,7 +175,7 @@ class SwingPoint:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class StructureBreak:
     """Break of Structure (BOS) ou Change of Character (CHoCH)"""
     type: str  # "BOS" ou "CHoCH"
@@ -162,7 +196,7 @@ class StructureBreak:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class CISD:
     """Change in State of Delivery (CISD) - Zona de reversão após captura de liquidez"""
     type: OrderBlockType
@@ -183,17 +217,275 @@ class CISD:
         }
 
 
+# Acessores usados na serialização em lote (`FairValueGap.to_dicts`)
+_OB_TYPE_VALUES = {member: member.value for member in OrderBlockType}
+_fvg_fields = attrgetter(
+    "type", "time_start", "time_end", "top", "bottom",
+    "index_start", "index_end", "filled", "fill_percentage",
+)
+
+
+@dataclass
+class SMCContext:
+    """
+    Pré-processamento de uma série de klines compartilhado entre estratégias.
+    
+    Construído uma vez por `SMCAnalyzer.build_context` e reutilizado pelos
+    backtests, que assim não repetem o parse nem a análise SMC completa.
+    """
+    klines: List[Dict[str, Any]]
+    array: np.ndarray  # layout SoA (N, 6) de `kline_array`
+    analysis: Dict[str, Any]  # saída de `SMCAnalyzer.analyze`
+
+
+# Candles aceitos pelos métodos `find_*`: objetos `Candle` (API pública)
+# ou o array SoA (N, 6) de `kline_array` usado internamente por `analyze`
+CandlesLike = Union[List[Candle], np.ndarray]
+
+
+_swing_index = attrgetter("index")
+
+
+def _merge_swings(swing_highs: List[SwingPoint], swing_lows: List[SwingPoint]) -> List[SwingPoint]:
+    """Intercala swings já ordenados por índice (O(S), estável como `sorted`)"""
+    return list(heapq.merge(swing_highs, swing_lows, key=_swing_index))
+
+
+def _strictly_rising(prices: List[float]) -> bool:
+    """Sequência de 2 ou 3 preços estritamente crescente"""
+    return prices[0] < prices[1] and (len(prices) == 2 or prices[1] < prices[2])
+
+
+def _candle_array(candles: CandlesLike) -> np.ndarray:
+    """Retorna os candles como array SoA (N, 6), convertendo `Candle`s se necessário"""
+    if isinstance(candles, np.ndarray):
+        return candles
+    arr = np.empty((len(candles), len(KLINE_ARRAY_COLUMNS)), dtype=np.float64, order="F")
+    for col, name in enumerate(KLINE_ARRAY_COLUMNS):
+        arr[:, col] = np.fromiter((getattr(c, name) for c in candles), dtype=np.float64, count=len(candles))
+    return arr
+
+
+def _candle_times(arr: np.ndarray) -> List[int]:
+    """Timestamps (ms) como ints Python, prontos para os objetos de saída"""
+    return arr[:, TIME].astype(np.int64).tolist()
+
+
+def _true_range(arr: np.ndarray) -> np.ndarray:
+    """True range por candle; o primeiro (sem fechamento anterior) usa só high - low"""
+    high = arr[:, HIGH]
+    low = arr[:, LOW]
+    prev_close = arr[:-1, CLOSE]
+    tr = np.empty(len(arr))
+    tr[:1] = np.maximum(high[:1] - low[:1], 0.0)
+    tr[1:] = np.maximum(
+        high[1:] - low[1:],
+        np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)),
+    )
+    return tr
+
+
+def _rolling_atr(true_range: np.ndarray, period: int) -> np.ndarray:
+    """
+    ATR simples: `atr[k]` é a média do true range dos candles k..k+period-1,
+    para os candles que têm `period` candles anteriores (k + period < N).
+    
+    Recebe o true range de `_true_range`. Soma as `period` fatias deslocadas
+    em ordem (O(N·period) em operações vetoriais), mantendo o mesmo
+    arredondamento da soma sequencial.
+    """
+    tr = true_range[:-1]
+    windows = sliding_window_view(tr, period)
+    total = windows[:, 0].copy()
+    for k in range(1, period):
+        total += windows[:, k]
+    return total / period
+
+
+@njit(cache=True)
+def _order_block_scan_njit(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+    atr: np.ndarray, atr_period: int, min_strength: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Varredura de order blocks de `find_order_blocks` em um único laço.
+    
+    Candle bearish seguido de ao menos 2 bullish nos 3 seguintes (ou o
+    inverso), com movimento de pelo menos `min_strength` ATRs.
+    
+    Returns:
+        (índices, True se bullish, força limitada a 1.0), em ordem de índice
+    """
+    n = close.shape[0]
+    indices = np.empty(n, dtype=np.int64)
+    bullish = np.empty(n, dtype=np.bool_)
+    strengths = np.empty(n)
+    count = 0
+    for i in range(atr_period + 3, n - 3):
+        a = atr[i - atr_period]
+        if close[i] < open_[i]:
+            # Movimento de alta nos próximos 3 candles
+            ups = 0
+            next_high = high[i + 1]
+            for j in range(i + 1, i + 4):
+                if close[j] > open_[j]:
+                    ups += 1
+                if high[j] > next_high:
+                    next_high = high[j]
+            strength = (next_high - close[i]) / a if a > 0 else 0.0
+            if ups >= 2 and strength >= min_strength:
+                indices[count] = i
+                bullish[count] = True
+                strengths[count] = min(strength, 1.0)
+                count += 1
+        elif close[i] > open_[i]:
+            # Movimento de baixa nos próximos 3 candles
+            downs = 0
+            next_low = low[i + 1]
+            for j in range(i + 1, i + 4):
+                if close[j] < open_[j]:
+                    downs += 1
+                if low[j] < next_low:
+                    next_low = low[j]
+            strength = (close[i] - next_low) / a if a > 0 else 0.0
+            if downs >= 2 and strength >= min_strength:
+                indices[count] = i
+                bullish[count] = False
+                strengths[count] = min(strength, 1.0)
+                count += 1
+    return indices[:count], bullish[:count], strengths[:count]
+
+
+def _order_block_scan_numpy(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+    atr: np.ndarray, atr_period: int, min_strength: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Fallback sem numba de `_order_block_scan_njit`, com máscaras NumPy"""
+    i = np.arange(atr_period + 3, max(atr_period + 3, len(close) - 3))
+    a = atr[i - atr_period]
+    is_up = close > open_
+    is_down = close < open_
+    ups = is_up[i + 1].astype(np.int64) + is_up[i + 2] + is_up[i + 3]
+    downs = is_down[i + 1].astype(np.int64) + is_down[i + 2] + is_down[i + 3]
+    next_high = np.maximum(np.maximum(high[i + 1], high[i + 2]), high[i + 3])
+    next_low = np.minimum(np.minimum(low[i + 1], low[i + 2]), low[i + 3])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        up_strength = np.where(a > 0, (next_high - close[i]) / a, 0.0)
+        down_strength = np.where(a > 0, (close[i] - next_low) / a, 0.0)
+    bullish = is_down[i] & (ups >= 2) & (up_strength >= min_strength)
+    bearish = is_up[i] & (downs >= 2) & (down_strength >= min_strength)
+    keep = bullish | bearish
+    strengths = np.minimum(np.where(bullish, up_strength, down_strength)[keep], 1.0)
+    return i[keep], bullish[keep], strengths
+
+
+@njit(cache=True)
+def _cisd_scan_njit(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+    swing_index: np.ndarray, swing_price: np.ndarray, swing_is_high: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Varredura de CISD de `find_cisd`: para cada swing, o primeiro dos 19
+    candles seguintes que captura a liquidez e confirma a reversão.
+    
+    Returns:
+        (posição do swing, índice do candle), em ordem de swing
+    """
+    n = close.shape[0]
+    n_swings = swing_index.shape[0]
+    rows = np.empty(n_swings, dtype=np.int64)
+    candles = np.empty(n_swings, dtype=np.int64)
+    count = 0
+    for s in range(n_swings):
+        price = swing_price[s]
+        for i in range(swing_index[s] + 1, min(swing_index[s] + 20, n)):
+            has_next = i + 1 < n
+            if swing_is_high[s]:
+                # Bearish CISD: sweep do swing high + fechamento abaixo (ou
+                # candle seguinte bearish fechando abaixo)
+                hit = high[i] > price and (
+                    close[i] < price
+                    or (has_next and close[i + 1] < price and close[i + 1] < open_[i + 1])
+                )
+            else:
+                # Bullish CISD: sweep do swing low + fechamento acima (ou
+                # candle seguinte bullish fechando acima)
+                hit = low[i] < price and (
+                    close[i] > price
+                    or (has_next and close[i + 1] > price and close[i + 1] > open_[i + 1])
+                )
+            if hit:
+                rows[count] = s
+                candles[count] = i
+                count += 1
+                break
+    return rows[:count], candles[:count]
+
+
+def _cisd_scan_numpy(
+    open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+    swing_index: np.ndarray, swing_price: np.ndarray, swing_is_high: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fallback sem numba de `_cisd_scan_njit`, com janelas (S, 19) em NumPy"""
+    n_candles = len(close)
+    swing_price = swing_price[:, None]
+    swing_is_high = swing_is_high[:, None]
+    
+    # Direção de cada candle, calculada uma vez sobre os N candles
+    bullish = close > open_
+    bearish = close < open_
+    
+    # Janela (S, 19) dos candles seguintes a cada swing (mesmo alcance de
+    # `range(index + 1, index + 20)`), com o candle posterior de cada um
+    ahead = swing_index[:, None] + np.arange(1, 20)
+    in_range = ahead < n_candles
+    idx = np.minimum(ahead, n_candles - 1)
+    nxt = np.minimum(ahead + 1, n_candles - 1)
+    has_next = ahead + 1 < n_candles
+    close_at = close[idx]
+    close_next = close[nxt]
+    
+    bull = ~swing_is_high & (low[idx] < swing_price) & (
+        (close_at > swing_price)
+        | (has_next & (close_next > swing_price) & bullish[nxt])
+    )
+    bear = swing_is_high & (high[idx] > swing_price) & (
+        (close_at < swing_price)
+        | (has_next & (close_next < swing_price) & bearish[nxt])
+    )
+    hits = in_range & (bull | bear)
+    
+    # Primeiro sweep confirmado de cada swing (o `break` do laço original)
+    found = np.flatnonzero(hits.any(axis=1))
+    return found, idx[found, hits[found].argmax(axis=1)]
+
+
 class SMCAnalyzer:
-    """Analisador de Smart Money Concepts"""
+    """
+    Analisador de Smart Money Concepts.
+    
+    Os candles são processados no layout SoA de `kline_array` (uma coluna
+    contígua por campo); `Candle` continua disponível para a API pública.
+    """
     
-    def __init__(self, swing_length: int = 5):
+    def __init__(self, swing_length: int = 5, cache_size: int = 8):
         """
         Inicializa o analisador SMC.
         
         Args:
             swing_length: Número de candles para cada lado ao identificar swing points
+            cache_size: Máximo de análises memoizadas (LRU); 0 desativa o cache
         """
         self.swing_length = swing_length
+        # Cache LRU de analyze() pelo conteúdo dos candles (polling repetido)
+        self.cache_size = cache_size
+        self._analysis_cache: "OrderedDict[Tuple[int, int, int], Dict[str, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    @staticmethod
+    def _cache_key(candles: np.ndarray) -> Tuple[int, int, int]:
+        """Chave de memoização: tamanho, último timestamp e hash do conteúdo"""
+        return (len(candles), int(candles[-1, TIME]), hash(candles.tobytes()))
         
     def parse_candles(self, klines_data: List[Dict[str, Any]]) -> List[Candle]:
         """Converte dados de klines para objetos Candle"""
@@ -209,7 +501,11 @@ class SMCAnalyzer:
             ))
         return candles
     
-    def find_swing_highs_lows(self, candles: List[Candle]) -> Tuple[List[SwingPoint], List[SwingPoint]]:
+    def parse_candles_np(self, klines_data: KlinesLike) -> np.ndarray:
+        """Converte klines para o array SoA (N, 6) de `kline_array`, numa única passada"""
+        return as_kline_array(klines_data)
+    
+    def find_swing_highs_lows(self, candles: CandlesLike) -> Tuple[List[SwingPoint], List[SwingPoint]]:
         """
         Identifica swing highs e swing lows.
         
@@ -219,47 +515,38 @@ class SMCAnalyzer:
         Returns:
             Tuple de (swing_highs, swing_lows)
         """
-        swing_highs = []
-        swing_lows = []
-        
+        arr = _candle_array(candles)
         n = self.swing_length
         
-        for i in range(n, len(candles) - n):
-            current = candles[i]
-            
-            # Verifica swing high
-            is_swing_high = True
-            for j in range(1, n + 1):
-                if current.high <= candles[i - j].high or current.high <= candles[i + j].high:
-                    is_swing_high = False
-                    break
-            
-            if is_swing_high:
-                swing_highs.append(SwingPoint(
-                    time=current.time,
-                    price=current.high,
-                    index=i,
-                    is_high=True
-                ))
-            
-            # Verifica swing low
-            is_swing_low = True
-            for j in range(1, n + 1):
-                if current.low >= candles[i - j].low or current.low >= candles[i + j].low:
-                    is_swing_low = False
-                    break
-            
-            if is_swing_low:
-                swing_lows.append(SwingPoint(
-                    time=current.time,
-                    price=current.low,
-                    index=i,
-                    is_high=False
-                ))
+        if len(arr) < 2 * n + 1:
+            return [], []
+        
+        times = _candle_times(arr)
+        
+        def pivots(values: np.ndarray, is_high: bool) -> List[SwingPoint]:
+            # O centro precisa ser estritamente maior (menor) que os N vizinhos
+            # de cada lado: 2N comparações deslocadas sobre todos os candles,
+            # sem reduções sobre janelas com stride
+            m = len(values) - 2 * n
+            center = values[n:n + m]
+            dominated = np.greater_equal if is_high else np.less_equal
+            blocked = np.zeros(m, dtype=bool)
+            for k in range(1, n + 1):
+                blocked |= dominated(values[n - k:n - k + m], center)
+                blocked |= dominated(values[n + k:n + k + m], center)
+            indices = np.flatnonzero(~blocked) + n
+            return [
+                SwingPoint(time=times[i], price=price, index=i, is_high=is_high)
+                for i, price in zip(indices.tolist(), values[indices].tolist())
+            ]
+        
+        swing_highs = pivots(arr[:, HIGH], True)
+        swing_lows = pivots(arr[:, LOW], False)
         
         return swing_highs, swing_lows
     
-    def find_order_blocks(self, candles: List[Candle], min_strength: float = 0.3) -> List[OrderBlock]:
+    def find_order_blocks(self, candles: CandlesLike, min_strength: float = 0.3,
+                          true_range: Optional[np.ndarray] = None) -> List[OrderBlock]:
         """
         Identifica Order Blocks (zonas institucionais).
         
@@ -268,74 +555,74 @@ class SMCAnalyzer:
         Para bearish OB: último candle bullish antes de movimento de baixa forte
         
         Args:
-            candles: Lista de candles
+            candles: Candles (lista de `Candle` ou array SoA)
             min_strength: Força mínima do movimento subsequente (% do ATR)
+            true_range: True range já calculado por `_true_range` (opcional)
         
         Returns:
             Lista de Order Blocks identificados
         """
         order_blocks = []
         
-        if len(candles) < 10:
-            return order_blocks
-        
         # Calcula ATR simplificado para medir força do movimento
         atr_period = 14
-        atr_values = []
-        for i in range(atr_period, len(candles)):
-            true_ranges = []
-            for j in range(i - atr_period, i):
-                tr = max(
-                    candles[j].high - candles[j].low,
-                    abs(candles[j].high - candles[j-1].close) if j > 0 else 0,
-                    abs(candles[j].low - candles[j-1].close) if j > 0 else 0,
-                )
-                true_ranges.append(tr)
-            atr_values.append(sum(true_ranges) / len(true_ranges))
-        
-        for i in range(atr_period + 3, len(candles) - 3):
-            current = candles[i]
-            atr = atr_values[i - atr_period] if i - atr_period < len(atr_values) else atr_values[-1]
-            
-            # Procura bullish order block (último bearish antes de rally)
-            if current.is_bearish:
-                # Verifica movimento de alta nos próximos candles
-                next_3_bullish = sum(1 for j in range(i+1, min(i+4, len(candles))) if candles[j].is_bullish)
-                next_high = max(candles[j].high for j in range(i+1, min(i+4, len(candles))))
-                strength = (next_high - current.close) / atr if atr > 0 else 0
-                
-                if next_3_bullish >= 2 and strength >= min_strength:
-                    order_blocks.append(OrderBlock(
-                        type=OrderBlockType.BULLISH,
-                        time=current.time,
-                        top=max(current.open, current.close),
-                        bottom=current.low,
-                        candle_index=i,
-                        strength=min(strength, 1.0),
-                    ))
-            
-            # Procura bearish order block (último bullish antes de queda)
-            elif current.is_bullish:
-                # Verifica movimento de baixa nos próximos candles
-                next_3_bearish = sum(1 for j in range(i+1, min(i+4, len(candles))) if candles[j].is_bearish)
-                next_low = min(candles[j].low for j in range(i+1, min(i+4, len(candles))))
-                strength = (current.close - next_low) / atr if atr > 0 else 0
-                
-                if next_3_bearish >= 2 and strength >= min_strength:
-                    order_blocks.append(OrderBlock(
-                        type=OrderBlockType.BEARISH,
-                        time=current.time,
-                        top=current.high,
-                        bottom=min(current.open, current.close),
-                        candle_index=i,
-                        strength=min(strength, 1.0),
-                    ))
-        
-        # Limita aos order blocks mais recentes e fortes
-        order_blocks.sort(key=lambda ob: (ob.strength, ob.time), reverse=True)
-        return order_blocks[:20]  # Mantém top 20
-    
-    def find_fair_value_gaps(self, candles: List[Candle], min_gap_atr_ratio: float = 0.1) -> List[FairValueGap]:
+        if len(candles) <= atr_period + 6:
+            # Nenhum candle tem ATR e os 3 candles seguintes para avaliar
+            return order_blocks
+        
+        arr = _candle_array(candles)
+        if true_range is None:
+            true_range = _true_range(arr)
+        columns = (
+            np.ascontiguousarray(arr[:, OPEN]),
+            np.ascontiguousarray(arr[:, HIGH]),
+            np.ascontiguousarray(arr[:, LOW]),
+            np.ascontiguousarray(arr[:, CLOSE]),
+            _rolling_atr(true_range, atr_period),
+        )
+        
+        # Varredura dos candles: índices, direção e força dos order blocks
+        if NUMBA_AVAILABLE:
+            indices, bullish, strengths = _order_block_scan_njit(*columns, atr_period, float(min_strength))
+        else:
+            indices, bullish, strengths = _order_block_scan_numpy(*columns, atr_period, float(min_strength))
+        
+        # Limita aos order blocks mais fortes e recentes antes de criar os
+        # objetos: ordem (força, tempo) decrescente, empates na ordem de índice
+        times = _candle_times(arr)
+        ob_times = arr[indices, TIME]
+        top = np.lexsort((np.arange(len(indices)), -ob_times, -strengths))[:20]  # Mantém top 20
+        indices, bullish, strengths = indices[top], bullish[top], strengths[top]
+        
+        open_, high, low, close = (values[indices].tolist() for values in columns[:4])
+        for k, (i, is_bullish, strength) in enumerate(
+            zip(indices.tolist(), bullish.tolist(), strengths.tolist())
+        ):
+            if is_bullish:
+                # Bullish order block (último bearish antes de rally)
+                order_blocks.append(OrderBlock(
+                    type=OrderBlockType.BULLISH,
+                    time=times[i],
+                    top=max(open_[k], close[k]),
+                    bottom=low[k],
+                    candle_index=i,
+                    strength=strength,
+                ))
+            else:
+                # Bearish order block (último bullish antes de queda)
+                order_blocks.append(OrderBlock(
+                    type=OrderBlockType.BEARISH,
+                    time=times[i],
+                    top=high[k],
+                    bottom=min(open_[k], close[k]),
+                    candle_index=i,
+                    strength=strength,
+                ))
+        
+        return order_blocks
+    
+    def find_fair_value_gaps(self, candles: CandlesLike, min_gap_atr_ratio: float = 0.1,
+                             true_range: Optional[np.ndarray] = None) -> List[FairValueGap]:
         """
         Identifica Fair Value Gaps (FVG) - imbalances de preço.
         
@@ -343,103 +630,109 @@ class SMCAnalyzer:
         FVG Bearish: gap entre low do candle[i-2] e high do candle[i]
         
         Args:
-            candles: Lista de candles
+            candles: Candles (lista de `Candle` ou array SoA)
             min_gap_atr_ratio: Tamanho mínimo do gap em relação ao ATR
+            true_range: True range já calculado por `_true_range` (opcional)
         
         Returns:
             Lista de Fair Value Gaps
         """
         fvgs = []
         
-        if len(candles) < 15:
+        n_candles = len(candles)
+        if n_candles < 15:
             return fvgs
         
-        # Calcula ATR
+        arr = _candle_array(candles)
+        high = arr[:, HIGH]
+        low = arr[:, LOW]
+        
+        # Calcula ATR (média dos primeiros true ranges, soma sequencial);
+        # sem o true range pronto, basta calculá-lo nos primeiros candles
         atr_period = 14
-        atr = 0
-        for i in range(1, min(atr_period + 1, len(candles))):
-            tr = max(
-                candles[i].high - candles[i].low,
-                abs(candles[i].high - candles[i-1].close),
-                abs(candles[i].low - candles[i-1].close),
-            )
-            atr += tr
-        atr /= min(atr_period, len(candles) - 1)
-        
-        for i in range(2, len(candles)):
-            # FVG Bullish: gap para cima
-            if candles[i].low > candles[i-2].high:
-                gap_size = candles[i].low - candles[i-2].high
-                if gap_size >= atr * min_gap_atr_ratio:
-                    fvgs.append(FairValueGap(
-                        type=OrderBlockType.BULLISH,
-                        time_start=candles[i-2].time,
-                        time_end=candles[i].time,
-                        top=candles[i].low,
-                        bottom=candles[i-2].high,
-                        index_start=i-2,
-                        index_end=i,
-                    ))
-            
-            # FVG Bearish: gap para baixo
-            elif candles[i].high < candles[i-2].low:
-                gap_size = candles[i-2].low - candles[i].high
-                if gap_size >= atr * min_gap_atr_ratio:
-                    fvgs.append(FairValueGap(
-                        type=OrderBlockType.BEARISH,
-                        time_start=candles[i-2].time,
-                        time_end=candles[i].time,
-                        top=candles[i-2].low,
-                        bottom=candles[i].high,
-                        index_start=i-2,
-                        index_end=i,
-                    ))
+        if true_range is None:
+            true_range = _true_range(arr[:atr_period + 1])
+        atr = sum(true_range[1:atr_period + 1].tolist())
+        atr /= min(atr_period, n_candles - 1)
+        min_gap = atr * min_gap_atr_ratio
+        
+        # Gaps entre o candle i e o candle i-2, para todos os i >= 2 de uma vez
+        gap_up = low[2:] - high[:-2]
+        gap_down = low[:-2] - high[2:]
+        # FVG Bullish: gap para cima; Bearish só é testado se não houve gap para cima
+        bullish_gap = low[2:] > high[:-2]
+        bullish = bullish_gap & (gap_up >= min_gap)
+        bearish = ~bullish_gap & (high[2:] < low[:-2]) & (gap_down >= min_gap)
+        
+        times = _candle_times(arr)
+        high_list = high.tolist()
+        low_list = low.tolist()
+        for k in np.flatnonzero(bullish | bearish).tolist():
+            i = k + 2
+            if bullish[k]:
+                fvgs.append(FairValueGap(
+                    type=OrderBlockType.BULLISH,
+                    time_start=times[i-2],
+                    time_end=times[i],
+                    top=low_list[i],
+                    bottom=high_list[i-2],
+                    index_start=i-2,
+                    index_end=i,
+                ))
+            else:
+                fvgs.append(FairValueGap(
+                    type=OrderBlockType.BEARISH,
+                    time_start=times[i-2],
+                    time_end=times[i],
+                    top=low_list[i-2],
+                    bottom=high_list[i],
+                    index_start=i-2,
+                    index_end=i,
+                ))
         
         return fvgs
     
-    def detect_trend(self, candles: List[Candle], swing_highs: List[SwingPoint], 
+    def detect_trend(self, candles: CandlesLike, swing_highs: List[SwingPoint], 
                      swing_lows: List[SwingPoint]) -> TrendDirection:
         """
         Detecta a tendência atual baseado em higher highs/higher lows ou lower lows/lower highs.
         
+        Os swings devem estar em ordem de índice, como saem de `find_swing_highs_lows`.
+        
         Returns:
             TrendDirection atual
         """
         if len(swing_highs) < 2 or len(swing_lows) < 2:
             return TrendDirection.NEUTRAL
         
-        # Pega os últimos swing points
-        recent_highs = sorted(swing_highs, key=lambda x: x.index)[-3:]
-        recent_lows = sorted(swing_lows, key=lambda x: x.index)[-3:]
+        # Preços dos últimos (2 ou 3) swing points
+        highs = [s.price for s in swing_highs[-3:]]
+        lows = [s.price for s in swing_lows[-3:]]
         
         # Verifica uptrend (higher highs + higher lows)
-        higher_highs = all(recent_highs[i].price < recent_highs[i+1].price 
-                          for i in range(len(recent_highs)-1))
-        higher_lows = all(recent_lows[i].price < recent_lows[i+1].price 
-                         for i in range(len(recent_lows)-1))
-        
-        if higher_highs and higher_lows:
+        if _strictly_rising(highs) and _strictly_rising(lows):
             return TrendDirection.BULLISH
         
         # Verifica downtrend (lower lows + lower highs)
-        lower_highs = all(recent_highs[i].price > recent_highs[i+1].price 
-                         for i in range(len(recent_highs)-1))
-        lower_lows = all(recent_lows[i].price > recent_lows[i+1].price 
-                        for i in range(len(recent_lows)-1))
-        
-        if lower_lows and lower_highs:
+        if _strictly_rising(lows[::-1]) and _strictly_rising(highs[::-1]):
             return TrendDirection.BEARISH
         
         return TrendDirection.NEUTRAL
     
-    def find_structure_breaks(self, candles: List[Candle], swing_highs: List[SwingPoint],
-                             swing_lows: List[SwingPoint]) -> List[StructureBreak]:
+    def find_structure_breaks(self, candles: CandlesLike, swing_highs: List[SwingPoint],
+                             swing_lows: List[SwingPoint],
+                             all_swings: Optional[List[SwingPoint]] = None,
+                             trend: Optional[TrendDirection] = None) -> List[StructureBreak]:
         """
         Identifica Break of Structure (BOS) e Change of Character (CHoCH).
         
         BOS: quebra de estrutura na direção da tendência
         CHoCH: quebra de estrutura contra a tendência (possível reversão)
         
+        Args:
+            all_swings: Swings já combinados e ordenados por índice (opcional)
+            trend: Tendência já calculada por `detect_trend` (opcional)
+        
         Returns:
             Lista de structure breaks
         """
@@ -448,114 +741,143 @@ class SMCAnalyzer:
         if len(candles) < 10 or not swing_highs or not swing_lows:
             return breaks
         
-        trend = self.detect_trend(candles, swing_highs, swing_lows)
+        if trend is None:
+            trend = self.detect_trend(candles, swing_highs, swing_lows)
         
         # Combina e ordena todos os swing points
-        all_swings = sorted(swing_highs + swing_lows, key=lambda x: x.index)
-        
-        for i in range(1, len(all_swings)):
-            current_swing = all_swings[i]
-            prev_swing = all_swings[i-1]
-            
-            # Verifica se houve quebra de estrutura
-            for j in range(prev_swing.index + 1, min(current_swing.index, len(candles))):
-                candle = candles[j]
-                
+        if all_swings is None:
+            all_swings = sorted(swing_highs + swing_lows, key=_swing_index)
+        prev_swings = all_swings[:-1]
+        n_pairs = len(prev_swings)
+        
+        arr = _candle_array(candles)
+        close = arr[:, CLOSE]
+        
+        # Candles entre cada par de swings consecutivos; como os swings estão
+        # ordenados, os intervalos não se sobrepõem e somam no máximo N candles
+        starts = np.fromiter((s.index + 1 for s in prev_swings), dtype=np.int64, count=n_pairs)
+        ends = np.fromiter((min(s.index, len(close)) for s in all_swings[1:]), dtype=np.int64, count=n_pairs)
+        lengths = np.maximum(ends - starts, 0)
+        pair = np.repeat(np.arange(n_pairs), lengths)
+        positions = np.arange(lengths.sum()) - (np.cumsum(lengths) - lengths - starts)[pair]
+        
+        # Fechamento acima do swing high anterior / abaixo do swing low anterior
+        level = np.fromiter((s.price for s in prev_swings), dtype=np.float64, count=n_pairs)[pair]
+        is_high = np.fromiter((s.is_high for s in prev_swings), dtype=bool, count=n_pairs)[pair]
+        crossed = np.where(is_high, close[positions] > level, close[positions] < level)
+        
+        # Apenas o primeiro candle que quebra cada nível
+        hits = np.flatnonzero(crossed)
+        hit_pair = pair[hits]
+        first = np.ones(len(hits), dtype=bool)
+        first[1:] = hit_pair[1:] != hit_pair[:-1]
+        
+        times = _candle_times(arr)
+        close_list = close.tolist()
+        for k, j in zip(hit_pair[first].tolist(), positions[hits[first]].tolist()):
+            prev_swing = prev_swings[k]
+            if prev_swing.is_high:
                 # Break acima de swing high anterior
-                if prev_swing.is_high and candle.close > prev_swing.price:
-                    break_type = "BOS" if trend == TrendDirection.BULLISH else "CHoCH"
-                    breaks.append(StructureBreak(
-                        type=break_type,
-                        direction=TrendDirection.BULLISH,
-                        time=candle.time,
-                        price=candle.close,
-                        index=j,
-                        broken_level=prev_swing.price,
-                    ))
-                    break
-                
+                break_type = "BOS" if trend == TrendDirection.BULLISH else "CHoCH"
+                direction = TrendDirection.BULLISH
+            else:
                 # Break abaixo de swing low anterior
-                elif not prev_swing.is_high and candle.close < prev_swing.price:
-                    break_type = "BOS" if trend == TrendDirection.BEARISH else "CHoCH"
-                    breaks.append(StructureBreak(
-                        type=break_type,
-                        direction=TrendDirection.BEARISH,
-                        time=candle.time,
-                        price=candle.close,
-                        index=j,
-                        broken_level=prev_swing.price,
-                    ))
-                    break
+                break_type = "BOS" if trend == TrendDirection.BEARISH else "CHoCH"
+                direction = TrendDirection.BEARISH
+            breaks.append(StructureBreak(
+                type=break_type,
+                direction=direction,
+                time=times[j],
+                price=close_list[j],
+                index=j,
+                broken_level=prev_swing.price,
+            ))
         
         return breaks
     
-    def find_cisd(self, candles: List[Candle], swing_highs: List[SwingPoint], 
-                 swing_lows: List[SwingPoint]) -> List[CISD]:
+    def find_cisd(self, candles: CandlesLike, swing_highs: List[SwingPoint], 
+                 swing_lows: List[SwingPoint],
+                 all_swings: Optional[List[SwingPoint]] = None) -> List[CISD]:
         """
         Identifica zonas de CISD (Change in State of Delivery).
         
         CISD ocorre quando o preço captura liquidez (sweeps) de um swing point
         e reverte rapidamente. A zona é definida pelo candle que capturou a liquidez.
         
+        Args:
+            all_swings: Swings já combinados e ordenados por índice (opcional)
+        
         Returns:
             Lista de zonas CISD
         """
         cisd_zones = []
         
-        if len(candles) < 20:
+        n_candles = len(candles)
+        if n_candles < 20:
             return cisd_zones
-            
+        
         # Ordena swings por índice
-        all_swings = sorted(swing_highs + swing_lows, key=lambda x: x.index)
-        
-        for swing in all_swings:
-            # Procura por sweep nos candles seguintes
-            for i in range(swing.index + 1, min(swing.index + 20, len(candles))):
-                candle = candles[i]
-                
-                # Bullish CISD: Sweep de Swing Low + Fechamento acima
-                if not swing.is_high: # Swing Low
-                    if candle.low < swing.price: # Capturou liquidez
-                        # Se fechou acima do swing low (sweep confirmado) ou candle seguinte reverteu forte
-                        if candle.close > swing.price or (i+1 < len(candles) and candles[i+1].close > swing.price and candles[i+1].is_bullish):
-                            cisd_zones.append(CISD(
-                                type=OrderBlockType.BULLISH,
-                                time=candle.time,
-                                top=candle.high,
-                                bottom=candle.low,
-                                candle_index=i,
-                                liquidity_swept_level=swing.price
-                            ))
-                            break # Encontrou o sweep, vai para próximo swing
-                
-                # Bearish CISD: Sweep de Swing High + Fechamento abaixo
-                elif swing.is_high: # Swing High
-                    if candle.high > swing.price: # Capturou liquidez
-                        # Se fechou abaixo do swing high ou candle seguinte reverteu forte
-                        if candle.close < swing.price or (i+1 < len(candles) and candles[i+1].close < swing.price and candles[i+1].is_bearish):
-                            cisd_zones.append(CISD(
-                                type=OrderBlockType.BEARISH,
-                                time=candle.time,
-                                top=candle.high,
-                                bottom=candle.low,
-                                candle_index=i,
-                                liquidity_swept_level=swing.price
-                            ))
-                            break
-                            
+        if all_swings is None:
+            all_swings = sorted(swing_highs + swing_lows, key=_swing_index)
+        if not all_swings:
+            return cisd_zones
+        
+        arr = _candle_array(candles)
+        open_, high, low, close = (np.ascontiguousarray(arr[:, col]) for col in (OPEN, HIGH, LOW, CLOSE))
+        swing_index = np.fromiter((s.index for s in all_swings), dtype=np.int64, count=len(all_swings))
+        swing_price = np.fromiter((s.price for s in all_swings), dtype=np.float64, count=len(all_swings))
+        swing_is_high = np.fromiter((s.is_high for s in all_swings), dtype=bool, count=len(all_swings))
+        
+        # Varredura dos swings: primeiro candle de sweep confirmado de cada um
+        if NUMBA_AVAILABLE:
+            found, first = _cisd_scan_njit(open_, high, low, close, swing_index, swing_price, swing_is_high)
+        else:
+            found, first = _cisd_scan_numpy(open_, high, low, close, swing_index, swing_price, swing_is_high)
+        
+        times = _candle_times(arr)
+        for row, i in zip(found.tolist(), first.tolist()):
+            swing = all_swings[row]
+            cisd_zones.append(CISD(
+                type=OrderBlockType.BEARISH if swing.is_high else OrderBlockType.BULLISH,
+                time=times[i],
+                top=float(high[i]),
+                bottom=float(low[i]),
+                candle_index=i,
+                liquidity_swept_level=swing.price
+            ))
+        
         return cisd_zones
 
-    def analyze(self, klines_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def build_context(self, klines_data: KlinesLike) -> SMCContext:
+        """
+        Prepara o contexto SMC (klines normalizados + análise) para reuso.
+        
+        Args:
+            klines_data: Lista de klines ou array SoA (N, 6)
+        
+        Returns:
+            SMCContext com a análise calculada uma única vez
+        """
+        array = self.parse_candles_np(klines_data)
+        return SMCContext(
+            klines=as_kline_list(klines_data),
+            array=array,
+            analysis=self.analyze(array),
+        )
+
+    def analyze(self, klines_data: KlinesLike) -> Dict[str, Any]:
         """
         Análise completa de Smart Money Concepts.
         
         Args:
-            klines_data: Lista de klines/candles
+            klines_data: Lista de klines/candles ou array SoA (N, 6)
         
         Returns:
-            Dicionário com todos os indicadores SMC identificados
+            Dicionário com todos os indicadores SMC identificados. Para candles
+            idênticos o mesmo dicionário é devolvido do cache (não modifique)
         """
-        candles = self.parse_candles(klines_data)
+        # Layout SoA: uma conversão, reaproveitada por todas as etapas
+        candles = self.parse_candles_np(klines_data)
         
         if len(candles) < 20:
             return {
@@ -564,26 +886,49 @@ class SMCAnalyzer:
                 "provided": len(candles)
             }
         
+        cache_key = self._cache_key(candles) if self.cache_size > 0 else None
+        if cache_key is not None:
+            with self._cache_lock:
+                cached = self._analysis_cache.get(cache_key)
+                if cached is not None:
+                    self._analysis_cache.move_to_end(cache_key)
+                    return cached
+        
         # Identifica componentes SMC
         swing_highs, swing_lows = self.find_swing_highs_lows(candles)
-        order_blocks = self.find_order_blocks(candles)
-        fvgs = self.find_fair_value_gaps(candles)
+        # True range compartilhado pelos ATRs de order blocks e FVGs
+        true_range = _true_range(candles)
+        order_blocks = self.find_order_blocks(candles, true_range=true_range)
+        fvgs = self.find_fair_value_gaps(candles, true_range=true_range)
+        # Os swings saem ordenados por índice: basta intercalá-los uma vez
+        all_swings = _merge_swings(swing_highs, swing_lows)
         trend = self.detect_trend(candles, swing_highs, swing_lows)
-        structure_breaks = self.find_structure_breaks(candles, swing_highs, swing_lows)
-        cisd_zones = self.find_cisd(candles, swing_highs, swing_lows)
+        structure_breaks = self.find_structure_breaks(
+            candles, swing_highs, swing_lows, all_swings=all_swings, trend=trend
+        )
+        cisd_zones = self.find_cisd(candles, swing_highs, swing_lows, all_swings=all_swings)
         
         logger.info(
             f"SMC Analysis complete: {len(order_blocks)} OBs, {len(fvgs)} FVGs, "
             f"{len(cisd_zones)} CISDs, {len(swing_highs)} swing highs, {len(swing_lows)} swing lows, trend={trend.value}"
         )
         
-        return {
+        analysis = {
             "trend": trend.value,
             "swing_highs": [s.to_dict() for s in swing_highs],
             "swing_lows": [s.to_dict() for s in swing_lows],
             "order_blocks": [ob.to_dict() for ob in order_blocks],
-            "fair_value_gaps": [fvg.to_dict() for fvg in fvgs],
+            "fair_value_gaps": FairValueGap.to_dicts(fvgs),
             "structure_breaks": [sb.to_dict() for sb in structure_breaks],
             "cisd_zones": [c.to_dict() for c in cisd_zones],
             "total_candles_analyzed": len(candles),
         }
+        
+        if cache_key is not None:
+            with self._cache_lock:
+                self._analysis_cache[cache_key] = analysis
+                self._analysis_cache.move_to_end(cache_key)
+                while len(self._analysis_cache) > self.cache_size:
+                    self._analysis_cache.popitem(last=False)
+        
+        return analysis
@@ -1,29 +1,67 @@
 """
 Módulo de persistência para histórico de klines (candles).
-Usa SQLAlchemy com SQLite para armazenamento local.
+Usa SQLAlchemy assíncrono (asyncio) com SQLite (aiosqlite) para armazenamento local.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from contextlib import asynccontextmanager
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, BigInteger, Index
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base, Session
+from sqlalchemy import (
+    event, inspect, cast, text, delete, func, make_url,
+    Column, Integer, String, Float, BigInteger, Index, MetaData, Table,
+)
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import declarative_base
 from sqlalchemy.sql import select
 
 logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
+# Timestamps por cláusula IN, abaixo do limite de 999 variáveis do SQLite
+IN_CLAUSE_BATCH_SIZE = 500
+
+# PRAGMAs aplicados a cada conexão SQLite: WAL (leitores não bloqueiam o
+# escritor), fsync só nos checkpoints, temporários em memória, cache de
+# página de 64 MiB e leitura via mmap (256 MiB)
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-65536",
+    "mmap_size=268435456",
+)
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record) -> None:
+    """Listener de `connect` que configura a conexão SQLite recém-aberta"""
+    cursor = dbapi_conn.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {pragma}")
+    finally:
+        cursor.close()
+
+
+# INSERT com suporte a ON CONFLICT DO UPDATE, por dialeto
+_UPSERT_INSERTS = {
+    "sqlite": sqlite_insert,
+    "postgresql": postgresql_insert,
+}
+
 
 class Kline(Base):
     """
     Modelo de candle/kline para persistência.
     
-    Armazena dados OHLCV (Open, High, Low, Close, Volume) com timestamp.
+    Armazena dados OHLCV (Open, High, Low, Close, Volume) com timestamp,
+    como números (REAL) em vez de texto.
     """
     __tablename__ = "klines"
     
@@ -31,11 +69,11 @@ class Kline(Base):
     symbol = Column(String(20), nullable=False, index=True)
     interval = Column(String(10), nullable=False, index=True)
     time = Column(BigInteger, nullable=False)  # Timestamp em ms
-    open = Column(String(50), nullable=False)
-    high = Column(String(50), nullable=False)
-    low = Column(String(50), nullable=False)
-    close = Column(String(50), nullable=False)
-    volume = Column(String(50), nullable=False)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    volume = Column(Float, nullable=False)
     created_at = Column(BigInteger, nullable=False)  # Timestamp de inserção
     
     # Índice composto para queries eficientes
@@ -55,29 +93,108 @@ class Kline(Base):
         }
 
 
+# Drivers assíncronos usados no lugar dos drivers síncronos padrão
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _async_db_url(db_url: str) -> str:
+    """Converte URLs de driver síncrono padrão para o driver assíncrono"""
+    url = make_url(db_url)
+    async_driver = _ASYNC_DRIVERS.get(url.drivername)
+    if async_driver is None:
+        return db_url
+    return url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+def _migrate_text_ohlcv(conn: Connection) -> None:
+    """
+    Converte uma tabela `klines` antiga, com OHLCV em texto, para colunas REAL.
+    
+    Executado via `run_sync` dentro da transação de `KlineStorage.initialize`;
+    não faz nada se a tabela não existe ou já é numérica.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(Kline.__tablename__):
+        return
+    column_types = {c["name"]: c["type"] for c in inspector.get_columns(Kline.__tablename__)}
+    if not isinstance(column_types.get("open"), String):
+        return
+    
+    logger.info("Migrating klines OHLCV columns from text to REAL")
+    numeric = ("open", "high", "low", "close", "volume")
+    if conn.dialect.name != "sqlite":
+        # Bancos com ALTER COLUMN ... TYPE convertem no próprio lugar
+        for name in numeric:
+            conn.execute(text(
+                f"ALTER TABLE klines ALTER COLUMN {name} TYPE DOUBLE PRECISION "
+                f"USING CAST({name} AS DOUBLE PRECISION)"
+            ))
+        return
+    
+    # SQLite não altera tipos de coluna: recria a tabela e copia as linhas
+    conn.execute(text("ALTER TABLE klines RENAME TO klines_old"))
+    # Os índices acompanham a tabela renomeada; libera os nomes para a nova
+    for index in inspect(conn).get_indexes("klines_old"):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    Base.metadata.create_all(conn)
+    
+    old = Table("klines_old", MetaData(), autoload_with=conn)
+    columns = [c.name for c in Kline.__table__.columns]
+    conn.execute(Kline.__table__.insert().from_select(
+        columns,
+        select(*[
+            cast(old.c[name], Float) if name in numeric else old.c[name]
+            for name in columns
+        ]),
+    ))
+    conn.execute(text("DROP TABLE klines_old"))
+
+
 class KlineStorage:
     """
     Gerenciador de persistência de klines.
     
-    Suporta operações síncronas e assíncronas.
+    Todas as operações são assíncronas (engine `AsyncEngine`), para serem
+    aguardadas direto no event loop, sem passar pelo thread pool.
     """
     
-    def __init__(self, db_url: str = "sqlite:///smarttrade.db"):
+    def __init__(self, db_url: str = "sqlite+aiosqlite:///smarttrade.db"):
         """
         Inicializa o storage.
         
+        O esquema é criado (ou migrado) na primeira operação, ou
+        explicitamente via `initialize()`.
+        
         Args:
-            db_url: URL de conexão do banco (padrão: SQLite local)
+            db_url: URL de conexão do banco (padrão: SQLite local). URLs de
+                driver síncrono (`sqlite://`, `postgresql://`) são convertidas
+                para o driver assíncrono equivalente.
         """
-        self.db_url = db_url
-        self.engine = create_engine(db_url, echo=False)
-        self.Session = Session
-        
-        # Cria tabelas se não existirem
-        Base.metadata.create_all(self.engine)
-        logger.info(f"KlineStorage initialized with {db_url}")
+        self.db_url = _async_db_url(db_url)
+        self.engine = create_async_engine(self.db_url, echo=False)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine.sync_engine, "connect", _set_sqlite_pragmas)
+        self.Session = async_sessionmaker(self.engine, expire_on_commit=False)
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+        logger.info(f"KlineStorage initialized with {self.db_url}")
+    
+    async def initialize(self) -> None:
+        """Cria as tabelas se não existirem, migrando esquemas antigos"""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            async with self.engine.begin() as conn:
+                await conn.run_sync(_migrate_text_ohlcv)
+                await conn.run_sync(Base.metadata.create_all)
+            self._initialized = True
     
-    def save_klines(
+    async def save_klines(
         self,
         symbol: str,
         interval: str,
@@ -97,43 +214,60 @@ class KlineStorage:
         if not klines_data:
             return 0
         
-        session = Session(self.engine)
+        await self.initialize()
+        upsert_insert = _UPSERT_INSERTS.get(self.engine.dialect.name)
+        if upsert_insert is None:
+            return await self._save_klines_orm(symbol, interval, klines_data)
+        
         now_ms = int(datetime.now().timestamp() * 1000)
-        inserted = 0
+        rows = [
+            {
+                "symbol": symbol,
+                "interval": interval,
+                "time": kline_dict["time"],
+                "open": float(kline_dict["open"]),
+                "high": float(kline_dict["high"]),
+                "low": float(kline_dict["low"]),
+                "close": float(kline_dict["close"]),
+                "volume": float(kline_dict["volume"]),
+                "created_at": now_ms,
+            }
+            for kline_dict in klines_data
+        ]
+        times = {row["time"] for row in rows}
         
         try:
-            for kline_dict in klines_data:
-                # Verifica se já existe
-                existing = session.query(Kline).filter_by(
-                    symbol=symbol,
-                    interval=interval,
-                    time=kline_dict["time"]
-                ).first()
-                
-                if existing:
-                    # Atualiza valores (candle pode ter sido atualizado)
-                    existing.open = str(kline_dict["open"])
-                    existing.high = str(kline_dict["high"])
-                    existing.low = str(kline_dict["low"])
-                    existing.close = str(kline_dict["close"])
-                    existing.volume = str(kline_dict["volume"])
-                else:
-                    # Insere novo
-                    kline = Kline(
-                        symbol=symbol,
-                        interval=interval,
-                        time=kline_dict["time"],
-                        open=str(kline_dict["open"]),
-                        high=str(kline_dict["high"]),
-                        low=str(kline_dict["low"]),
-                        close=str(kline_dict["close"]),
-                        volume=str(kline_dict["volume"]),
-                        created_at=now_ms
+            # Uma transação: SELECT dos já existentes (para a contagem de novos)
+            # e um único UPSERT executado em lote (executemany), em vez de
+            # SELECT + INSERT/UPDATE por kline
+            async with self.engine.begin() as conn:
+                existing = set()
+                time_list = list(times)
+                for start in range(0, len(time_list), IN_CLAUSE_BATCH_SIZE):
+                    result = await conn.execute(
+                        select(Kline.time).where(
+                            Kline.symbol == symbol,
+                            Kline.interval == interval,
+                            Kline.time.in_(time_list[start:start + IN_CLAUSE_BATCH_SIZE]),
+                        )
                     )
-                    session.add(kline)
-                    inserted += 1
+                    existing.update(result.scalars())
+                
+                stmt = upsert_insert(Kline)
+                # Atualiza valores (candle pode ter sido atualizado)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["symbol", "interval", "time"],
+                    set_={
+                        "open": stmt.excluded.open,
+                        "high": stmt.excluded.high,
+                        "low": stmt.excluded.low,
+                        "close": stmt.excluded.close,
+                        "volume": stmt.excluded.volume,
+                    },
+                )
+                await conn.execute(stmt, rows)
             
-            session.commit()
+            inserted = len(times - existing)
             logger.info(
                 f"Saved {inserted} klines for {symbol} {interval}",
                 extra={"total": len(klines_data), "new": inserted}
@@ -141,13 +275,68 @@ class KlineStorage:
             return inserted
             
         except Exception as e:
-            session.rollback()
             logger.error(f"Error saving klines: {e}")
             raise
-        finally:
-            session.close()
     
-    def get_klines(
+    async def _save_klines_orm(
+        self,
+        symbol: str,
+        interval: str,
+        klines_data: List[Dict[str, Any]]
+    ) -> int:
+        """Fallback de `save_klines` para dialetos sem ON CONFLICT (SELECT + INSERT/UPDATE por kline)"""
+        now_ms = int(datetime.now().timestamp() * 1000)
+        inserted = 0
+        
+        async with self.Session() as session:
+            try:
+                for kline_dict in klines_data:
+                    # Verifica se já existe
+                    result = await session.execute(
+                        select(Kline).where(
+                            Kline.symbol == symbol,
+                            Kline.interval == interval,
+                            Kline.time == kline_dict["time"],
+                        ).limit(1)
+                    )
+                    existing = result.scalars().first()
+                    
+                    if existing:
+                        # Atualiza valores (candle pode ter sido atualizado)
+                        existing.open = float(kline_dict["open"])
+                        existing.high = float(kline_dict["high"])
+                        existing.low = float(kline_dict["low"])
+                        existing.close = float(kline_dict["close"])
+                        existing.volume = float(kline_dict["volume"])
+                    else:
+                        # Insere novo
+                        kline = Kline(
+                            symbol=symbol,
+                            interval=interval,
+                            time=kline_dict["time"],
+                            open=float(kline_dict["open"]),
+                            high=float(kline_dict["high"]),
+                            low=float(kline_dict["low"]),
+                            close=float(kline_dict["close"]),
+                            volume=float(kline_dict["volume"]),
+                            created_at=now_ms
+                        )
+                        session.add(kline)
+                        inserted += 1
+                
+                await session.commit()
+                logger.info(
+                    f"Saved {inserted} klines for {symbol} {interval}",
+                    extra={"total": len(klines_data), "new": inserted}
+                )
+                return inserted
+                
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error saving klines: {e}")
+                raise
+    
+    async def get_klines(
         self,
         symbol: str,
         interval: str,
@@ -168,38 +357,39 @@ class KlineStorage:
         Returns:
             Lista de klines como dicts
         """
-        session = Session(self.engine)
+        await self.initialize()
+        # Só as colunas de `Kline.to_dict` (sem instanciar objetos ORM),
+        # servidas pelo índice (symbol, interval, time)
+        query = select(
+            Kline.time, Kline.open, Kline.high, Kline.low, Kline.close, Kline.volume
+        ).where(
+            Kline.symbol == symbol,
+            Kline.interval == interval,
+        )
         
-        try:
-            query = session.query(Kline).filter_by(
-                symbol=symbol,
-                interval=interval
-            )
-            
-            if start_time:
-                query = query.filter(Kline.time >= start_time)
-            if end_time:
-                query = query.filter(Kline.time <= end_time)
-            
-            query = query.order_by(Kline.time.desc())
-            
-            if limit:
-                query = query.limit(limit)
-            
-            klines = query.all()
-            result = [k.to_dict() for k in reversed(klines)]  # Ordem crescente
-            
-            logger.debug(
-                f"Retrieved {len(result)} klines for {symbol} {interval}",
-                extra={"limit": limit, "start": start_time, "end": end_time}
-            )
-            
-            return result
-            
-        finally:
-            session.close()
+        if start_time:
+            query = query.where(Kline.time >= start_time)
+        if end_time:
+            query = query.where(Kline.time <= end_time)
+        
+        if limit:
+            # Os `limit` mais recentes, reordenados em ordem crescente pelo banco
+            recent = query.order_by(Kline.time.desc()).limit(limit).subquery()
+            query = select(recent).order_by(recent.c.time)
+        else:
+            query = query.order_by(Kline.time)
+        
+        async with self.engine.connect() as conn:
+            result = [dict(row) for row in (await conn.execute(query)).mappings()]
+        
+        logger.debug(
+            f"Retrieved {len(result)} klines for {symbol} {interval}",
+            extra={"limit": limit, "start": start_time, "end": end_time}
+        )
+        
+        return result
     
-    def get_latest_kline(
+    async def get_latest_kline(
         self,
         symbol: str,
         interval: str
@@ -214,20 +404,19 @@ class KlineStorage:
         Returns:
             Kline mais recente ou None
         """
-        session = Session(self.engine)
-        
-        try:
-            kline = session.query(Kline).filter_by(
-                symbol=symbol,
-                interval=interval
-            ).order_by(Kline.time.desc()).first()
+        await self.initialize()
+        async with self.Session() as session:
+            result = await session.execute(
+                select(Kline).where(
+                    Kline.symbol == symbol,
+                    Kline.interval == interval,
+                ).order_by(Kline.time.desc()).limit(1)
+            )
+            kline = result.scalars().first()
             
             return kline.to_dict() if kline else None
-            
-        finally:
-            session.close()
     
-    def count_klines(self, symbol: str, interval: str) -> int:
+    async def count_klines(self, symbol: str, interval: str) -> int:
         """
         Conta quantos klines existem para um símbolo/intervalo.
         
@@ -238,20 +427,17 @@ class KlineStorage:
         Returns:
             Quantidade de klines armazenados
         """
-        session = Session(self.engine)
-        
-        try:
-            count = session.query(Kline).filter_by(
-                symbol=symbol,
-                interval=interval
-            ).count()
-            
-            return count
-            
-        finally:
-            session.close()
+        await self.initialize()
+        async with self.Session() as session:
+            result = await session.execute(
+                select(func.count()).select_from(Kline).where(
+                    Kline.symbol == symbol,
+                    Kline.interval == interval,
+                )
+            )
+            return result.scalar_one()
     
-    def delete_old_klines(
+    async def delete_old_klines(
         self,
         symbol: str,
         interval: str,
@@ -268,34 +454,35 @@ class KlineStorage:
         Returns:
             Quantidade de registros removidos
         """
-        session = Session(self.engine)
-        
-        try:
-            deleted = session.query(Kline).filter(
-                Kline.symbol == symbol,
-                Kline.interval == interval,
-                Kline.time < before_time
-            ).delete()
-            
-            session.commit()
-            
-            logger.info(
-                f"Deleted {deleted} old klines for {symbol} {interval}",
-                extra={"before_time": before_time}
-            )
-            
-            return deleted
-            
-        except Exception as e:
-            session.rollback()
-            logger.error(f"Error deleting klines: {e}")
-            raise
-        finally:
-            session.close()
+        await self.initialize()
+        async with self.Session() as session:
+            try:
+                result = await session.execute(
+                    delete(Kline).where(
+                        Kline.symbol == symbol,
+                        Kline.interval == interval,
+                        Kline.time < before_time
+                    )
+                )
+                deleted = result.rowcount
+                
+                await session.commit()
+                
+                logger.info(
+                    f"Deleted {deleted} old klines for {symbol} {interval}",
+                    extra={"before_time": before_time}
+                )
+                
+                return deleted
+                
+            except Exception as e:
+                await session.rollback()
+                logger.error(f"Error deleting klines: {e}")
+                raise
     
-    def close(self):
+    async def close(self):
         """Fecha conexões do banco"""
-        self.engine.dispose()
+        await self.engine.dispose()
         logger.info("KlineStorage closed")
 
 
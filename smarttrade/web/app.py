@@ -21,6 +21,11 @@ from ..storage import get_storage
 from prometheus_client import generate_latest, CollectorRegistry, CONTENT_TYPE_LATEST
 from prometheus_client import Counter, Histogram, Gauge
 
+try:
+    import orjson
+except ImportError:  # orjson é opcional; usa json da stdlib como fallback
+    orjson = None
+
 # Configurar logging
 logging.basicConfig(
     level=getattr(logging, app_config.log_level.upper()),
@@ -29,6 +34,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada em C via orjson, quando instalado"""
+    
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+        return super().render(content)
+
+
 class MetricsMiddleware(BaseHTTPMiddleware):
     """Middleware para instrumentar automaticamente todas as requisições HTTP"""
     
@@ -72,6 +86,33 @@ def get_client() -> BingXClient:
     return _client
 
 
+# Preditor global: mantém em cache os modelos treinados entre requisições
+_predictor = None
+
+
+def get_predictor():
+    """Retorna instância singleton do TimeSeriesPredictor (criada sob demanda)."""
+    global _predictor
+    if _predictor is None:
+        from ..prediction import TimeSeriesPredictor
+        logger.info("Initializing TimeSeriesPredictor singleton")
+        _predictor = TimeSeriesPredictor()
+    return _predictor
+
+
+# Analisador SMC global: memoiza análises de candles repetidos (polling)
+_smc_analyzer = None
+
+
+def get_smc_analyzer():
+    """Retorna instância singleton do SMCAnalyzer (criada sob demanda)."""
+    global _smc_analyzer
+    if _smc_analyzer is None:
+        from ..smc_indicators import SMCAnalyzer
+        _smc_analyzer = SMCAnalyzer(swing_length=5)
+    return _smc_analyzer
+
+
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
@@ -87,8 +128,8 @@ async def lifespan(app: FastAPI):
     )
     # Inicializa o cliente na startup
     get_client()
-    # Inicializa o storage
-    get_storage()
+    # Inicializa o storage (cria/migra o esquema)
+    await get_storage().initialize()
     # Inicia WebSocket Manager
     await get_ws_manager().start()
     
@@ -100,6 +141,10 @@ async def lifespan(app: FastAPI):
     # Para WebSocket Manager
     await get_ws_manager().stop()
     
+    # Fecha o DataProvider compartilhado do scanner
+    from ..market_scanner import MarketScanner
+    await MarketScanner.shutdown()
+    
     global _client
     if _client:
         _client.close()
@@ -107,7 +152,7 @@ async def lifespan(app: FastAPI):
     
     # Fecha storage
     storage = get_storage()
-    storage.close()
+    await storage.close()
 
 
 app = FastAPI(
@@ -444,14 +489,14 @@ async def api_swap_klines(
         
         # Salva no storage em background
         if data:
-            def save_to_db():
+            async def save_to_db():
                 try:
                     storage = get_storage()
-                    storage.save_klines(symbol, interval, data)
+                    await storage.save_klines(symbol, interval, data)
                 except Exception as e:
                     logger.error(f"Error saving klines to DB: {e}")
             
-            asyncio.create_task(asyncio.to_thread(save_to_db))
+            asyncio.create_task(save_to_db())
         
         logger.info(
             f"Fetched swap klines for {symbol}",
@@ -563,17 +608,14 @@ async def api_history_klines(
         Lista de klines históricos do banco
     """
     try:
-        def fetch_history():
-            storage = get_storage()
-            return storage.get_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit,
-                start_time=start_time,
-                end_time=end_time
-            )
-        
-        data = await asyncio.to_thread(fetch_history)
+        storage = get_storage()
+        data = await storage.get_klines(
+            symbol=symbol,
+            interval=interval,
+            limit=limit,
+            start_time=start_time,
+            end_time=end_time
+        )
         
         logger.info(
             f"Retrieved {len(data)} klines from history",
@@ -609,19 +651,18 @@ async def api_history_stats(
         Dict com estatísticas (count, latest_time, etc)
     """
     try:
-        def fetch_stats():
-            storage = get_storage()
-            count = storage.count_klines(symbol, interval)
-            latest = storage.get_latest_kline(symbol, interval)
-            
-            return {
-                "symbol": symbol,
-                "interval": interval,
-                "total_klines": count,
-                "latest_kline": latest
-            }
+        storage = get_storage()
+        count, latest = await asyncio.gather(
+            storage.count_klines(symbol, interval),
+            storage.get_latest_kline(symbol, interval),
+        )
         
-        stats = await asyncio.to_thread(fetch_stats)
+        stats = {
+            "symbol": symbol,
+            "interval": interval,
+            "total_klines": count,
+            "latest_kline": latest
+        }
         
         return JSONResponse(content=stats)
         
@@ -715,13 +756,11 @@ async def api_smc_analyze(
         Análise SMC completa
     """
     try:
-        from ..smc_indicators import SMCAnalyzer
-        
         def fetch_and_analyze():
             client = get_client()
             klines = client.swap_klines(symbol, interval, limit)
             
-            analyzer = SMCAnalyzer(swing_length=5)
+            analyzer = get_smc_analyzer()
             analysis = analyzer.analyze(klines)
             
             return analysis
@@ -1195,13 +1234,11 @@ async def api_predict_price(
     - Métricas do modelo
     """
     try:
-        from ..prediction import TimeSeriesPredictor
-        
         logger.info(f"Price prediction requested for {symbol} {timeframe}")
         
         def run_prediction():
             client = get_client()
-            predictor = TimeSeriesPredictor()
+            predictor = get_predictor()
             
             # Buscar dados históricos
             klines = client.swap_klines(symbol, timeframe, limit)
@@ -1251,13 +1288,11 @@ async def api_compare_prediction_models(
     Retorna predições de todos os modelos disponíveis para comparação.
     """
     try:
-        from ..prediction import TimeSeriesPredictor
-        
         logger.info(f"Model comparison requested for {symbol} {timeframe}")
         
         def run_comparison():
             client = get_client()
-            predictor = TimeSeriesPredictor()
+            predictor = get_predictor()
             
             # Buscar dados
             klines = client.swap_klines(symbol, timeframe, limit)
@@ -1385,8 +1420,6 @@ async def api_predict_with_smc(
     Retorna predições + Order Blocks + FVG + Fibonacci para confluência.
     """
     try:
-        from ..prediction import TimeSeriesPredictor
-        from ..smc_indicators import SMCAnalyzer
         from ..fibonacci import FibonacciAnalyzer
         
         logger.info(f"Prediction + SMC requested for {symbol} {timeframe}")
@@ -1401,7 +1434,7 @@ async def api_predict_with_smc(
                 raise ValueError(f"Insufficient data: {len(klines)} candles")
             
             # 1. Fazer predição
-            predictor = TimeSeriesPredictor()
+            predictor = get_predictor()
             prediction_result = predictor.predict(
                 symbol=symbol,
                 timeframe=timeframe,
@@ -1411,7 +1444,7 @@ async def api_predict_with_smc(
             )
             
             # 2. Análise SMC
-            smc_analyzer = SMCAnalyzer(swing_length=5)
+            smc_analyzer = get_smc_analyzer()
             smc_result = smc_analyzer.analyze(klines)
             
             # 3. Fibonacci
@@ -1596,7 +1629,6 @@ async def api_market_scan(
     """
     try:
         from ..market_scanner import MarketScanner
-        from ..data_provider import DataProvider
         
         logger.info(f"Market scan requested: {category}")
         
@@ -1612,22 +1644,18 @@ async def api_market_scan(
             scanner = MarketScanner()
             client = get_client()
             
-            # Cria DataProvider com o client BingX existente
-            provider = DataProvider(bingx_client=client)
+            # Reusa o DataProvider compartilhado com o client BingX existente
+            provider = await MarketScanner.get_provider(bingx_client=client)
             
             # Se timeframe for "auto" ou não especificado, usa lista padrão
             scan_timeframes = ["15m", "1h", "4h"]
             
-            try:
-                results = await scanner.scan_market(
-                    symbols=symbols,
-                    timeframes=scan_timeframes,
-                    limit_candles=limit,
-                    data_provider=provider
-                )
-            finally:
-                # Fecha conexões extras (CCXT)
-                await provider.close()
+            results = await scanner.scan_market(
+                symbols=symbols,
+                timeframes=scan_timeframes,
+                limit_candles=limit,
+                data_provider=provider
+            )
             
             return {
                 "timestamp": int(time.time() * 1000),
@@ -1645,7 +1673,7 @@ async def api_market_scan(
             extra={"scanned": result["assets_scanned"], "top_asset": result["results"][0]["symbol"] if result["results"] else None}
         )
         
-        return JSONResponse(content=result)
+        return FastJSONResponse(content=result)
         
     except Exception as e:
         logger.exception(f"Error in market scan: {e}")
@@ -0,0 +1,102 @@
+"""
+Testes do FibonacciStreamer contra o cálculo em lote do FibonacciAnalyzer.
+"""
+import random
+
+import pytest
+
+from smarttrade.fibonacci import FibonacciAnalyzer, FibonacciStreamer
+
+
+def _bar(high: float, low: float, close: float) -> dict:
+    return {"open": close, "high": high, "low": low, "close": close}
+
+
+def _random_series(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    price = 100.0
+    bars = []
+    for _ in range(n):
+        price = max(1.0, price + rng.uniform(-2.0, 2.0))
+        high = price + rng.uniform(0.0, 1.5)
+        low = price - rng.uniform(0.0, 1.5)
+        bars.append(_bar(high, low, price))
+    return bars
+
+
+def _assert_same(snapshot, batch):
+    assert snapshot is not None
+    assert len(batch) == 1
+    expected = batch[0]
+    assert snapshot.swing_high == expected.swing_high
+    assert snapshot.swing_low == expected.swing_low
+    assert snapshot.direction == expected.direction
+    assert [lvl.price for lvl in snapshot.levels] == [lvl.price for lvl in expected.levels]
+
+
+class TestFibonacciStreamer:
+    """Testes de equivalência com calculate_auto_retracements"""
+
+    @pytest.mark.parametrize("lookback", [5, 10, 50])
+    def test_snapshot_matches_batch_on_rolling_series(self, lookback):
+        """Cada snapshot bate com o cálculo em lote sobre a mesma janela"""
+        analyzer = FibonacciAnalyzer()
+        streamer = FibonacciStreamer(lookback_period=lookback, analyzer=analyzer)
+        bars = _random_series(300)
+
+        for i, bar in enumerate(bars):
+            streamer.push(bar)
+            if i + 1 < lookback:
+                assert streamer.snapshot() is None
+                continue
+            _assert_same(
+                streamer.snapshot(),
+                analyzer.calculate_auto_retracements(bars[: i + 1], lookback),
+            )
+
+    def test_extremes_evicted_at_lookback_boundary(self):
+        """Swing high/low saem da janela exatamente após `lookback_period` candles"""
+        lookback = 5
+        analyzer = FibonacciAnalyzer()
+        streamer = FibonacciStreamer(lookback_period=lookback, analyzer=analyzer)
+
+        # Extremos no primeiro candle, seguidos de candles estreitos
+        bars = [_bar(200.0, 10.0, 100.0)]
+        bars += [_bar(101.0 + i, 99.0 - i, 100.0 + i) for i in range(lookback + 2)]
+
+        for i, bar in enumerate(bars):
+            streamer.push(bar)
+            if i + 1 < lookback:
+                continue
+            if i < lookback:
+                # Candle 0 ainda está na janela
+                assert streamer.swing_high == 200.0
+                assert streamer.swing_low == 10.0
+            else:
+                assert streamer.swing_high != 200.0
+                assert streamer.swing_low != 10.0
+            _assert_same(
+                streamer.snapshot(),
+                analyzer.calculate_auto_retracements(bars[: i + 1], lookback),
+            )
+
+    def test_equal_highs_keep_latest_until_evicted(self):
+        """Máximos repetidos continuam valendo enquanto algum estiver na janela"""
+        lookback = 3
+        analyzer = FibonacciAnalyzer()
+        streamer = FibonacciStreamer(lookback_period=lookback, analyzer=analyzer)
+        bars = [
+            _bar(50.0, 40.0, 45.0),
+            _bar(50.0, 41.0, 46.0),
+            _bar(48.0, 42.0, 47.0),
+            _bar(47.0, 43.0, 46.0),
+            _bar(46.0, 44.0, 45.0),
+        ]
+        for i, bar in enumerate(bars):
+            streamer.push(bar)
+            if i + 1 >= lookback:
+                _assert_same(
+                    streamer.snapshot(),
+                    analyzer.calculate_auto_retracements(bars[: i + 1], lookback),
+                )
+        assert streamer.swing_high == 48.0
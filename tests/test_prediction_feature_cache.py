@@ -0,0 +1,106 @@
+"""
+Testes do cache incremental de features (`prepare_features` com `cache_key`).
+
+Cada chamada com cache deve produzir exatamente o mesmo DataFrame que o
+cálculo do zero sobre os mesmos klines.
+"""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from smarttrade.kline_array import klines_to_array
+from smarttrade.prediction import _FEATURE_CONTEXT, TimeSeriesPredictor
+
+CACHE_KEY = ("BTC-USDT", "1h")
+
+
+def _random_klines(n: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    price = 100.0
+    klines = []
+    for i in range(n):
+        open_ = price
+        price = max(1.0, price + rng.gauss(0.0, 1.0))
+        klines.append({
+            "time": 1_700_000_000_000 + i * 3_600_000,
+            "open": open_,
+            "high": max(open_, price) + rng.uniform(0.0, 0.5),
+            "low": min(open_, price) - rng.uniform(0.0, 0.5),
+            "close": price,
+            "volume": rng.uniform(10.0, 1000.0),
+        })
+    return klines
+
+
+def _edit(klines: list, idx: int, delta: float = 0.37) -> list:
+    edited = [dict(k) for k in klines]
+    bar = edited[idx]
+    bar["close"] += delta
+    bar["high"] = max(bar["high"], bar["close"])
+    return edited
+
+
+def _operations(base: list):
+    """Sequência de chamadas para a mesma série (símbolo, timeframe)"""
+    window = base[:300]
+    yield "inicial", window
+    yield "repetida", window
+    window = base[5:305]
+    yield "janela deslizante", window
+    window = base[5:312]
+    yield "crescimento", window
+    window = _edit(window, -1)
+    yield "candle em formação editado", window
+    window = window[:-1] + [base[311]]
+    yield "candle em formação revertido", window
+    window = _edit(window, _FEATURE_CONTEXT // 2)
+    yield "edição antes de _FEATURE_CONTEXT", window
+    window = _edit(window, len(window) - _FEATURE_CONTEXT - 5)
+    yield "edição no meio da série", window
+    window = window[10:]
+    yield "início descartado", window
+    window = window[3:] + base[312:330]
+    yield "janela deslizante e crescimento", window
+
+
+def _assert_same_features(predictor, reference, klines, label):
+    cached = predictor.prepare_features(klines, cache_key=CACHE_KEY)
+    expected = reference.prepare_features(klines)
+    pd.testing.assert_frame_equal(cached, expected, obj=label)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("as_array", [False, True])
+def test_cached_features_match_full_recompute(dtype, as_array):
+    """Cache incremental == cálculo do zero em todas as operações"""
+    predictor = TimeSeriesPredictor(feature_dtype=dtype)
+    reference = TimeSeriesPredictor(feature_dtype=dtype)
+
+    for label, klines in _operations(_random_klines(340)):
+        data = klines_to_array(klines) if as_array else klines
+        _assert_same_features(predictor, reference, data, label)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_cached_features_survive_input_format_change(dtype):
+    """Alternar entre lista de dicts e array invalida o cache corretamente"""
+    predictor = TimeSeriesPredictor(feature_dtype=dtype)
+    reference = TimeSeriesPredictor(feature_dtype=dtype)
+
+    for i, (label, klines) in enumerate(_operations(_random_klines(340))):
+        data = klines_to_array(klines) if i % 2 else klines
+        _assert_same_features(predictor, reference, data, label)
+
+
+def test_in_place_edit_after_call_is_detected():
+    """Editar o candle em formação in-place (mesma lista) não reaproveita linhas velhas"""
+    predictor = TimeSeriesPredictor()
+    reference = TimeSeriesPredictor()
+    klines = _random_klines(300)
+
+    _assert_same_features(predictor, reference, klines, "inicial")
+    klines[-1]["close"] += 1.5
+    klines[-1]["high"] = max(klines[-1]["high"], klines[-1]["close"])
+    _assert_same_features(predictor, reference, klines, "editado in-place")
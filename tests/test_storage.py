@@ -0,0 +1,198 @@
+"""
+Testes do KlineStorage com SQLite em arquivo temporário (sem rede).
+"""
+import asyncio
+import logging
+import sqlite3
+
+import pytest
+
+from smarttrade.storage import KlineStorage
+
+# Esquema de antes da migração para REAL: OHLCV como texto
+_LEGACY_SCHEMA = """
+CREATE TABLE klines (
+    id INTEGER NOT NULL,
+    symbol VARCHAR(20) NOT NULL,
+    interval VARCHAR(10) NOT NULL,
+    time BIGINT NOT NULL,
+    open VARCHAR(50) NOT NULL,
+    high VARCHAR(50) NOT NULL,
+    low VARCHAR(50) NOT NULL,
+    close VARCHAR(50) NOT NULL,
+    volume VARCHAR(50) NOT NULL,
+    created_at BIGINT NOT NULL,
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_klines_symbol ON klines (symbol);
+CREATE INDEX ix_klines_interval ON klines (interval);
+CREATE UNIQUE INDEX idx_symbol_interval_time ON klines (symbol, interval, time);
+"""
+
+_LEGACY_ROWS = [
+    ("BTC-USDT", "1h", 1_700_000_000_000, "100.5", "101.25", "99.75", "100.875", "12.5", 1),
+    ("BTC-USDT", "1h", 1_700_003_600_000, "100.875", "102", "100", "101.5", "7", 2),
+    ("ETH-USDT", "5m", 1_700_000_000_000, "2000.1", "2001", "1999.9", "2000.5", "0.001", 3),
+]
+
+
+def _kline(time: int, close: float) -> dict:
+    return {
+        "time": time,
+        "open": str(close - 1),
+        "high": str(close + 1),
+        "low": str(close - 2),
+        "close": str(close),
+        "volume": "10",
+    }
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(_LEGACY_SCHEMA)
+    conn.executemany(
+        "INSERT INTO klines (symbol, interval, time, open, high, low, close, volume, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        _LEGACY_ROWS,
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def _schema(path):
+    conn = sqlite3.connect(path)
+    try:
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(klines)")}
+        indexes = {
+            row[1]: bool(row[2]) for row in conn.execute("PRAGMA index_list(klines)")
+        }
+        sql = conn.execute(
+            "SELECT group_concat(sql, ';') FROM sqlite_master WHERE tbl_name = 'klines'"
+        ).fetchone()[0]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        rows = conn.execute(
+            "SELECT symbol, interval, time, open, high, low, close, volume, created_at, "
+            "typeof(close) FROM klines ORDER BY symbol, time"
+        ).fetchall()
+    finally:
+        conn.close()
+    return columns, indexes, sql, tables, rows
+
+
+class TestTextOhlcvMigration:
+    """Migração de OHLCV em texto para REAL em `initialize()`"""
+
+    def test_migrates_columns_and_keeps_rows_and_indexes(self, legacy_db):
+        async def scenario():
+            storage = KlineStorage(f"sqlite:///{legacy_db}")
+            try:
+                await storage.initialize()
+            finally:
+                await storage.engine.dispose()
+
+        _run(scenario())
+        columns, indexes, _, tables, rows = _schema(legacy_db)
+
+        for name in ("open", "high", "low", "close", "volume"):
+            assert columns[name] in ("FLOAT", "REAL")
+        assert "klines_old" not in tables
+        assert indexes.get("idx_symbol_interval_time") is True
+        assert "ix_klines_symbol" in indexes
+        assert "ix_klines_interval" in indexes
+
+        expected = sorted(
+            (s, i, t, float(o), float(h), float(l), float(c), float(v), created, "real")
+            for s, i, t, o, h, l, c, v, created in _LEGACY_ROWS
+        )
+        assert rows == expected
+
+    def test_second_initialize_is_a_no_op(self, legacy_db, caplog):
+        async def initialize_once():
+            storage = KlineStorage(f"sqlite:///{legacy_db}")
+            try:
+                await storage.initialize()
+            finally:
+                await storage.engine.dispose()
+
+        with caplog.at_level(logging.INFO, logger="smarttrade.storage"):
+            _run(initialize_once())
+            assert "Migrating klines OHLCV" in caplog.text
+            first = _schema(legacy_db)
+
+            caplog.clear()
+            _run(initialize_once())
+            assert "Migrating klines OHLCV" not in caplog.text
+            # Mesmo DDL e mesmas linhas (ids preservados)
+            assert _schema(legacy_db) == first
+
+    def test_unique_index_still_enforced_after_migration(self, legacy_db):
+        async def scenario():
+            storage = KlineStorage(f"sqlite:///{legacy_db}")
+            try:
+                inserted = await storage.save_klines(
+                    "BTC-USDT", "1h", [_kline(1_700_000_000_000, 105.0)]
+                )
+                count = await storage.count_klines("BTC-USDT", "1h")
+                latest = await storage.get_klines("BTC-USDT", "1h", limit=1)
+            finally:
+                await storage.engine.dispose()
+            return inserted, count, latest
+
+        inserted, count, latest = _run(scenario())
+        assert inserted == 0
+        assert count == 2
+        assert latest[0]["time"] == 1_700_003_600_000
+
+
+class TestSaveKlinesUpsert:
+    """Contagem de inseridos vs. atualizados no UPSERT de `save_klines`"""
+
+    def test_insert_then_update_counts(self, tmp_path):
+        async def scenario():
+            storage = KlineStorage(f"sqlite:///{tmp_path / 'upsert.db'}")
+            try:
+                base = 1_700_000_000_000
+                step = 60_000
+                first = [_kline(base + i * step, 100.0 + i) for i in range(5)]
+                inserted_first = await storage.save_klines("BTC-USDT", "1m", first)
+
+                # 2 candles existentes (um com valores novos) + 3 novos
+                second = [_kline(base + 3 * step, 200.0), _kline(base + 4 * step, 104.0)]
+                second += [_kline(base + i * step, 100.0 + i) for i in range(5, 8)]
+                inserted_second = await storage.save_klines("BTC-USDT", "1m", second)
+
+                # Só atualizações
+                inserted_third = await storage.save_klines("BTC-USDT", "1m", first[:2])
+
+                # Mesmo tempo em outro intervalo é outra série
+                inserted_other = await storage.save_klines("BTC-USDT", "5m", first[:1])
+
+                count = await storage.count_klines("BTC-USDT", "1m")
+                klines = await storage.get_klines("BTC-USDT", "1m", limit=None)
+            finally:
+                await storage.engine.dispose()
+            return inserted_first, inserted_second, inserted_third, inserted_other, count, klines
+
+        first, second, third, other, count, klines = _run(scenario())
+        assert (first, second, third, other) == (5, 3, 0, 1)
+        assert count == 8
+        assert [k["time"] for k in klines] == sorted(k["time"] for k in klines)
+        assert klines[3]["close"] == 200.0
+        assert klines[3]["high"] == 201.0
+
+    def test_empty_input_saves_nothing(self, tmp_path):
+        async def scenario():
+            storage = KlineStorage(f"sqlite:///{tmp_path / 'empty.db'}")
+            try:
+                return await storage.save_klines("BTC-USDT", "1m", [])
+            finally:
+                await storage.engine.dispose()
+
+        assert _run(scenario()) == 0